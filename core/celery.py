@@ -13,4 +13,26 @@ app = Celery('core')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+# Tasks are routed to a queue per kind of work (CELERY_TASK_ROUTES in
+# settings). A worker started as before consumes every queue, taking turns
+# between them, so uploads still get a share while a batch is processed:
+#
+#   celery -A core worker
+#
+# To keep, say, a batch of a thousand files from slowing down a single
+# upload someone is waiting on, give the queues workers of their own:
+#
+#   celery -A core worker -Q ingest -n ingest@%h
+#   celery -A core worker -Q bulk -n bulk@%h
+#   celery -A core worker -Q scoring -n scoring@%h --concurrency 1
+#   celery -A core worker -Q email -n email@%h --concurrency 2 --prefetch-multiplier 4
+#
+# A scoring run starts RESCORE_WORKERS detector processes of its own, hence
+# the single scoring slot.
+#
+# Housekeeping runs on a schedule (CELERY_BEAT_SCHEDULE), which needs one
+# beat process next to the workers:
+#
+#   celery -A core beat
@@ -2,8 +2,11 @@
 
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 import dj_database_url
+from kombu import Exchange, Queue
 import os # <-- Make sure 'os' is imported
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -98,7 +101,6 @@ if 'RENDER' in os.environ:
     # Production settings on Render
     STATIC_URL = '/static/'
     STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
     
     # Use AWS S3 for media files to prevent them from being deleted on deploy
     AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
@@ -109,19 +111,85 @@ if 'RENDER' in os.environ:
     AWS_S3_OBJECT_PARAMETERS = {'CacheControl': 'max-age=86400'}
     AWS_LOCATION = 'media'
     MEDIA_URL = f'https://{AWS_S3_CUSTOM_DOMAIN}/{AWS_LOCATION}/'
-    DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+    # Django 5.1+ reads storages from STORAGES only (DEFAULT_FILE_STORAGE and
+    # STATICFILES_STORAGE are ignored)
+    STORAGES = {
+        'default': {'BACKEND': 'storages.backends.s3.S3Storage'},
+        'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+    }
 else:
     # Local development settings
     STATIC_URL = '/static/'
     STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
     MEDIA_URL = '/media/'
     MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-    DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
+# Identical session uploads (same content hash) share one stored file
+DEDUPLICATE_SESSION_FILES = config('DEDUPLICATE_SESSION_FILES', default=False, cast=bool)
+# Largest session file accepted inside a batch upload's zip archive, once
+# extracted; bigger members (or zip bombs) fail the upload
+BATCH_UPLOAD_MAX_MEMBER_SIZE = config('BATCH_UPLOAD_MAX_MEMBER_SIZE', default=256 * 1024 ** 2, cast=int)
+
+# --- Direct uploads ---
+# Session files are uploaded in parts straight to storage (see
+# volunteers/uploads.py). Parts are at least 5 MiB, as S3 requires.
+SESSION_UPLOAD_PART_SIZE = config('SESSION_UPLOAD_PART_SIZE', default=8 * 1024 * 1024, cast=int)
+SESSION_UPLOAD_MAX_SIZE = config('SESSION_UPLOAD_MAX_SIZE', default=2 * 1024 ** 3, cast=int)
+# Seconds a part URL stays valid; resuming an upload hands out fresh ones
+SESSION_UPLOAD_URL_EXPIRY = config('SESSION_UPLOAD_URL_EXPIRY', default=3600, cast=int)
+# Whether session files may still be sent through the sessions endpoint
+# itself. Turn off once clients use /api/uploads/, so that web workers never
+# stream file bodies.
+PROXIED_SESSION_UPLOADS = config('PROXIED_SESSION_UPLOADS', default=True, cast=bool)
+
+# --- Session file cache ---
+# Processing reads files on remote storage (S3) from a local copy, downloaded
+# once and kept until the cache grows past SESSION_FILE_CACHE_SIZE bytes
+# (least recently used files go first). See volunteers/session_files.py.
+SESSION_FILE_CACHE_DIR = config('SESSION_FILE_CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'session-file-cache'))
+SESSION_FILE_CACHE_SIZE = config('SESSION_FILE_CACHE_SIZE', default=2 * 1024 ** 3, cast=int)
+
+# --- Metrics ---
+# Prometheus scrapes /api/metrics/ with "Authorization: Bearer <METRICS_TOKEN>"
+# (admins can always read it; without a token only they can)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Runs older than this many days are rolled up into per-file-type totals,
+# which keeps the exported counters while the table holds only recent runs
+METRICS_RETENTION_DAYS = config('METRICS_RETENTION_DAYS', default=7, cast=int)
+
+# Detector processes used by the rescore_sessions task (1 scores in-process)
+RESCORE_WORKERS = config('RESCORE_WORKERS', default=os.cpu_count() or 1, cast=int)
+
+# --- Response cache ---
+# Serialized session and volunteer responses are cached in Redis when
+# CACHE_URL is set (e.g. redis://localhost:6379/1). Otherwise nothing is
+# cached: the version counters that invalidate responses must be shared by
+# every web and Celery worker, which a per-process cache can't do.
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'OPTIONS': {'ssl_cert_reqs': None} if CACHE_URL.startswith('rediss://') else {},
+        }
+    }
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+# Seconds a cached response body is kept; entries are also replaced whenever
+# the data behind them changes
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=24 * 3600, cast=int)
 
 # --- CORS (Cross-Origin Resource Sharing) Settings ---
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://127.0.0.1:5173,http://localhost:5173').split(',')
 CORS_ALLOW_CREDENTIALS = True
-CORS_ALLOWED_HEADERS = config('CORS_ALLOWED_HEADERS', default='Authorization,Content-Type').split(',')
+CORS_ALLOWED_HEADERS = config('CORS_ALLOWED_HEADERS', default='Authorization,Content-Type,If-None-Match').split(',')
+# Lets the frontend read ETags to revalidate cached responses
+CORS_EXPOSE_HEADERS = ['ETag']
 
 # --- DJANGO REST FRAMEWORK SETTINGS ---
 REST_FRAMEWORK = {
@@ -153,6 +221,48 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# --- Queues ---
+# Each kind of work has its own queue, so that a backlog of one never delays
+# another:
+#   ingest  - processing of files uploaded one at a time (someone is waiting)
+#   bulk    - processing of upload batches
+#   scoring - rescoring runs
+#   email   - outgoing emails
+# A worker started without -Q consumes all of them; dedicated workers per
+# queue are optional (see core/celery.py).
+CELERY_TASK_QUEUES = [Queue(name, Exchange(name), routing_key=name) for name in ('ingest', 'bulk', 'scoring', 'email')]
+CELERY_TASK_DEFAULT_QUEUE = 'ingest'
+CELERY_TASK_ROUTES = {
+    'volunteers.tasks.process_session_file': {'queue': 'ingest'},  # dispatch_upload_batch sends to 'bulk'
+    'volunteers.tasks.finalize_upload_batch': {'queue': 'bulk'},
+    'volunteers.tasks.rescore_sessions': {'queue': 'scoring'},
+    'volunteers.tasks.send_registration_notification': {'queue': 'email'},
+    'volunteers.tasks.send_registration_confirmation': {'queue': 'email'},
+    'volunteers.tasks.roll_up_processing_metrics': {'queue': 'bulk'},
+}
+
+# --- Periodic tasks (run by "celery -A core beat") ---
+CELERY_BEAT_SCHEDULE = {
+    'roll-up-processing-metrics': {
+        'task': 'volunteers.tasks.roll_up_processing_metrics',
+        'schedule': crontab(hour=3, minute=30),
+    },
+}
+
+# --- Workers ---
+# Processing tasks run for seconds to minutes, so a worker reserves only the
+# task it is about to run; the rest stay on the queue for idle workers. The
+# email worker may reserve more with --prefetch-multiplier.
+CELERY_WORKER_PREFETCH_MULTIPLIER = config('CELERY_WORKER_PREFETCH_MULTIPLIER', default=1, cast=int)
+# A pool process whose resident memory has grown past this many KiB is
+# replaced once its current task finishes (large files leave the heap
+# fragmented), so a long backlog doesn't ratchet up the worker's RSS
+CELERY_WORKER_MAX_MEMORY_PER_CHILD = config('CELERY_WORKER_MAX_MEMORY_PER_CHILD', default=512 * 1024, cast=int)
+# Tasks that run with acks_late are only acknowledged once they finish, and
+# Redis hands an unacknowledged task to another worker after this many
+# seconds. It must exceed the longest hard time limit (rescore_sessions's).
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 3 * 3600}
+
 if CELERY_BROKER_URL and CELERY_BROKER_URL.startswith('rediss://'):
     CELERY_BROKER_USE_SSL = {'ssl_cert_reqs': 'CERT_NONE'}
     CELERY_REDIS_BACKEND_USE_SSL = {'ssl_cert_reqs': 'CERT_NONE'}
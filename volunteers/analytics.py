@@ -0,0 +1,201 @@
+# backend/volunteers/analytics.py
+
+import numpy as np
+import pandas as pd
+from django.db.models import Avg, Count, ExpressionWrapper, F, FloatField, Max, Min, Sum
+from django.db.models.functions import NullIf, TruncDay, TruncMonth, TruncWeek
+
+from .timeseries import LABEL_CHANNEL
+
+# ==============================================================================
+# PER-SESSION STATISTICS
+# ==============================================================================
+# Summary statistics derived from a session's series when it is stored, kept in
+# SessionStatistics so cohort questions are answered with SQL aggregates over
+# one small row per session instead of by decoding series.
+#
+# Bump STATS_VERSION whenever the definitions below change.
+
+STATS_VERSION = '1'
+
+# Lower bounds of heart-rate zones 1-5 as fractions of the reference maximum
+# (220 - age). Time below zone 1 is counted as zone 0.
+HR_ZONE_BOUNDS = (0.5, 0.6, 0.7, 0.8, 0.9)
+HR_ZONE_FIELDS = tuple(f'hr_zone{zone}_secs' for zone in range(len(HR_ZONE_BOUNDS) + 1))
+HR_PERCENTILES = (5, 25, 50, 75, 95)
+
+# A pause between samples is a gap if longer than both of these
+GAP_MIN_SECS = 10.0
+GAP_FACTOR = 5.0                # times the session's median sample interval
+MOVING_SPEED = 0.5              # m/s; slower samples count as standing still
+ELEVATION_WINDOW = 5            # samples averaged before summing climbs
+MIN_DRIFT_SAMPLES = 120
+
+
+def age_on(date_of_birth, when):
+    """Age in whole years on the date of ``when`` (a datetime), or None."""
+    if date_of_birth is None or when is None:
+        return None
+    day = when.date()
+    return day.year - date_of_birth.year - ((day.month, day.day) < (date_of_birth.month, date_of_birth.day))
+
+
+def reference_max_heart_rate(age):
+    """Age-predicted maximum heart rate used for the zones."""
+    return None if age is None else 220 - age
+
+
+def _channel(series, *names):
+    for name in names:
+        column = series.column(name)
+        if column is not None:
+            return column.as_float()
+    return None
+
+
+def _finite_mean(values):
+    if values is None:
+        return None
+    values = values[np.isfinite(values)]
+    return round(float(values.mean()), 3) if len(values) else None
+
+
+def hr_drift_pct(heart_rate, speed):
+    """Cardiac drift: change in HR per unit speed from the first to the second half."""
+    if speed is None:
+        return None
+    moving = np.flatnonzero(np.isfinite(heart_rate) & np.isfinite(speed) & (speed > MOVING_SPEED))
+    if len(moving) < MIN_DRIFT_SAMPLES:
+        return None
+    first, second = np.array_split(moving, 2)
+    ratio_first = heart_rate[first].mean() / speed[first].mean()
+    ratio_second = heart_rate[second].mean() / speed[second].mean()
+    return round(float((ratio_second / ratio_first - 1.0) * 100.0), 2)
+
+
+def compute_session_statistics(series, reference_hr=None):
+    """
+    Returns the SessionStatistics field values for a ColumnarSeries. Heart-rate
+    zones need ``reference_hr`` (the volunteer's maximum); without it the zone
+    times are left empty.
+    """
+    length = len(series)
+    stats = {'stats_version': STATS_VERSION, 'num_samples': length, 'zone_reference_hr': reference_hr}
+
+    # --- Sampling: median interval, gaps, and how long each sample lasts ---
+    durations = None
+    stats.update(sample_interval_secs=None, num_gaps=0, longest_gap_secs=None)
+    if series.time_us is not None and length > 1:
+        deltas = np.diff(series.time_us) / 1e6
+        interval = float(np.median(deltas))
+        gaps = deltas > max(GAP_MIN_SECS, GAP_FACTOR * interval)
+        stats['sample_interval_secs'] = round(interval, 3)
+        stats['num_gaps'] = int(gaps.sum())
+        stats['longest_gap_secs'] = round(float(deltas[gaps].max()), 1) if gaps.any() else None
+        # A sample lasts until the next one, except across a gap
+        durations = np.append(np.where(gaps, interval, deltas), interval).clip(min=0)
+
+    # --- Heart rate ---
+    heart_rate = _channel(series, 'heart_rate')
+    if heart_rate is not None:
+        heart_rate = np.where(heart_rate > 0, heart_rate, np.nan)
+    valid = np.isfinite(heart_rate) if heart_rate is not None else np.zeros(length, dtype=bool)
+    stats['hr_samples'] = int(valid.sum())
+    if valid.any():
+        values = heart_rate[valid]
+        stats.update(hr_min=float(values.min()), hr_mean=round(float(values.mean()), 2), hr_max=float(values.max()))
+        for percentile, value in zip(HR_PERCENTILES, np.percentile(values, HR_PERCENTILES)):
+            stats[f'hr_p{percentile}'] = round(float(value), 2)
+    else:
+        stats.update(hr_min=None, hr_mean=None, hr_max=None)
+        stats.update({f'hr_p{percentile}': None for percentile in HR_PERCENTILES})
+
+    stats.update(dict.fromkeys(HR_ZONE_FIELDS))
+    if reference_hr and valid.any():
+        weights = durations if durations is not None else np.ones(length)
+        zones = np.searchsorted(np.array(HR_ZONE_BOUNDS) * reference_hr, heart_rate[valid], side='right')
+        seconds = np.bincount(zones, weights=weights[valid], minlength=len(HR_ZONE_FIELDS))
+        stats.update({field: round(float(value), 1) for field, value in zip(HR_ZONE_FIELDS, seconds)})
+
+    # --- Effort and terrain ---
+    speed = _channel(series, 'enhanced_speed', 'speed')
+    stats['cadence_mean'] = _finite_mean(_channel(series, 'cadence'))
+    stats['speed_mean'] = _finite_mean(np.where(speed > MOVING_SPEED, speed, np.nan)) if speed is not None else None
+    altitude = _channel(series, 'enhanced_altitude', 'altitude')
+    stats['elevation_gain_m'] = None
+    if altitude is not None and np.isfinite(altitude).sum() > ELEVATION_WINDOW:
+        smoothed = pd.Series(altitude).interpolate(limit_area='inside').rolling(ELEVATION_WINDOW, center=True).mean()
+        climbs = smoothed.diff().to_numpy()
+        stats['elevation_gain_m'] = round(float(np.nansum(np.clip(climbs, 0, None))), 1)
+    stats['hr_drift_pct'] = hr_drift_pct(heart_rate, speed) if heart_rate is not None else None
+
+    labels = series.column(LABEL_CHANNEL)
+    stats['anomaly_samples'] = int(np.nansum(labels.as_float() > 0)) if labels is not None else 0
+    return stats
+
+
+# ==============================================================================
+# COHORT AGGREGATES
+# ==============================================================================
+# Groupings and metrics of the analytics endpoint. Both map onto RunningSession
+# lookups, so a whole report is a single GROUP BY query.
+
+ANALYTICS_GROUPS = {
+    'volunteer': 'volunteer_id',
+    'smartwatch': 'volunteer__smartwatch',
+    'platform': 'volunteer__platform',
+    'gender': 'volunteer__gender',
+    'admin_label': 'admin_label',
+    'ml_prediction': 'ml_prediction',
+    'source_type': 'source_type',
+    'day': TruncDay('session_date'),
+    'week': TruncWeek('session_date'),
+    'month': TruncMonth('session_date'),
+}
+
+
+def analytics_metrics():
+    """Aggregate expressions of one analytics row, by output name."""
+    metrics = {
+        'sessions': Count('id'),
+        'volunteers': Count('volunteer_id', distinct=True),
+        'total_duration_secs': Sum('total_duration_secs'),
+        'total_distance_km': Sum('total_distance_km'),
+        'samples': Sum('statistics__num_samples'),
+        'hr_samples': Sum('statistics__hr_samples'),
+        'anomaly_samples': Sum('statistics__anomaly_samples'),
+        'gaps': Sum('statistics__num_gaps'),
+        'sample_interval_secs': Avg('statistics__sample_interval_secs'),
+        'hr_min': Min('statistics__hr_min'),
+        # Weighted by sample count, so long sessions count for more
+        'hr_mean': ExpressionWrapper(
+            Sum(F('statistics__hr_mean') * F('statistics__hr_samples')) / NullIf(Sum('statistics__hr_samples'), 0),
+            output_field=FloatField(),
+        ),
+        'hr_max': Max('statistics__hr_max'),
+        'cadence_mean': Avg('statistics__cadence_mean'),
+        'speed_mean': Avg('statistics__speed_mean'),
+        'elevation_gain_m': Sum('statistics__elevation_gain_m'),
+        'hr_drift_pct': Avg('statistics__hr_drift_pct'),
+    }
+    # Percentiles can't be combined exactly; report the mean of the sessions' values
+    metrics.update({f'hr_p{percentile}': Avg(f'statistics__hr_p{percentile}') for percentile in HR_PERCENTILES})
+    metrics.update({field: Sum(f'statistics__{field}') for field in HR_ZONE_FIELDS})
+    return metrics
+
+
+def cohort_report(sessions, group_by=()):
+    """
+    Aggregates the statistics of ``sessions`` (a RunningSession queryset) per
+    combination of the ANALYTICS_GROUPS in ``group_by``, in one query.
+    """
+    sessions = sessions.filter(statistics__isnull=False)
+    metrics = analytics_metrics()
+    if not group_by:
+        return [sessions.aggregate(**metrics)]
+
+    lookups = [ANALYTICS_GROUPS[name] for name in group_by if isinstance(ANALYTICS_GROUPS[name], str)]
+    truncations = {name: ANALYTICS_GROUPS[name] for name in group_by if not isinstance(ANALYTICS_GROUPS[name], str)}
+    rows = sessions.values(*lookups, **truncations).annotate(**metrics).order_by(*lookups, *truncations)
+    names = {ANALYTICS_GROUPS[name]: name for name in group_by if name not in truncations}
+    return [{names.get(key, key): value for key, value in row.items()} for row in rows]
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class VolunteersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "volunteers"
+
+    def ready(self):
+        # Registers the response cache invalidation receivers
+        from . import signals  # noqa: F401
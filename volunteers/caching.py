@@ -0,0 +1,148 @@
+# backend/volunteers/caching.py
+
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from .compression import choose_encoding, compress, decompress, set_encoded_content, storage_encoding
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# RESPONSE CACHE
+# ==============================================================================
+# Rendered responses are cached compressed under a key derived from the
+# request URL, the response format and the current value of every version
+# counter the payload depends on:
+#
+#   'session:<id>'  one session's fields, time-series and labels
+#   'sessions'      any session (list pages)
+#   'volunteers'    any volunteer (volunteer pages, and the names in sessions)
+#
+# Writes bump the counters (see signals.py and invalidate_sessions()), which
+# changes the keys, so stale entries are never read again and simply expire.
+# The same fingerprint is the response's ETag: a matching If-None-Match gets
+# a 304 without touching the database or the cached body. Bodies are stored in
+# the best content coding available and sent as they are to clients that
+# accept it.
+
+CACHE_PREFIX = 'volunteers:v2'
+# Renderer formats whose responses are cached (not the browsable API)
+CACHED_FORMATS = ('json', 'arrow')
+
+
+def _version_key(scope):
+    return f'{CACHE_PREFIX}:version:{scope}'
+
+
+def _initial_version():
+    # Time-based, so counters recreated after a cache flush never repeat old ETags
+    return time.time_ns() // 1000
+
+
+def get_versions(scopes):
+    """Current value of each version counter, creating missing ones."""
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Advances version counters, invalidating every response built on them."""
+    try:
+        for scope in scopes:
+            key = _version_key(scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, _initial_version(), timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached responses for {scopes}: {e}")
+
+
+def invalidate_sessions(session_ids):
+    """
+    Invalidates the cached responses of sessions once the current transaction
+    commits (right away outside one). Bulk writes, which send no signals, call
+    this directly.
+    """
+    scopes = ['sessions'] + [f'session:{session_id}' for session_id in session_ids]
+    transaction.on_commit(lambda: bump(*scopes))
+
+
+def invalidate_volunteers():
+    transaction.on_commit(lambda: bump('volunteers'))
+
+
+def cached_response(request, scopes, build):
+    """
+    Serves a GET from the response cache. ``build`` returns the DRF Response on
+    a miss; only successful responses are stored. The browsable API bypasses
+    the cache, and so does a cache outage.
+    """
+    renderer = request.accepted_renderer
+    if renderer.format not in CACHED_FORMATS:
+        return build()
+    try:
+        versions = get_versions(scopes)
+    except Exception as e:
+        logger.warning(f"Response cache unavailable: {e}")
+        return build()
+    if None in versions:
+        # No shared cache (DummyCache): counters can't be kept, so neither can responses
+        return build()
+
+    fingerprint = hashlib.blake2b(
+        f'{request.get_host()}|{request.get_full_path()}|{renderer.format}|{versions}'.encode('utf-8'),
+        digest_size=16,
+    ).hexdigest()
+    etag = f'"{fingerprint}"'
+    # Weak comparison: compressed responses carry W/ ETags
+    if_none_match = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    encoding = storage_encoding()
+    key = f'{CACHE_PREFIX}:response:{encoding}:{fingerprint}'
+    try:
+        body = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Response cache unavailable: {e}")
+        body = None
+    content = None
+    if body is not None:
+        outcome = 'hit'
+    else:
+        response = build()
+        if response.status_code != 200:
+            return response
+        content = renderer.render(response.data, request.accepted_media_type, {})
+        body, outcome = compress(content, encoding), 'miss'
+        try:
+            cache.set(key, body, settings.RESPONSE_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Response cache unavailable: {e}")
+
+    response = HttpResponse(content_type=renderer.media_type)
+    response['ETag'] = etag
+    # Clients may keep the body but must revalidate it on every use
+    response['Cache-Control'] = 'private, no-cache'
+    response['X-Cache'] = outcome
+    patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+    if choose_encoding(request) == encoding:
+        return set_encoded_content(response, body, encoding)
+    response.content = content if content is not None else decompress(body, encoding)
+    return response
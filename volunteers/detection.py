@@ -0,0 +1,174 @@
+# backend/volunteers/detection.py
+
+import numpy as np
+import pandas as pd
+
+from .analytics import hr_drift_pct
+from .timeseries import ColumnarSeries
+
+# ==============================================================================
+# HEART-RATE ANOMALY DETECTION
+# ==============================================================================
+# A rule-based detector that runs on every processed session. All statistics
+# are computed column-wise over the whole series at once, so a multi-hour
+# session takes a few milliseconds. Each sample gets a robust z-score from four
+# detectors, and the largest one becomes its anomaly score:
+#
+#   spike     - distance from the rolling median in rolling-MAD units
+#   mismatch  - heart rate that doesn't follow effort (speed / cadence), from
+#               the residual of a least-squares fit of HR on smoothed effort
+#   range     - physiologically implausible values
+#   dropout   - sensor dropouts (gaps inside the recording) and flatlines
+#
+# Bump DETECTOR_VERSION whenever the scoring changes.
+
+DETECTOR_VERSION = '1'
+
+PREDICTION_NORMAL = 'normal'
+PREDICTION_ANOMALOUS = 'anomalous'
+PREDICTION_INSUFFICIENT_DATA = 'insufficient_data'
+
+ROLLING_WINDOW = 31             # samples, about 30 s at the usual 1 Hz
+EFFORT_WINDOW = 30              # trailing window; HR responds to effort with a lag
+Z_THRESHOLD = 3.5               # modified z-score cut-off (Iglewicz & Hoaglin)
+MAD_SCALE = 1.4826              # makes the MAD consistent with a standard deviation
+MIN_SCALE_BPM = 2.0             # floor so steady stretches don't amplify 1 bpm wiggles
+MIN_HEART_RATE, MAX_HEART_RATE = 30, 220
+DROPOUT_SAMPLES = 10            # missing-HR run inside the recording that counts as a dropout
+FLATLINE_SAMPLES = 60           # identical HR values in a row that count as a stuck sensor
+MIN_VALID_SAMPLES = 60
+# The only channels the detectors read; rescoring decodes nothing else
+DETECTION_CHANNELS = ('heart_rate', 'speed', 'enhanced_speed', 'cadence')
+# Share of flagged samples that makes a session anomalous. Warm-up and poor
+# strap contact mean a few percent of flagged samples is normal; on the
+# session_files corpus this cut-off flags the most irregular ~15% of sessions.
+SESSION_ANOMALY_FRACTION = 0.10
+
+
+class DetectionResult:
+    """
+    Output of detect_anomalies(). ``scores`` holds one value in [0, 1) per
+    sample (0.5 at the z-score threshold) and ``flags`` marks samples above it.
+    """
+
+    def __init__(self, scores, flags, prediction, confidence, summary):
+        self.scores = scores
+        self.flags = flags
+        self.prediction = prediction
+        self.confidence = confidence
+        self.summary = summary
+
+
+def _robust_z(values):
+    """Global modified z-scores of an array (NaN where the input is NaN)."""
+    median = np.nanmedian(values)
+    mad = np.nanmedian(np.abs(values - median))
+    return np.abs(values - median) / max(MAD_SCALE * mad, 1e-9)
+
+
+def _run_lengths(change):
+    """For a bool array marking where a new run starts, returns each sample's run length."""
+    run_id = np.cumsum(change) - 1
+    return np.bincount(run_id)[run_id]
+
+
+def _effort_channel(series):
+    for name in ('speed', 'enhanced_speed'):
+        column = series.column(name)
+        if column is not None:
+            return column.as_float()
+    return None
+
+
+def _spike_z(heart_rate):
+    hr = pd.Series(heart_rate)
+    min_periods = ROLLING_WINDOW // 3
+    median = hr.rolling(ROLLING_WINDOW, center=True, min_periods=min_periods).median()
+    mad = (hr - median).abs().rolling(ROLLING_WINDOW, center=True, min_periods=min_periods).median()
+    scale = np.maximum(MAD_SCALE * mad.to_numpy(), MIN_SCALE_BPM)
+    return np.abs(heart_rate - median.to_numpy()) / scale
+
+
+def _mismatch_z(heart_rate, effort_channels):
+    """Residual z-scores of HR regressed on trailing means of the effort channels."""
+    z = np.full(len(heart_rate), np.nan)
+    if not effort_channels:
+        return z
+    smoothed = [
+        pd.Series(channel).rolling(EFFORT_WINDOW, min_periods=EFFORT_WINDOW // 3).mean().to_numpy()
+        for channel in effort_channels
+    ]
+    design = np.column_stack(smoothed + [np.ones(len(heart_rate))])
+    usable = np.isfinite(design).all(axis=1) & np.isfinite(heart_rate)
+    if usable.sum() < MIN_VALID_SAMPLES or np.all(np.nanstd(design[usable, :-1], axis=0) == 0):
+        return z
+    coefficients, *_ = np.linalg.lstsq(design[usable], heart_rate[usable], rcond=None)
+    residual = heart_rate[usable] - design[usable] @ coefficients
+    z[usable] = _robust_z(residual)
+    return z
+
+
+def detect_anomalies(series):
+    """Scores every sample of a ColumnarSeries and predicts a session label."""
+    length = len(series)
+    column = series.column('heart_rate')
+    heart_rate = column.as_float() if column is not None else np.full(length, np.nan)
+    valid = np.isfinite(heart_rate) & (heart_rate > 0)
+    if valid.sum() < MIN_VALID_SAMPLES:
+        return DetectionResult(
+            np.zeros(length, dtype=np.float32), np.zeros(length, dtype=bool),
+            PREDICTION_INSUFFICIENT_DATA, None,
+            {'detector_version': DETECTOR_VERSION, 'valid_samples': int(valid.sum())},
+        )
+    heart_rate = np.where(valid, heart_rate, np.nan)
+
+    speed = _effort_channel(series)
+    cadence = series.column('cadence')
+    effort = [channel for channel in (speed, cadence.as_float() if cadence is not None else None) if channel is not None]
+
+    spike = np.nan_to_num(_spike_z(heart_rate))
+    mismatch = np.nan_to_num(_mismatch_z(heart_rate, effort))
+    out_of_range = np.where(valid & ((heart_rate < MIN_HEART_RATE) | (heart_rate > MAX_HEART_RATE)), 2 * Z_THRESHOLD, 0.0)
+
+    # Dropouts: runs of missing HR between the first and last valid sample
+    inside = np.zeros(length, dtype=bool)
+    valid_positions = np.flatnonzero(valid)
+    inside[valid_positions[0]:valid_positions[-1] + 1] = True
+    missing_runs = _run_lengths(np.r_[True, valid[1:] != valid[:-1]])
+    dropout = ~valid & inside & (missing_runs >= DROPOUT_SAMPLES)
+    # Flatlines: the same reading repeated for a long stretch
+    flat_runs = _run_lengths(np.r_[True, heart_rate[1:] != heart_rate[:-1]])
+    flatline = valid & (flat_runs >= FLATLINE_SAMPLES)
+    sensor = np.where(dropout | flatline, 2 * Z_THRESHOLD, 0.0)
+
+    z = np.maximum.reduce([spike, mismatch, out_of_range, sensor])
+    scores = (z / (z + Z_THRESHOLD)).astype(np.float32)
+    flags = z > Z_THRESHOLD
+
+    considered = valid | dropout
+    fraction = float(flags[considered].mean())
+    prediction = PREDICTION_ANOMALOUS if fraction >= SESSION_ANOMALY_FRACTION else PREDICTION_NORMAL
+    # 0.5 right at the threshold, 1.0 at zero flags or twice the threshold
+    confidence = 0.5 + 0.5 * min(1.0, abs(fraction - SESSION_ANOMALY_FRACTION) / SESSION_ANOMALY_FRACTION)
+
+    summary = {
+        'detector_version': DETECTOR_VERSION,
+        'valid_samples': int(valid.sum()),
+        'flagged_samples': int(flags.sum()),
+        'flagged_fraction': round(fraction, 4),
+        'spike_samples': int((spike > Z_THRESHOLD).sum()),
+        'mismatch_samples': int((mismatch > Z_THRESHOLD).sum()),
+        'out_of_range_samples': int((out_of_range > 0).sum()),
+        'dropout_samples': int(dropout.sum()),
+        'flatline_samples': int(flatline.sum()),
+        'hr_drift_pct': hr_drift_pct(heart_rate, speed),
+    }
+    return DetectionResult(scores, flags, prediction, round(confidence, 4), summary)
+
+
+def detect_encoded(schema, blob):
+    """
+    Runs detect_anomalies() on a stored (schema, blob) pair, decoding only
+    DETECTION_CHANNELS. Needs no database, so it can run in a worker process.
+    """
+    return detect_anomalies(ColumnarSeries.decode(schema, blob, channels=DETECTION_CHANNELS))
@@ -0,0 +1,230 @@
+# backend/volunteers/export.py
+
+import numpy as np
+import pandas as pd
+
+from .analytics import age_on
+from .models import SessionTimeseries
+from .timeseries import LABEL_CHANNEL, TIMESTAMP_KEY
+
+# ==============================================================================
+# LABELED DATASET EXPORT
+# ==============================================================================
+# Flattens many sessions into one table with a row per sample: the sample's
+# channels and anomaly label next to its session and volunteer metadata. The
+# output is produced session by session from a server-side cursor, so memory
+# stays flat however many sessions are exported. Direct identifiers (names,
+# email, phone) are never exported.
+
+EXPORT_CSV = 'csv'
+EXPORT_PARQUET = 'parquet'
+EXPORT_ARROW = 'arrow'
+
+# format -> (content type, file extension)
+EXPORT_FORMATS = {
+    EXPORT_CSV: ('text/csv', 'csv'),
+    EXPORT_PARQUET: ('application/vnd.apache.parquet', 'parquet'),
+    EXPORT_ARROW: ('application/vnd.apache.arrow.stream', 'arrows'),
+}
+
+# Sessions fetched per round trip; each row carries a whole compressed series
+EXPORT_CHUNK_SIZE = 20
+
+SESSION_COLUMNS = ['session_id', 'volunteer_id', 'session_date', 'source_type', 'admin_label', 'ml_prediction']
+VOLUNTEER_COLUMNS = ['gender', 'nationality', 'age', 'platform', 'smartwatch', 'run_frequency']
+
+
+def export_channels(sessions):
+    """
+    Numeric channel names found in the sessions' stored series, in order of
+    first appearance. Reads only the schemas, not the data.
+    """
+    names = {}
+    schemas = SessionTimeseries.objects.filter(session__in=sessions).values_list('schema', flat=True)
+    for schema in schemas.iterator(chunk_size=500):
+        for entry in schema['channels']:
+            if entry['name'] not in (TIMESTAMP_KEY, LABEL_CHANNEL):
+                names.setdefault(entry['name'], None)
+    return list(names)
+
+
+def session_frame(session, channels):
+    """
+    One session's samples as a DataFrame with the export columns, or None if
+    the session has no stored time-series.
+    """
+    series = session.get_timeseries()
+    if series is None or not len(series):
+        return None
+    length = len(series)
+
+    frame = {name: np.full(length, np.nan) for name in channels}
+    for name in channels:
+        column = series.column(name)
+        if column is not None:
+            frame[name] = column.as_float()
+
+    if series.time_us is not None:
+        timestamps = pd.to_datetime(series.time_us, unit='us', utc=True)
+    else:
+        column = series.column(TIMESTAMP_KEY)
+        raw = column.to_list() if column is not None else [None] * length
+        timestamps = pd.to_datetime(pd.Series(raw, dtype=object), utc=True, errors='coerce', format='ISO8601')
+    labels = series.column(LABEL_CHANNEL)
+    anomaly = labels.as_float() if labels is not None else np.zeros(length)
+
+    volunteer = session.volunteer
+    metadata = {
+        'session_id': session.id,
+        'volunteer_id': session.volunteer_id,
+        'session_date': session.session_date,
+        'source_type': session.source_type,
+        'admin_label': session.admin_label,
+        'ml_prediction': session.ml_prediction,
+        'gender': volunteer.gender,
+        'nationality': volunteer.nationality,
+        'age': age_on(volunteer.date_of_birth, session.session_date),
+        'platform': volunteer.platform,
+        'smartwatch': volunteer.smartwatch,
+        'run_frequency': volunteer.run_frequency,
+    }
+    # Scalars are broadcast to every row
+    data = dict(metadata)
+    data['timestamp'] = timestamps
+    data.update(frame)
+    data['anomaly'] = np.nan_to_num(anomaly).astype(np.int8)
+    return pd.DataFrame(data, index=pd.RangeIndex(length))
+
+
+def iter_session_frames(sessions, channels, on_written=None):
+    sessions = sessions.select_related('volunteer', 'timeseries', 'labels').order_by('id')
+    for session in sessions.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        frame = session_frame(session, channels)
+        if frame is not None:
+            yield frame
+            # The writers only ask for the next frame once this one's output
+            # has been taken
+            if on_written is not None:
+                on_written(session)
+
+
+class _DrainableSink:
+    """
+    Write-only file object for the pyarrow writers. Whatever was written since
+    the last drain() is handed out and dropped, so the stream never buffers
+    more than one session.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema(channels):
+    # pyarrow is imported lazily: only the Parquet and Arrow formats need it
+    import pyarrow as pa
+
+    fields = [
+        ('session_id', pa.int64()),
+        ('volunteer_id', pa.int64()),
+        ('session_date', pa.timestamp('us', tz='UTC')),
+        ('source_type', pa.string()),
+        ('admin_label', pa.string()),
+        ('ml_prediction', pa.string()),
+        ('gender', pa.string()),
+        ('nationality', pa.string()),
+        ('age', pa.int16()),
+        ('platform', pa.string()),
+        ('smartwatch', pa.string()),
+        ('run_frequency', pa.string()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+    ]
+    fields += [(name, pa.float64()) for name in channels]
+    fields.append(('anomaly', pa.int8()))
+    return pa.schema(fields)
+
+
+def _iso_strings(values):
+    """
+    ISO 8601 UTC strings for a datetime column, with microseconds only if the
+    column has any. Much faster than to_csv's own datetime formatting.
+    """
+    naive = values.dt.tz_convert(None).to_numpy('datetime64[us]')
+    unit = 'us' if (naive.view(np.int64)[~np.isnat(naive)] % 1_000_000).any() else 's'
+    text = np.datetime_as_string(naive, unit=unit, timezone='UTC')
+    text[np.isnat(naive)] = ''
+    return text
+
+
+def _iter_csv(frames, channels):
+    columns = SESSION_COLUMNS + VOLUNTEER_COLUMNS + ['timestamp'] + channels + ['anomaly']
+    yield (','.join(columns) + '\n').encode('utf-8')
+    for frame in frames:
+        frame['session_date'] = _iso_strings(frame['session_date'])
+        frame['timestamp'] = _iso_strings(frame['timestamp'])
+        yield frame.to_csv(index=False, header=False, lineterminator='\n').encode('utf-8')
+
+
+def _iter_arrow(frames, channels, file_format):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(channels)
+    sink = _DrainableSink()
+    output = pa.PythonFile(sink, mode='w')
+    if file_format == EXPORT_PARQUET:
+        writer = pq.ParquetWriter(output, schema, compression='zstd')
+        write = writer.write_table
+        to_arrow = pa.Table.from_pandas
+    else:
+        writer = pa.ipc.new_stream(output, schema)
+        write = writer.write_batch
+        to_arrow = pa.RecordBatch.from_pandas
+
+    for frame in frames:
+        # One row group / record batch per session
+        write(to_arrow(frame, schema=schema, preserve_index=False))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export(sessions, file_format=EXPORT_CSV, channels=None, on_written=None):
+    """
+    Yields the export of ``sessions`` (a RunningSession queryset) as chunks of
+    bytes in the given format. ``channels`` defaults to every numeric channel
+    found in the sessions. ``on_written`` is called with each session whose
+    rows have been yielded; sessions without samples are skipped.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    if channels is None:
+        channels = export_channels(sessions)
+    channels = [name for name in channels if name not in (TIMESTAMP_KEY, LABEL_CHANNEL)]
+    frames = iter_session_frames(sessions, channels, on_written)
+    if file_format == EXPORT_CSV:
+        return _iter_csv(frames, channels)
+    return _iter_arrow(frames, channels, file_format)
@@ -0,0 +1,421 @@
+# backend/volunteers/fit_records.py
+
+import io
+import struct
+from functools import lru_cache
+
+import fitparse
+import numpy as np
+from fitparse.profile import FIELD_TYPE_TIMESTAMP, MESSAGE_TYPES
+from fitparse.records import BASE_TYPES, BASE_TYPE_BYTE
+
+from .session_files import read_session_file
+from .timeseries import Column, ColumnarSeries, KIND_FLOAT, KIND_INT, KIND_JSON
+
+# ==============================================================================
+# VECTORIZED FIT RECORD DECODER
+# ==============================================================================
+# fitparse builds several Python objects for every field of every message,
+# which makes it the bottleneck for long activities. Record messages are
+# fixed-size rows, so this module only walks the message headers in Python,
+# then gathers all rows that share a definition into one NumPy array and
+# decodes each field as a whole column, applying the same profile scale,
+# offset and component rules as fitparse.
+#
+# The remaining (non-record) messages are few, so they are handed to fitparse
+# as a reduced stream. Anything this decoder does not cover raises
+# UnsupportedFitLayout and callers fall back to plain fitparse.
+
+RECORD_MESG_NUM = 20
+RECORD_FIELDS = MESSAGE_TYPES[RECORD_MESG_NUM].fields
+
+TIMESTAMP_DEF_NUM = FIELD_TYPE_TIMESTAMP.def_num
+# Raw date_time values below this are relative times, not timestamps
+MIN_ABSOLUTE_TIMESTAMP = 0x10000000
+
+_NUMPY_TYPES = {
+    'enum': 'u1', 'sint8': 'i1', 'uint8': 'u1', 'sint16': 'i2', 'uint16': 'u2',
+    'sint32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8',
+    'uint8z': 'u1', 'uint16z': 'u2', 'uint32z': 'u4',
+    'sint64': 'i8', 'uint64': 'u8', 'uint64z': 'u8',
+}
+
+_INVALID_VALUES = {
+    'enum': 0xFF, 'sint8': 0x7F, 'uint8': 0xFF, 'sint16': 0x7FFF, 'uint16': 0xFFFF,
+    'sint32': 0x7FFFFFFF, 'uint32': 0xFFFFFFFF, 'uint8z': 0, 'uint16z': 0, 'uint32z': 0,
+    'sint64': 0x7FFFFFFFFFFFFFFF, 'uint64': 0xFFFFFFFFFFFFFFFF, 'uint64z': 0,
+}
+
+# Field types that fitparse's default data processor rewrites
+_PROCESSED_TYPES = {'bool', 'date_time', 'local_date_time', 'localtime_into_day'}
+
+
+class UnsupportedFitLayout(Exception):
+    """Raised when a file uses FIT features the vectorized decoder doesn't handle."""
+
+
+class FitDecodeResult:
+    """
+    Output of decode_fit_file(): the record messages as a ColumnarSeries of
+    fitparse-equivalent values (timestamps left as raw FIT seconds) and a
+    fitparse FitFile over the remaining messages.
+    """
+
+    def __init__(self, records, fitfile):
+        self.records = records
+        self.fitfile = fitfile
+
+
+# ------------------------------------------------------------------------------
+# CRC
+# ------------------------------------------------------------------------------
+
+_CRC_BLOCK_SIZE = 512
+
+
+@lru_cache(maxsize=1)
+def _crc_table():
+    table = np.zeros(256, dtype=np.uint32)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table[i] = crc
+    return table
+
+
+@lru_cache(maxsize=1)
+def _crc_zero_advance_tables():
+    # The FIT CRC is linear over GF(2), so running a state through a block of
+    # zero bytes can be looked up per state byte and XORed together.
+    table = _crc_table()
+    lo = np.arange(256, dtype=np.uint32)
+    hi = lo << 8
+    for _ in range(_CRC_BLOCK_SIZE):
+        lo = (lo >> 8) ^ table[lo & 0xFF]
+        hi = (hi >> 8) ^ table[hi & 0xFF]
+    return lo.tolist(), hi.tolist()
+
+
+def fit_crc(data):
+    """
+    Computes the FIT SDK CRC-16 of a bytes-like object. Fixed-size blocks are
+    processed side by side with NumPy and then chained together, which is
+    much faster than a per-byte Python loop.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf.size == 0:
+        return 0
+    num_blocks = -(-buf.size // _CRC_BLOCK_SIZE)
+    # Leading zero bytes leave a zero CRC state unchanged, so pad at the front
+    padded = np.zeros(num_blocks * _CRC_BLOCK_SIZE, dtype=np.uint8)
+    padded[padded.size - buf.size:] = buf
+    blocks = padded.reshape(num_blocks, _CRC_BLOCK_SIZE).astype(np.uint32)
+
+    table = _crc_table()
+    crcs = np.zeros(num_blocks, dtype=np.uint32)
+    for j in range(_CRC_BLOCK_SIZE):
+        crcs = (crcs >> 8) ^ table[(crcs ^ blocks[:, j]) & 0xFF]
+
+    advance_lo, advance_hi = _crc_zero_advance_tables()
+    crc = 0
+    for block_crc in crcs.tolist():
+        crc = advance_lo[crc & 0xFF] ^ advance_hi[crc >> 8] ^ block_crc
+    return crc
+
+
+# ------------------------------------------------------------------------------
+# Message scanning
+# ------------------------------------------------------------------------------
+
+class _Definition:
+    __slots__ = ('mesg_num', 'endian', 'fields', 'size', 'has_dev_fields', 'timestamp', 'rows', 'order', 'compressed_ts')
+
+    def __init__(self, mesg_num, endian, fields, size, has_dev_fields):
+        self.mesg_num = mesg_num
+        self.endian = endian
+        # (def_num, offset, size, base_type) for every regular field
+        self.fields = fields
+        self.size = size
+        self.has_dev_fields = has_dev_fields
+        self.timestamp = None
+        for def_num, offset, field_size, base_type in fields:
+            if def_num == TIMESTAMP_DEF_NUM:
+                if field_size != base_type.size or base_type.name not in _INVALID_VALUES:
+                    raise UnsupportedFitLayout("Unusual timestamp field")
+                self.timestamp = (offset, endian + base_type.fmt, _INVALID_VALUES[base_type.name])
+        # Record rows using this definition: data offsets, message order and
+        # compressed-header timestamps (-1 when the row has a normal header)
+        self.rows = []
+        self.order = []
+        self.compressed_ts = []
+
+
+def _compressed_timestamp(time_offset, accumulator):
+    base = time_offset + (accumulator & ~0x1F)
+    if time_offset < (accumulator & 0x1F):
+        base += 0x20
+    return base
+
+
+def _scan(data):
+    """
+    Walks every message header once. Returns the record definitions (with the
+    row offsets that use them) and a reduced FIT stream without record data
+    messages, for fitparse to decode the rest.
+    """
+    record_defs = []
+    reduced = []
+    record_count = 0
+    pos = 0
+    total = len(data)
+
+    while pos < total:
+        if total - pos < 12 or data[pos + 8:pos + 12] != b'.FIT':
+            raise UnsupportedFitLayout("Invalid .FIT File Header")
+        header_size = data[pos]
+        data_size = struct.unpack_from('<I', data, pos + 4)[0]
+        versions = data[pos + 1:pos + 4]
+        start, end = pos + header_size, pos + header_size + data_size
+        if end + 2 > total:
+            raise UnsupportedFitLayout("Truncated .FIT File")
+        if header_size >= 14:
+            header_crc = struct.unpack_from('<H', data, pos + 12)[0]
+            if header_crc and fit_crc(data[pos:pos + 12]) != header_crc:
+                raise UnsupportedFitLayout("Header CRC mismatch")
+        if fit_crc(data[pos:end + 2]) != 0:
+            raise UnsupportedFitLayout("CRC mismatch")
+
+        segment = []
+        local_defs = {}
+        ts_accumulator = 0
+        pos = start
+        while pos < end:
+            header = data[pos]
+            if header & 0x80:
+                local_num, time_offset = (header >> 5) & 0x3, header & 0x1F
+                is_definition = False
+            else:
+                local_num, time_offset = header & 0xF, None
+                is_definition = bool(header & 0x40)
+
+            if is_definition:
+                endian = '>' if data[pos + 2] else '<'
+                mesg_num, num_fields = struct.unpack_from(endian + 'HB', data, pos + 3)
+                cursor = pos + 6
+                fields, offset = [], 0
+                for i in range(num_fields):
+                    def_num, field_size, base_type_num = data[cursor + 3 * i:cursor + 3 * i + 3]
+                    base_type = BASE_TYPES.get(base_type_num, BASE_TYPE_BYTE)
+                    if field_size % base_type.size:
+                        raise UnsupportedFitLayout("Invalid field size")
+                    fields.append((def_num, offset, field_size, base_type))
+                    offset += field_size
+                cursor += 3 * num_fields
+                has_dev_fields = bool(header & 0x20)
+                if has_dev_fields:
+                    num_dev_fields = data[cursor]
+                    offset += sum(data[cursor + 2 + 3 * i] for i in range(num_dev_fields))
+                    cursor += 1 + 3 * num_dev_fields
+                definition = _Definition(mesg_num, endian, fields, offset, has_dev_fields)
+                local_defs[local_num] = definition
+                if mesg_num == RECORD_MESG_NUM:
+                    record_defs.append(definition)
+                segment.append(data[pos:cursor])
+                pos = cursor
+                continue
+
+            definition = local_defs.get(local_num)
+            if definition is None:
+                raise UnsupportedFitLayout("Data message with undefined local message type")
+            body = pos + 1
+            if definition.timestamp is not None:
+                offset, fmt, invalid = definition.timestamp
+                raw_ts = struct.unpack_from(fmt, data, body + offset)[0]
+                if raw_ts != invalid:
+                    ts_accumulator = raw_ts
+            compressed_ts = -1
+            if time_offset is not None:
+                compressed_ts = ts_accumulator = _compressed_timestamp(time_offset, ts_accumulator)
+
+            if definition.mesg_num == RECORD_MESG_NUM:
+                definition.rows.append(body)
+                definition.order.append(record_count)
+                definition.compressed_ts.append(compressed_ts)
+                record_count += 1
+            else:
+                if time_offset is not None:
+                    # Dropping records would change this message's timestamp
+                    raise UnsupportedFitLayout("Compressed timestamp on a non-record message")
+                segment.append(data[pos:body + definition.size])
+            pos = body + definition.size
+
+        # Rebuild the segment with a plain 12-byte header; fitparse reads it
+        # with CRC checks off since the CRC was verified above.
+        body = b''.join(segment)
+        reduced.append(bytes([12]) + versions + struct.pack('<I', len(body)) + b'.FIT' + body + b'\x00\x00')
+        pos = end + 2
+
+    return record_defs, record_count, b''.join(reduced)
+
+
+# ------------------------------------------------------------------------------
+# Column decoding
+# ------------------------------------------------------------------------------
+
+def _raw_column(rows, offset, size, base_type, endian):
+    """Returns (values, valid) for one scalar field across all rows."""
+    type_name = base_type.name
+    if type_name not in _NUMPY_TYPES or size != base_type.size:
+        raise UnsupportedFitLayout(f"Unsupported field type '{type_name}' of size {size}")
+    dtype = np.dtype(_NUMPY_TYPES[type_name]).newbyteorder(endian)
+    values = np.ascontiguousarray(rows[:, offset:offset + size]).view(dtype)[:, 0]
+    if values.dtype.kind == 'f':
+        values = values.astype(np.float64)
+        return values, ~np.isnan(values)
+    valid = values != _INVALID_VALUES[type_name]
+    if values.dtype == np.uint64 and int(values[valid].max(initial=0)) > np.iinfo(np.int64).max:
+        raise UnsupportedFitLayout("uint64 value out of range")
+    return values.astype(np.int64), valid
+
+
+def _scale_offset(values, valid, scale, offset):
+    """Mirrors fitparse's FitFile._apply_scale_offset on a whole column."""
+    kind = KIND_FLOAT if values.dtype.kind == 'f' else KIND_INT
+    if scale:
+        values = values.astype(np.float64) / scale
+        kind = KIND_FLOAT
+    if offset:
+        values = values - offset
+    if kind == KIND_FLOAT:
+        values = np.where(valid, values, np.nan)
+        return Column(KIND_FLOAT, values)
+    return Column(KIND_INT, values, None if valid.all() else valid)
+
+
+def _field_wanted(field, fields):
+    if field is None:
+        return False
+    names = {field.name} | {RECORD_FIELDS[component.def_num].name for component in field.components or ()}
+    return not names.isdisjoint(fields)
+
+
+def _decode_definition(buf, definition, fields=None):
+    """
+    Decodes every row of one record definition. Returns the fields in the
+    order fitparse's DataMessage.get_values() would produce them, or only
+    those named in ``fields``.
+    """
+    if definition.has_dev_fields:
+        raise UnsupportedFitLayout("Developer fields in record messages")
+
+    index = np.asarray(definition.rows, dtype=np.int64)[:, None] + np.arange(definition.size)
+    rows = buf[index] if definition.size else np.zeros((len(definition.rows), 0), dtype=np.uint8)
+    output = {}
+
+    for def_num, offset, size, base_type in definition.fields:
+        field = RECORD_FIELDS.get(def_num)
+        if fields is not None and not _field_wanted(field, fields):
+            continue
+        raw, valid = _raw_column(rows, offset, size, base_type, definition.endian)
+        if field is None:
+            output[f'unknown_{def_num}'] = _scale_offset(raw, valid, None, None)
+            continue
+        if field.subfields or (field.type.name in _PROCESSED_TYPES and def_num != TIMESTAMP_DEF_NUM):
+            raise UnsupportedFitLayout(f"Field '{field.name}' needs subfield or type processing")
+
+        # Components are emitted before the field itself, as in fitparse
+        for component in field.components or ():
+            cmp_field = RECORD_FIELDS[component.def_num]
+            if (component.accumulate or raw.dtype.kind == 'f' or cmp_field.subfields
+                    or cmp_field.type.values or cmp_field.type.name in _PROCESSED_TYPES):
+                raise UnsupportedFitLayout(f"Unsupported component '{component.name}'")
+            cmp_raw = (raw >> component.bit_offset) & ((1 << component.bits) - 1)
+            output[cmp_field.name] = _scale_offset(cmp_raw, valid, component.scale, component.offset)
+
+        if field.type.values:
+            if field.scale or field.offset:
+                raise UnsupportedFitLayout(f"Scaled enum field '{field.name}'")
+            names = field.type.values
+            column = Column(KIND_JSON, [
+                names.get(value, value) if ok else None
+                for value, ok in zip(raw.tolist(), valid.tolist())
+            ])
+        else:
+            column = _scale_offset(raw, valid, field.scale, field.offset)
+        output[field.name] = column
+
+    compressed = np.asarray(definition.compressed_ts, dtype=np.int64)
+    has_compressed = compressed >= 0
+    if has_compressed.any() and (fields is None or FIELD_TYPE_TIMESTAMP.name in fields):
+        timestamp = output.get(FIELD_TYPE_TIMESTAMP.name)
+        if timestamp is not None and timestamp.kind == KIND_INT:
+            values = np.where(has_compressed, compressed, timestamp.values)
+            valid = has_compressed | (timestamp.valid if timestamp.valid is not None else True)
+        else:
+            values, valid = compressed, has_compressed
+        output[FIELD_TYPE_TIMESTAMP.name] = Column(KIND_INT, values, None if valid.all() else valid)
+    return output
+
+
+def _merge_groups(groups, length):
+    """Combines per-definition columns into one ColumnarSeries in message order."""
+    names = {}
+    for _, output in groups:
+        for name in output:
+            names.setdefault(name, None)
+
+    columns = {}
+    for name in names:
+        kinds = {output[name].kind for _, output in groups if name in output}
+        kind = kinds.pop() if len(kinds) == 1 else KIND_JSON
+        present = np.zeros(length, dtype=bool)
+        if kind == KIND_JSON:
+            values = [None] * length
+        else:
+            values = np.zeros(length, dtype=np.int64) if kind == KIND_INT else np.full(length, np.nan)
+            valid = np.zeros(length, dtype=bool)
+
+        for order, output in groups:
+            column = output.get(name)
+            if column is None:
+                continue
+            present[order] = True
+            if kind == KIND_JSON:
+                for i, value in zip(order.tolist(), column.to_list()):
+                    values[i] = value
+            else:
+                values[order] = column.values
+                valid[order] = column.valid if column.valid is not None else True
+
+        present = None if present.all() else present
+        if kind == KIND_JSON:
+            columns[name] = Column(KIND_JSON, values, present=present)
+        elif kind == KIND_FLOAT:
+            columns[name] = Column(KIND_FLOAT, values, present=present)
+        else:
+            # Rows without the key count as valid so `valid` only marks nulls
+            if present is not None:
+                valid |= ~present
+            columns[name] = Column(KIND_INT, values, None if valid.all() else valid, present)
+    return ColumnarSeries(length, columns)
+
+
+def decode_fit_file(file_path, fields=None):
+    """
+    Decodes a FIT file's record messages column-wise, all fields or only the
+    named ``fields`` (plus whatever shares their source field). Raises
+    UnsupportedFitLayout if the file needs the full fitparse decoder.
+    """
+    data = read_session_file(file_path)
+
+    record_defs, record_count, reduced = _scan(data)
+    buf = np.frombuffer(data, dtype=np.uint8)
+    groups = [
+        (np.asarray(definition.order, dtype=np.int64), _decode_definition(buf, definition, fields))
+        for definition in record_defs if definition.rows
+    ]
+    records = _merge_groups(groups, record_count)
+    fitfile = fitparse.FitFile(io.BytesIO(reduced), check_crc=False)
+    return FitDecodeResult(records, fitfile)
+
@@ -0,0 +1,111 @@
+# backend/volunteers/instrumentation.py
+
+import contextlib
+import contextvars
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# ==============================================================================
+# PROCESSING STAGE TIMING
+# ==============================================================================
+# process_session_file runs inside tracing(). The code of each pipeline stage
+# marks itself with ``with stage(...)``; outside a trace that costs nothing,
+# so the parsers and models stay usable on their own (and in the worker
+# processes of reprocess_sessions, which record no metrics).
+#
+# Stage times are exclusive: while a nested stage runs the enclosing one's
+# clock is paused, so the stages of a trace add up to its total time. For
+# example the 'summary' work done inside the 'db_write' transaction is not
+# counted twice.
+
+STAGE_FETCH = 'fetch'           # getting a local copy of the file and hashing it
+STAGE_PARSE = 'parse'           # the format parser: file -> records and totals
+STAGE_TRANSFORM = 'transform'   # records <-> the columnar encoding
+STAGE_SUMMARY = 'summary'       # downsample pyramid, statistics, anomaly detection
+STAGE_DB_WRITE = 'db_write'     # everything else inside the write transaction
+
+STAGES = (STAGE_FETCH, STAGE_PARSE, STAGE_TRANSFORM, STAGE_SUMMARY, STAGE_DB_WRITE)
+
+_current_trace = contextvars.ContextVar('processing_trace', default=None)
+
+
+def peak_rss_bytes():
+    """This process's peak resident set size so far, in bytes (None if unknown)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class ProcessingTrace:
+    """
+    Seconds spent in each stage of one run of the pipeline, and what the
+    pipeline noted about the file along the way.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.file_type = None
+        self.parser_version = None
+        self.cached_result = False
+        self.num_records = None
+        self.bytes_in = None
+        self.bytes_out = None
+        self.started = time.perf_counter()
+        self.finished = None
+        self._running = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        now = time.perf_counter()
+        if self._running:
+            self._pause(self._running[-1], now)
+        self._running.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            self._pause(self._running.pop(), now)
+            if self._running:
+                self._running[-1][1] = now
+
+    def _pause(self, running, now):
+        name, since = running
+        self.seconds[name] = self.seconds.get(name, 0.0) + (now - since)
+
+    @property
+    def total_seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+
+@contextlib.contextmanager
+def tracing():
+    """Traces the stages run in this block; yields the ProcessingTrace."""
+    trace = ProcessingTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        trace.finished = time.perf_counter()
+        _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Counts the block as stage ``name`` of the current trace, if any."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.stage(name):
+        yield
@@ -0,0 +1,54 @@
+import glob
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from volunteers.utils import analyze_fit_file, _analyze_fit_records, clean_summary_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the vectorized FIT decoder against the per-record fitparse loop "
+        "over a directory of .fit files and checks that both produce the same output."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directory', nargs='?', default=os.path.join(settings.BASE_DIR, 'session_files'),
+            help="Directory containing .fit files (defaults to the session_files corpus)",
+        )
+        parser.add_argument('--limit', type=int, default=None, help="Only benchmark the first N files")
+
+    def handle(self, *args, **options):
+        paths = sorted(glob.glob(os.path.join(options['directory'], '*.fit')))[:options['limit']]
+        if not paths:
+            self.stderr.write("No .fit files found.")
+            return
+
+        vectorized_secs = per_record_secs = 0.0
+        num_records = 0
+        mismatches = []
+        for path in paths:
+            start = time.perf_counter()
+            expected = _analyze_fit_records(path)
+            per_record_secs += time.perf_counter() - start
+
+            start = time.perf_counter()
+            actual = analyze_fit_file(path)
+            vectorized_secs += time.perf_counter() - start
+
+            if actual[1] is not None:
+                num_records += len(actual[1])
+            if (clean_summary_data(actual[0]), actual[1]) != (clean_summary_data(expected[0]), expected[1]):
+                mismatches.append(os.path.basename(path))
+
+        self.stdout.write(f"Files:       {len(paths)} ({num_records} records)")
+        self.stdout.write(f"Per-record:  {per_record_secs:.2f}s ({num_records / per_record_secs:,.0f} records/s)")
+        self.stdout.write(f"Vectorized:  {vectorized_secs:.2f}s ({num_records / vectorized_secs:,.0f} records/s)")
+        self.stdout.write(f"Speedup:     {per_record_secs / vectorized_secs:.1f}x")
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f"{len(mismatches)} file(s) differ: {', '.join(mismatches)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Outputs match for every file."))
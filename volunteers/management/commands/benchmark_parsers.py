@@ -0,0 +1,208 @@
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from volunteers.utils import (
+    PARSER_VERSION, analyze_csv_file, analyze_fit_file, analyze_gpx_file, analyze_tcx_file, clean_summary_data,
+)
+
+ANALYZERS = {
+    '.fit': analyze_fit_file,
+    '.tcx': analyze_tcx_file,
+    '.csv': analyze_csv_file,
+    '.gpx': analyze_gpx_file,
+}
+
+# Metrics compared against the baseline, and whether a higher value is better
+METRICS = {
+    'parse_records_per_sec': True,
+    'parse_mb_per_sec': True,
+    'clean_summaries_per_sec': True,
+    'json_mb_per_sec': True,
+    'peak_memory_mb': False,
+}
+
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Times every parser, clean_summary_data() and the JSON serialization of "
+        "the results over the session_files corpus, reports per-format throughput "
+        "and peak memory, and compares them with a saved baseline. Exits with an "
+        "error if a metric regressed by more than the tolerance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directory', nargs='?', default=os.path.join(settings.BASE_DIR, 'session_files'),
+            help="Directory of session files (defaults to the session_files corpus)",
+        )
+        parser.add_argument(
+            '--format', dest='formats', nargs='+', choices=sorted(ANALYZERS),
+            help="Only these formats (defaults to every format present)",
+        )
+        parser.add_argument('--limit', type=int, default=None, help="Only the first N files of each format")
+        parser.add_argument('--repeat', type=int, default=3, help="Timed runs per file (the fastest counts)")
+        parser.add_argument(
+            '--baseline', default=os.path.join(settings.BASE_DIR, '.benchmarks', 'parsers.json'),
+            help="Baseline file to compare with or save to",
+        )
+        parser.add_argument('--save-baseline', action='store_true', help="Save the results as the new baseline")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.15,
+            help="Allowed relative slowdown or memory growth before the run fails (default 0.15)",
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        corpus = self.find_files(options['directory'], options['formats'], options['limit'])
+        if not corpus:
+            raise CommandError(f"No session files found in {options['directory']}.")
+
+        results = {}
+        for extension, paths in corpus.items():
+            self.stdout.write(f"Benchmarking {len(paths)} {extension} file(s)...")
+            results[extension] = self.benchmark(ANALYZERS[extension], paths, options['repeat'])
+        self.report(results)
+
+        baseline = self.load_baseline(options['baseline'])
+        regressions = self.compare(baseline, results, options['tolerance']) if baseline else []
+        if options['save_baseline']:
+            self.save_baseline(options['baseline'], results)
+        elif baseline is None:
+            self.stdout.write(f"No baseline at {options['baseline']}; run with --save-baseline to record one.")
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} metric(s) regressed by more than {options['tolerance']:.0%}: {', '.join(regressions)}"
+            )
+
+    def find_files(self, directory, formats, limit):
+        corpus = {}
+        for extension in formats or ANALYZERS:
+            paths = sorted(
+                os.path.join(directory, name) for name in os.listdir(directory)
+                if name.lower().endswith(extension)
+            )[:limit]
+            if paths:
+                corpus[extension] = paths
+        return corpus
+
+    def benchmark(self, analyze, paths, repeat):
+        """Times one format's files; unreadable files are counted but not timed."""
+        parse_secs = clean_secs = json_secs = 0.0
+        num_bytes = num_records = json_bytes = 0
+        peak_memory = 0
+        readable = 0
+        for path in paths:
+            # First run: output, sizes and peak memory (tracing slows it down,
+            # so it isn't timed)
+            gc.collect()
+            tracemalloc.start()
+            try:
+                summary_data, records = analyze(path)
+            except Exception:
+                summary_data, records = None, None
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            if summary_data is None and records is None:
+                continue
+            readable += 1
+            num_bytes += os.path.getsize(path)
+            num_records += len(records or ())
+
+            parse_secs += min(self.time_call(analyze, path) for _ in range(repeat))
+            clean_secs += min(self.time_call(clean_summary_data, summary_data) for _ in range(repeat))
+            payload = {'summary': clean_summary_data(summary_data), 'timeseries_data': records}
+            json_secs += min(self.time_call(json.dumps, payload, cls=DjangoJSONEncoder) for _ in range(repeat))
+            json_bytes += len(json.dumps(payload, cls=DjangoJSONEncoder))
+
+        return {
+            'files': len(paths),
+            'unreadable': len(paths) - readable,
+            'records': num_records,
+            'mb': num_bytes / MB,
+            'parse_secs': parse_secs,
+            'parse_records_per_sec': num_records / parse_secs if parse_secs else 0.0,
+            'parse_mb_per_sec': num_bytes / MB / parse_secs if parse_secs else 0.0,
+            'clean_summaries_per_sec': readable / clean_secs if clean_secs else 0.0,
+            'json_mb': json_bytes / MB,
+            'json_mb_per_sec': json_bytes / MB / json_secs if json_secs else 0.0,
+            'peak_memory_mb': peak_memory / MB,
+        }
+
+    @staticmethod
+    def time_call(function, *args, **kwargs):
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        return time.perf_counter() - start
+
+    def report(self, results):
+        self.stdout.write(
+            f"\n{'Format':<7} {'Files':>6} {'Bad':>4} {'Records':>10} {'MB':>8} {'Parse s':>8} "
+            f"{'records/s':>11} {'MB/s':>7} {'clean/s':>10} {'JSON MB/s':>10} {'Peak MB':>8}"
+        )
+        for extension, r in results.items():
+            self.stdout.write(
+                f"{extension:<7} {r['files']:>6} {r['unreadable']:>4} {r['records']:>10,} {r['mb']:>8.1f} "
+                f"{r['parse_secs']:>8.2f} {r['parse_records_per_sec']:>11,.0f} {r['parse_mb_per_sec']:>7.2f} "
+                f"{r['clean_summaries_per_sec']:>10,.0f} {r['json_mb_per_sec']:>10.1f} {r['peak_memory_mb']:>8.1f}"
+            )
+
+    def load_baseline(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_baseline(self, path, results):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        baseline = {
+            'created_at': timezone.now().isoformat(),
+            'parser_version': PARSER_VERSION,
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'results': results,
+        }
+        with open(path, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Baseline saved to {path}."))
+
+    def compare(self, baseline, results, tolerance):
+        """Prints each metric against the baseline and returns the regressed ones."""
+        self.stdout.write(
+            f"\nCompared with the baseline of {baseline['created_at']} "
+            f"(parser {baseline['parser_version']}, {baseline['machine']}):"
+        )
+        regressions = []
+        for extension, current in results.items():
+            previous = baseline['results'].get(extension)
+            if previous is None:
+                self.stdout.write(f"{extension}: not in the baseline")
+                continue
+            if (previous['files'], previous['records']) != (current['files'], current['records']):
+                self.stdout.write(self.style.WARNING(
+                    f"{extension}: the corpus differs from the baseline's "
+                    f"({previous['files']} files, {previous['records']:,} records)"
+                ))
+            for metric, higher_is_better in METRICS.items():
+                before, now = previous[metric], current[metric]
+                change = (now - before) / before if before else 0.0
+                regressed = -change > tolerance if higher_is_better else change > tolerance
+                line = f"  {extension:<5} {metric:<24} {before:>12,.2f} -> {now:>12,.2f} ({change:+.1%})"
+                if regressed:
+                    regressions.append(f"{extension} {metric}")
+                    self.stdout.write(self.style.ERROR(f"{line} REGRESSION"))
+                else:
+                    self.stdout.write(line)
+        return regressions
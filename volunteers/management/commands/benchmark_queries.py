@@ -0,0 +1,145 @@
+import datetime
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from volunteers.models import RunningSession, Volunteer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic data set of volunteers and sessions, times the API's "
+        "query patterns with and without the model indexes and prints their "
+        "query plans. Everything runs in one transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sessions', type=int, default=50000, help="Synthetic sessions to create")
+        parser.add_argument('--volunteers', type=int, default=2000, help="Synthetic volunteers to create")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query (the median is reported)")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write("Synthetic data rolled back.")
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        start = time.perf_counter()
+        volunteers, sessions = self.seed(rng, options['volunteers'], options['sessions'])
+        self.analyze()
+        self.stdout.write(
+            f"Seeded {options['volunteers']} volunteers and {options['sessions']} sessions "
+            f"in {time.perf_counter() - start:.1f}s ({connection.vendor})."
+        )
+
+        queries = self.get_queries(rng, volunteers, sessions)
+        indexed = {name: self.measure(query, options['repeat']) for name, query in queries}
+        self.drop_indexes()
+        unindexed = {name: self.measure(query, options['repeat']) for name, query in queries}
+
+        self.stdout.write(f"\n{'Query':<34} {'indexed':>10} {'no index':>10} {'speedup':>8}")
+        for name, _ in queries:
+            with_ms, without_ms = indexed[name][0], unindexed[name][0]
+            self.stdout.write(
+                f"{name:<34} {with_ms:>8.2f}ms {without_ms:>8.2f}ms {without_ms / max(with_ms, 1e-6):>7.1f}x"
+            )
+        for name, _ in queries:
+            self.stdout.write(f"\n{name}")
+            self.stdout.write(f"  indexed:  {indexed[name][1]}")
+            self.stdout.write(f"  no index: {unindexed[name][1]}")
+
+    def seed(self, rng, num_volunteers, num_sessions):
+        now = timezone.now()
+        statuses = ['pending'] * 2 + ['approved'] * 7 + ['rejected']
+        volunteers = Volunteer.objects.bulk_create([
+            Volunteer(
+                status=rng.choice(statuses), first_name=f"Bench{i}", last_name="Volunteer",
+                email=f"bench.volunteer{i}@example.com", gender=rng.choice(['male', 'female']),
+                nationality='Thai', date_of_birth=datetime.date(1970 + i % 35, 1 + i % 12, 1),
+                platform='Garmin', smartwatch='Forerunner', run_frequency='3-4 times a week',
+            )
+            for i in range(num_volunteers)
+        ], batch_size=1000)
+        # auto_now_add stamps them all with the same instant; spread them out
+        for i, volunteer in enumerate(volunteers):
+            volunteer.registration_date = now - datetime.timedelta(hours=i)
+        Volunteer.objects.bulk_update(volunteers, ['registration_date'], batch_size=1000)
+
+        session_statuses = ['completed'] * 97 + ['failed'] * 2 + ['processing']
+        sessions = []
+        for i in range(num_sessions):
+            duration = rng.uniform(900, 7200)
+            sessions.append(RunningSession(
+                volunteer=rng.choice(volunteers), session_date=now - datetime.timedelta(minutes=rng.randrange(0, 3 * 365 * 1440)),
+                source_type='benchmark', status=rng.choice(session_statuses),
+                total_distance_km=round(duration / 360 * rng.uniform(0.8, 1.3), 2),
+                total_duration_secs=round(duration), avg_heart_rate=rng.randint(110, 175),
+                max_heart_rate=rng.randint(160, 205),
+            ))
+        sessions = RunningSession.objects.bulk_create(sessions, batch_size=2000)
+        return volunteers, sessions
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def get_queries(self, rng, volunteers, sessions):
+        """(name, queryset) pairs mirroring the API's access paths."""
+        volunteer = rng.choice(volunteers)
+        middle = sorted(sessions, key=lambda s: (s.session_date, s.id), reverse=True)[len(sessions) // 2]
+        today = timezone.localdate()
+        return [
+            ('sessions: newest first', RunningSession.objects.order_by('-session_date', '-id')[:100]),
+            ('sessions: one volunteer', RunningSession.objects.filter(volunteer=volunteer).order_by('-session_date', '-id')[:100]),
+            ('sessions: keyset deep page', RunningSession.objects.filter(session_date__lte=middle.session_date).filter(
+                Q(session_date__lt=middle.session_date) | Q(id__lt=middle.id)).order_by('-session_date', '-id')[:100]),
+            ('sessions: ordering=-avg_heart_rate', RunningSession.objects.order_by('-avg_heart_rate')[:100]),
+            ('sessions: ordering=total_distance', RunningSession.objects.order_by('total_distance_km')[:100]),
+            ('sessions: failed', RunningSession.objects.filter(status='failed').order_by('id')),
+            ('sessions: processing', RunningSession.objects.filter(status='processing').order_by('id')),
+            ('sessions: last 30 days', RunningSession.objects.filter(
+                RunningSession.date_range(today - datetime.timedelta(days=30), today), status='completed')),
+            ('volunteers: pending, newest', Volunteer.objects.filter(status='pending').order_by('-registration_date')[:100]),
+            ('volunteers: newest', Volunteer.objects.order_by('-registration_date')[:100]),
+            ('volunteers: email check', Volunteer.objects.alias(email_upper=Upper('email')).filter(
+                email_upper=Upper(Value(volunteer.email.upper())))),
+        ]
+
+    def measure(self, queryset, repeat):
+        """Returns the median time in milliseconds and a one-line query plan."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        plan = ' | '.join(line.strip() for line in queryset.explain().splitlines() if line.strip())
+        return statistics.median(timings), plan
+
+    def drop_indexes(self):
+        """Removes the Meta indexes and restores the plain foreign-key index on volunteer."""
+        # Plain SQL: SQLite's schema editor can't run inside the open transaction
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model in (RunningSession, Volunteer):
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {quote(index.name)}")
+            cursor.execute(
+                f"CREATE INDEX bench_session_volunteer_idx ON {quote(RunningSession._meta.db_table)} "
+                f"({quote(RunningSession._meta.get_field('volunteer').column)})"
+            )
+        self.analyze()
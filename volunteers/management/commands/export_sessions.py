@@ -0,0 +1,54 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from volunteers.export import EXPORT_CSV, EXPORT_FORMATS, iter_export
+from volunteers.models import RunningSession
+from volunteers.serializers import SessionExportSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports the samples, anomaly labels and volunteer metadata of a filtered "
+        "set of sessions as one CSV, Parquet or Arrow stream file for model training."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="File to write, or - for standard output")
+        parser.add_argument('--format', dest='file_format', choices=list(EXPORT_FORMATS), default=EXPORT_CSV)
+        parser.add_argument('--volunteer', type=int, help="Only sessions of this volunteer ID")
+        parser.add_argument('--date-from', help="Only sessions on or after this date (YYYY-MM-DD)")
+        parser.add_argument('--date-to', help="Only sessions on or before this date (YYYY-MM-DD)")
+        parser.add_argument(
+            '--status', choices=[choice for choice, _ in RunningSession.STATUS_CHOICES],
+            default=RunningSession.STATUS_COMPLETED,
+        )
+        parser.add_argument('--labeled', action='store_true', help="Only sessions with labeled samples or an admin label")
+        parser.add_argument('--fields', help="Comma-separated channels to export (default: all)")
+
+    def handle(self, *args, **options):
+        query = {
+            key: options[key] for key in ('file_format', 'volunteer', 'date_from', 'date_to', 'status', 'labeled', 'fields')
+            if options[key] is not None
+        }
+        export = SessionExportSerializer(data=query)
+        if not export.is_valid():
+            raise CommandError(export.errors)
+        sessions = export.filter(RunningSession.objects.all())
+
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        exported = written = 0
+
+        def count_session(session):
+            nonlocal exported
+            exported += 1
+
+        try:
+            chunks = iter_export(sessions, options['file_format'], export.validated_data.get('fields'), count_session)
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(f"Exported {exported} session(s), {written / 1e6:.1f} MB."))
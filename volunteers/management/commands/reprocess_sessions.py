@@ -0,0 +1,215 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from volunteers.caching import invalidate_sessions
+from volunteers.models import ParsedFileResult, RunningSession
+from volunteers.session_files import stored_file_path
+from volunteers.tasks import PARSE_RESULT_FIELDS, SUMMARY_FIELDS, apply_parse_result, apply_summary, store_parse_result
+from volunteers.utils import PARSER_VERSION, parse_session_file, session_file_type, summarize_session_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-analyzes the files of a filtered set of running sessions in a local "
+        "process pool and writes the results back in batched transactions. Use "
+        "it after a parser change instead of queueing one Celery task per session."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', type=int, nargs='+', help="Only these session IDs")
+        parser.add_argument('--volunteer', type=int, help="Only sessions of this volunteer ID")
+        parser.add_argument(
+            '--status', nargs='+', choices=[choice for choice, _ in RunningSession.STATUS_CHOICES],
+            help="Only sessions with one of these statuses",
+        )
+        parser.add_argument('--file-type', nargs='+', help="Only these extensions, e.g. .fit .tcx")
+        parser.add_argument(
+            '--resume', action='store_true',
+            help=f"Skip sessions already processed by the current parser version ({PARSER_VERSION})",
+        )
+        parser.add_argument(
+            '--summary-only', action='store_true',
+            help="Only refresh the distance, duration and heart-rate totals; "
+                 "samples, labels and scores are left as they are",
+        )
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help="Parse every file again even if a cached result exists for its content hash",
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Number of parser processes (defaults to the number of CPU cores)",
+        )
+        parser.add_argument('--batch-size', type=int, default=50, help="Sessions written per transaction")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--workers and --batch-size must be at least 1.")
+
+        # IDs are fetched up front so rows can be updated while we walk them
+        session_ids = list(self.get_queryset(options).values_list('id', flat=True))
+        total = len(session_ids)
+        if not total:
+            self.stdout.write("No sessions to reprocess.")
+            return
+        self.stdout.write(f"Reprocessing {total} session(s) with {options['workers']} worker(s)...")
+
+        self.total = total
+        self.summary_only = options['summary_only']
+        self.done = self.failed = self.cache_hits = 0
+        self.started = time.perf_counter()
+        batch_size = options['batch_size']
+        pending = []
+
+        # Spawned workers import only the parsers; they never inherit this
+        # process's database connections.
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as pool:
+            in_flight = {}
+            for session in self.iter_sessions(session_ids, batch_size):
+                result = None
+                if not options['no_cache'] and not self.summary_only and session.content_hash:
+                    result = ParsedFileResult.lookup(
+                        session.content_hash, session_file_type(session.session_file.name), PARSER_VERSION
+                    )
+                if result is not None:
+                    self.cache_hits += 1
+                    pending.append((session, result))
+                else:
+                    try:
+                        in_flight[self.submit(pool, session)] = session
+                    except Exception as e:
+                        # The stored file couldn't be fetched
+                        pending.append((session, e))
+
+                # Keep a bounded number of files in flight so memory stays flat
+                while len(in_flight) >= options['workers'] * 2:
+                    pending.extend(self.collect(in_flight))
+                if len(pending) >= batch_size:
+                    self.write_batch(pending)
+                    pending = []
+
+            while in_flight:
+                pending.extend(self.collect(in_flight))
+                if len(pending) >= batch_size:
+                    self.write_batch(pending)
+                    pending = []
+        self.write_batch(pending)
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {self.done} session(s) in {elapsed:.1f}s ({self.done / elapsed:.1f}/s), "
+            f"{self.cache_hits} from cache, {self.failed} failed."
+        ))
+
+    def get_queryset(self, options):
+        sessions = RunningSession.objects.exclude(session_file='').exclude(session_file=None).order_by('id')
+        if options['ids']:
+            sessions = sessions.filter(id__in=options['ids'])
+        if options['volunteer'] is not None:
+            sessions = sessions.filter(volunteer_id=options['volunteer'])
+        if options['status']:
+            sessions = sessions.filter(status__in=options['status'])
+        if options['file_type']:
+            extensions = Q()
+            for ext in options['file_type']:
+                extensions |= Q(session_file__iendswith=ext if ext.startswith('.') else f'.{ext}')
+            sessions = sessions.filter(extensions)
+        if options['resume']:
+            sessions = sessions.exclude(parser_version=PARSER_VERSION)
+        return sessions
+
+    def iter_sessions(self, session_ids, chunk_size):
+        for i in range(0, len(session_ids), chunk_size):
+            yield from RunningSession.objects.filter(id__in=session_ids[i:i + chunk_size]).select_related('volunteer').order_by('id')
+
+    def submit(self, pool, session):
+        """
+        Queues a session's file on the pool. Files on remote storage are first
+        fetched into the local cache, where the workers read them.
+        """
+        file_path = stored_file_path(session.session_file, session.content_hash)
+        if self.summary_only:
+            return pool.submit(summarize_session_file, file_path)
+        return pool.submit(parse_session_file, file_path, session.content_hash)
+
+    def collect(self, in_flight):
+        """Waits for at least one parser process and returns (session, result-or-error) pairs."""
+        finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        pairs = []
+        for future in finished:
+            session = in_flight.pop(future)
+            try:
+                if self.summary_only:
+                    pairs.append((session, future.result()))
+                else:
+                    pairs.append((session, ParsedFileResult.remember(PARSER_VERSION, future.result())))
+            except Exception as e:
+                pairs.append((session, e))
+        return pairs
+
+    def write_batch(self, pairs):
+        """
+        Writes one batch of results in a single transaction and reports
+        progress. Each session is written in its own savepoint, so one that
+        fails to store is marked failed without undoing the others.
+        """
+        if not pairs:
+            return
+        if self.summary_only:
+            self.write_summaries(pairs)
+            return
+        with transaction.atomic():
+            updated = []
+            for session, result in pairs:
+                if not isinstance(result, Exception):
+                    previous = {field: getattr(session, field) for field in PARSE_RESULT_FIELDS}
+                    try:
+                        with transaction.atomic():
+                            apply_parse_result(session, result)
+                            store_parse_result(session, result)
+                    except Exception as e:
+                        # Leave the session's columns as they were, like its rolled back rows
+                        for field, value in previous.items():
+                            setattr(session, field, value)
+                        result = e
+                if isinstance(result, Exception):
+                    self.failed += 1
+                    self.stderr.write(f"Session {session.id}: {result}")
+                    session.status = RunningSession.STATUS_FAILED
+                    session.processing_error = str(result)
+                updated.append(session)
+            RunningSession.objects.bulk_update(updated, PARSE_RESULT_FIELDS)
+            invalidate_sessions([session.id for session in updated])
+        self.report(len(pairs))
+
+    def write_summaries(self, pairs):
+        """--summary-only: updates the totals; a file that fails leaves its session untouched."""
+        updated = []
+        for session, summary_data in pairs:
+            if isinstance(summary_data, Exception):
+                self.failed += 1
+                self.stderr.write(f"Session {session.id}: {summary_data}")
+                continue
+            apply_summary(session, summary_data)
+            updated.append(session)
+        with transaction.atomic():
+            RunningSession.objects.bulk_update(updated, SUMMARY_FIELDS)
+            invalidate_sessions([session.id for session in updated])
+        self.report(len(pairs))
+
+    def report(self, count):
+        self.done += count
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        self.stdout.write(
+            f"[{self.done}/{self.total}] {100.0 * self.done / self.total:.1f}% "
+            f"{rate:.1f} sessions/s, {self.failed} failed, ETA {eta:.0f}s"
+        )
@@ -0,0 +1,159 @@
+# backend/volunteers/metrics.py
+
+import datetime
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from rest_framework.permissions import BasePermission
+
+from .instrumentation import STAGES
+from .models import ProcessingMetrics, ProcessingMetricsTotals
+
+# ==============================================================================
+# PROMETHEUS METRICS
+# ==============================================================================
+# /api/metrics/ renders the stored ProcessingMetrics in the Prometheus text
+# exposition format. Every worker writes its runs to the database, so one
+# scrape of any web process covers all of them. Rows older than
+# METRICS_RETENTION_DAYS are rolled up into ProcessingMetricsTotals by a daily
+# task (see roll_up_metrics), and the totals are added back in here, so the
+# counters never go down while the table only holds recent runs. Throughput
+# comes out of the counters in PromQL, e.g. records per second of FIT parsing:
+#
+#   rate(session_processing_records_total{file_type=".fit"}[5m])
+#     / rate(session_processing_stage_seconds_sum{file_type=".fit",stage="parse"}[5m])
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# The peak RSS gauge covers the runs of this recent window
+PEAK_RSS_WINDOW = datetime.timedelta(hours=1)
+
+
+class HasMetricsToken(BasePermission):
+    """Lets a scraper in with ``Authorization: Bearer <METRICS_TOKEN>``."""
+
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        return bool(token) and scheme.lower() == 'bearer' and constant_time_compare(credentials.strip(), token)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _sample(name, labels, value):
+    label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+    return f'{name}{{{label_text}}} {value or 0}'
+
+
+def _family(lines, name, kind, help_text):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def _histogram_aggregates(field):
+    aggregates = {
+        f'{field}__le{i}': Count('id', filter=Q(**{f'{field}__lte': bound}))
+        for i, bound in enumerate(SECONDS_BUCKETS)
+    }
+    aggregates[f'{field}__sum'] = Sum(field)
+    aggregates[f'{field}__count'] = Count(field)
+    return aggregates
+
+
+def _histogram(lines, name, labels, row, field):
+    for i, bound in enumerate(SECONDS_BUCKETS):
+        lines.append(_sample(f'{name}_bucket', {**labels, 'le': bound}, row[f'{field}__le{i}']))
+    lines.append(_sample(f'{name}_bucket', {**labels, 'le': '+Inf'}, row[f'{field}__count']))
+    lines.append(_sample(f'{name}_sum', labels, row[f'{field}__sum']))
+    lines.append(_sample(f'{name}_count', labels, row[f'{field}__count']))
+
+
+def _aggregates():
+    """The counters of a group of runs, keyed as stored in ProcessingMetricsTotals.counters."""
+    aggregates = {'records': Sum('num_records'), 'bytes_in': Sum('bytes_in'), 'bytes_out': Sum('bytes_out')}
+    for field in [f'{name}_secs' for name in STAGES] + ['total_secs']:
+        aggregates.update(_histogram_aggregates(field))
+    return aggregates
+
+
+def roll_up_metrics(before):
+    """
+    Folds the ProcessingMetrics rows created before ``before`` into
+    ProcessingMetricsTotals and deletes them. Returns the number of rows.
+    """
+    with transaction.atomic():
+        old = ProcessingMetrics.objects.filter(created_at__lt=before).order_by()
+        last_id = old.aggregate(last_id=Max('id'))['last_id']
+        if last_id is None:
+            return 0
+        # Rows recorded while this runs are left for the next roll-up
+        old = old.filter(id__lte=last_id)
+        groups = old.values('file_type', 'status', 'cached_result').annotate(runs=Count('id'), **_aggregates())
+        for group in groups:
+            totals, _ = ProcessingMetricsTotals.objects.select_for_update().get_or_create(
+                file_type=group.pop('file_type'), status=group.pop('status'), cached_result=group.pop('cached_result'),
+            )
+            totals.runs += group.pop('runs')
+            counters = Counter(totals.counters)
+            counters.update({key: value for key, value in group.items() if value})
+            totals.counters = dict(counters)
+            totals.save(update_fields=['runs', 'counters', 'updated_at'])
+        deleted, _ = old.delete()
+    return deleted
+
+
+def render_metrics():
+    """The processing metrics as Prometheus text. Costs three aggregate queries and one of the totals."""
+    metrics = ProcessingMetrics.objects.order_by()
+    runs = Counter()
+    for row in metrics.values('file_type', 'status', 'cached_result').annotate(runs=Count('id')):
+        runs[row['file_type'], row['status'], row['cached_result']] += row['runs']
+    by_type = {}
+    for row in metrics.values('file_type').annotate(**_aggregates()):
+        by_type[row.pop('file_type')] = Counter({key: value for key, value in row.items() if value})
+    for totals in ProcessingMetricsTotals.objects.all():
+        runs[totals.file_type, totals.status, totals.cached_result] += totals.runs
+        by_type.setdefault(totals.file_type, Counter()).update(totals.counters)
+    peaks = list(
+        metrics.filter(created_at__gte=timezone.now() - PEAK_RSS_WINDOW)
+        .values('file_type').annotate(peak=Max('peak_rss_bytes')).order_by('file_type')
+    )
+
+    lines = []
+    _family(lines, 'session_processing_runs_total', 'counter',
+            "Runs of the session processing pipeline by file type, outcome and parse cache use.")
+    for (file_type, status, cached_result), count in sorted(runs.items()):
+        labels = {'file_type': file_type, 'status': status, 'cached': str(cached_result).lower()}
+        lines.append(_sample('session_processing_runs_total', labels, count))
+
+    for name, key, help_text in (
+        ('session_processing_records_total', 'records', "Samples in the processed files."),
+        ('session_processing_bytes_in_total', 'bytes_in', "Bytes of session files read (as stored, e.g. compressed)."),
+        ('session_processing_bytes_out_total', 'bytes_out', "Bytes of encoded time-series produced."),
+    ):
+        _family(lines, name, 'counter', help_text)
+        for file_type, row in sorted(by_type.items()):
+            lines.append(_sample(name, {'file_type': file_type}, row[key]))
+
+    _family(lines, 'session_processing_stage_seconds', 'histogram',
+            "Time spent in each stage of the pipeline (stages exclude the stages they contain).")
+    for file_type, row in sorted(by_type.items()):
+        for name in STAGES:
+            _histogram(lines, 'session_processing_stage_seconds', {'file_type': file_type, 'stage': name}, row, f'{name}_secs')
+
+    _family(lines, 'session_processing_seconds', 'histogram', "Total time of a pipeline run.")
+    for file_type, row in sorted(by_type.items()):
+        _histogram(lines, 'session_processing_seconds', {'file_type': file_type}, row, 'total_secs')
+
+    _family(lines, 'session_processing_peak_rss_bytes', 'gauge',
+            f"Highest worker peak RSS seen by runs in the last {int(PEAK_RSS_WINDOW.total_seconds())} seconds.")
+    for row in peaks:
+        lines.append(_sample('session_processing_peak_rss_bytes', {'file_type': row['file_type']}, row['peak']))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,282 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:37
+
+import io
+import json
+
+import django.db.models.deletion
+import numpy as np
+import pandas as pd
+from django.db import migrations, models
+
+# ------------------------------------------------------------------------------
+# Frozen copy of the version 1 columnar codec (volunteers.timeseries), so later
+# changes to the live codec don't change what this migration writes or reads.
+# ------------------------------------------------------------------------------
+
+TIMESTAMP_KEY = "timestamp"
+TIMESTAMP_FORMATS = {
+    "iso": ("s", "+00:00"),
+    "iso_us": ("us", "+00:00"),
+    "csv": ("us", "+0000"),
+    "zulu": ("s", "Z"),
+    "zulu_ms": ("ms", "Z"),
+}
+KIND_INT = "int"
+KIND_FLOAT = "float"
+KIND_JSON = "json"
+KIND_TIMESTAMP = "timestamp"
+MAX_EXACT_INT = 2**53
+
+
+def render_timestamps(epoch_us, fmt):
+    unit, suffix = TIMESTAMP_FORMATS[fmt]
+    text = np.datetime_as_string(epoch_us.astype("datetime64[us]"), unit=unit)
+    return [value + suffix for value in text.tolist()]
+
+
+def parse_timestamps(values):
+    if not values or any(not isinstance(value, str) for value in values):
+        return None
+    try:
+        parsed = pd.to_datetime(pd.Series(values), utc=True, format="ISO8601")
+    except (ValueError, TypeError, OverflowError):
+        return None
+    if parsed.isna().any():
+        return None
+    return parsed.dt.as_unit("us").astype("int64").to_numpy()
+
+
+def classify(values):
+    has_int = has_float = False
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            return KIND_JSON
+        if isinstance(value, int):
+            if abs(value) >= MAX_EXACT_INT:
+                return KIND_JSON
+            has_int = True
+        elif isinstance(value, float):
+            has_float = True
+        else:
+            return KIND_JSON
+    if has_int and has_float:
+        return KIND_JSON
+    return KIND_FLOAT if has_float else KIND_INT
+
+
+def smallest_int_dtype(values):
+    if values.size == 0:
+        return np.int8
+    low, high = int(values.min()), int(values.max())
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+
+def encode_records(records):
+    """Returns ``(schema, blob, start_time)`` for a list of per-sample dicts."""
+    records = records or []
+    length = len(records)
+    names = {}
+    for record in records:
+        for key in record:
+            names.setdefault(key, None)
+
+    time_us = None
+    timestamp_format = None
+    arrays = {}
+    channels = []
+    for i, name in enumerate(names):
+        prefix = f"c{i}"
+        present = np.fromiter(
+            (name in record for record in records), dtype=bool, count=length
+        )
+        values = [record.get(name) for record in records]
+
+        if name == TIMESTAMP_KEY and present.all():
+            parsed = parse_timestamps(values)
+            fmt = next(
+                (
+                    fmt
+                    for fmt in TIMESTAMP_FORMATS
+                    if parsed is not None and render_timestamps(parsed, fmt) == values
+                ),
+                None,
+            )
+            if fmt is not None:
+                time_us, timestamp_format = parsed, fmt
+                channels.append({"name": name, "kind": KIND_TIMESTAMP})
+                continue
+
+        kind = classify(values)
+        valid = np.fromiter(
+            (value is not None for value in values), dtype=bool, count=length
+        )
+        if kind == KIND_JSON:
+            arrays[f"{prefix}_v"] = np.frombuffer(
+                json.dumps(values).encode("utf-8"), dtype=np.uint8
+            )
+        elif kind == KIND_FLOAT:
+            arrays[f"{prefix}_v"] = np.array(
+                [np.nan if value is None else value for value in values],
+                dtype=np.float64,
+            )
+        else:
+            array = np.array(
+                [0 if value is None else value for value in values], dtype=np.int64
+            )
+            if not valid.all():
+                # Carry the last valid value through nulls so deltas stay small
+                array = (
+                    pd.Series(np.where(valid, array, np.nan))
+                    .ffill()
+                    .fillna(0)
+                    .to_numpy(np.int64)
+                )
+            deltas = np.diff(array, prepend=0)
+            arrays[f"{prefix}_v"] = deltas.astype(smallest_int_dtype(deltas))
+            if not valid.all():
+                arrays[f"{prefix}_n"] = np.packbits(valid)
+        if not present.all():
+            arrays[f"{prefix}_p"] = np.packbits(present)
+        channels.append({"name": name, "kind": kind})
+
+    start_us = int(time_us[0]) if time_us is not None and length else None
+    if start_us is not None:
+        arrays = {"time": np.diff(time_us - time_us[0], prepend=0), **arrays}
+    schema = {
+        "version": 1,
+        "length": length,
+        "start_us": start_us,
+        "timestamp_format": timestamp_format,
+        "channels": channels,
+    }
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    start_time = (
+        pd.Timestamp(start_us, unit="us", tz="UTC").to_pydatetime()
+        if start_us is not None
+        else None
+    )
+    return schema, buffer.getvalue(), start_time
+
+
+def decode_records(schema, blob):
+    """Inverse of encode_records(): rebuilds the list of per-sample dicts."""
+    length = schema["length"]
+    with np.load(io.BytesIO(bytes(blob)), allow_pickle=False) as archive:
+        arrays = {key: archive[key] for key in archive.files}
+
+    def flags(key):
+        if key not in arrays:
+            return None
+        bits = np.unpackbits(arrays[key])[:length].astype(bool)
+        return np.concatenate([bits, np.zeros(length - len(bits), dtype=bool)])
+
+    records = [{} for _ in range(length)]
+    for i, entry in enumerate(schema["channels"]):
+        prefix = f"c{i}"
+        kind = entry["kind"]
+        if kind == KIND_TIMESTAMP:
+            time_us = np.cumsum(arrays["time"].astype(np.int64)) + schema["start_us"]
+            values = render_timestamps(time_us, schema["timestamp_format"])
+        elif kind == KIND_INT:
+            values = np.cumsum(arrays[f"{prefix}_v"].astype(np.int64)).tolist()
+        elif kind == KIND_FLOAT:
+            values = [
+                None if value != value else value
+                for value in arrays[f"{prefix}_v"].tolist()
+            ]
+        else:
+            values = json.loads(arrays[f"{prefix}_v"].tobytes().decode("utf-8"))
+        valid, present = flags(f"{prefix}_n"), flags(f"{prefix}_p")
+        for j, value in enumerate(values):
+            if present is None or present[j]:
+                records[j][entry["name"]] = value if valid is None or valid[j] else None
+    return records
+
+
+def forwards_to_columnar(apps, schema_editor):
+    """Converts every JSON timeseries_data blob into a SessionTimeseries row."""
+    RunningSession = apps.get_model("volunteers", "RunningSession")
+    SessionTimeseries = apps.get_model("volunteers", "SessionTimeseries")
+
+    sessions = (
+        RunningSession.objects.exclude(timeseries_data=None)
+        .only("id", "timeseries_data")
+        .iterator(chunk_size=50)
+    )
+    for session in sessions:
+        schema, blob, start_time = encode_records(session.timeseries_data)
+        SessionTimeseries.objects.create(
+            session_id=session.id,
+            start_time=start_time,
+            num_records=schema["length"],
+            schema=schema,
+            data=blob,
+        )
+
+
+def backwards_to_json(apps, schema_editor):
+    """Restores the per-record JSON layout from the columnar rows."""
+    RunningSession = apps.get_model("volunteers", "RunningSession")
+    SessionTimeseries = apps.get_model("volunteers", "SessionTimeseries")
+
+    for row in SessionTimeseries.objects.iterator(chunk_size=50):
+        records = decode_records(row.schema, row.data)
+        RunningSession.objects.filter(id=row.session_id).update(timeseries_data=records)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0007_runningsession_processing_error"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionTimeseries",
+            fields=[
+                (
+                    "session",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="timeseries",
+                        serialize=False,
+                        to="volunteers.runningsession",
+                    ),
+                ),
+                (
+                    "start_time",
+                    models.DateTimeField(
+                        blank=True, help_text="Timestamp of the first sample", null=True
+                    ),
+                ),
+                ("num_records", models.PositiveIntegerField(default=0)),
+                (
+                    "schema",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Channel names, kinds and timestamp format",
+                    ),
+                ),
+                (
+                    "data",
+                    models.BinaryField(
+                        help_text="Compressed .npz archive holding one array per channel"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(forwards_to_columnar, backwards_to_json),
+        migrations.RemoveField(
+            model_name="runningsession",
+            name="timeseries_data",
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:56
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0008_sessiontimeseries"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="runningsession",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                help_text="BLAKE2b-256 hex digest of the uploaded file",
+                max_length=64,
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ParsedFileResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "content_hash",
+                    models.CharField(
+                        help_text="BLAKE2b-256 hex digest of the parsed file",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "file_type",
+                    models.CharField(
+                        help_text="Extension that selected the parser, e.g. '.fit'",
+                        max_length=10,
+                    ),
+                ),
+                ("parser_version", models.CharField(max_length=20)),
+                (
+                    "summary",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+                ("start_time", models.DateTimeField(blank=True, null=True)),
+                ("num_records", models.PositiveIntegerField(default=0)),
+                (
+                    "schema",
+                    models.JSONField(
+                        blank=True,
+                        help_text="Columnar schema, or null if the file had no time-series",
+                        null=True,
+                    ),
+                ),
+                ("data", models.BinaryField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("content_hash", "file_type", "parser_version"),
+                        name="unique_parsed_file_result",
+                    )
+                ],
+            },
+        ),
+    ]
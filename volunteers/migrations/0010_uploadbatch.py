@@ -0,0 +1,69 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0009_content_hash_parse_cache"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source_type",
+                    models.CharField(help_text="e.g., 'admin_upload'", max_length=50),
+                ),
+                (
+                    "task_group_id",
+                    models.CharField(
+                        blank=True,
+                        help_text="Celery chord/group id of the processing tasks",
+                        max_length=255,
+                        null=True,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "completed_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Set once every session has been processed",
+                        null=True,
+                    ),
+                ),
+                (
+                    "volunteer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upload_batches",
+                        to="volunteers.volunteer",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="runningsession",
+            name="batch",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="sessions",
+                to="volunteers.uploadbatch",
+            ),
+        ),
+    ]
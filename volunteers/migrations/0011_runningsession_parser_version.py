@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0010_uploadbatch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="runningsession",
+            name="parser_version",
+            field=models.CharField(
+                blank=True,
+                help_text="Parser version that produced the stored results",
+                max_length=20,
+                null=True,
+            ),
+        ),
+    ]
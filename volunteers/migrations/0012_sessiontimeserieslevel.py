@@ -0,0 +1,204 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:03
+
+import io
+import json
+
+import django.db.models.deletion
+import numpy as np
+from django.db import migrations, models
+
+# ------------------------------------------------------------------------------
+# Frozen copy of the version 1 columnar decoder (volunteers.timeseries), so
+# later changes to the live codec don't change what this migration does.
+# ------------------------------------------------------------------------------
+
+KIND_INT = "int"
+KIND_FLOAT = "float"
+KIND_JSON = "json"
+KIND_TIMESTAMP = "timestamp"
+
+
+def unpack_flags(bitmap, count):
+    flags = np.unpackbits(np.frombuffer(bytes(bitmap), dtype=np.uint8))[:count]
+    flags = flags.astype(bool)
+    if len(flags) < count:
+        flags = np.concatenate([flags, np.zeros(count - len(flags), dtype=bool)])
+    return flags
+
+
+def decode_channels(schema, blob):
+    """
+    Returns the sample times (UTC epoch microseconds, or None) and, per
+    channel name, its values as float64 with NaN for nulls. Non-numeric
+    values of JSON channels are NaN too.
+    """
+    length = schema["length"]
+    with np.load(io.BytesIO(bytes(blob)), allow_pickle=False) as archive:
+        arrays = {key: archive[key] for key in archive.files}
+    time_us = None
+    if "time" in arrays:
+        time_us = np.cumsum(arrays["time"].astype(np.int64)) + schema["start_us"]
+
+    channels = {}
+    for i, entry in enumerate(schema["channels"]):
+        prefix = f"c{i}"
+        kind = entry["kind"]
+        if kind == KIND_TIMESTAMP:
+            continue
+        if kind == KIND_INT:
+            values = np.cumsum(arrays[f"{prefix}_v"].astype(np.int64))
+            values = values.astype(np.float64)
+            if f"{prefix}_n" in arrays:
+                values[~unpack_flags(arrays[f"{prefix}_n"], length)] = np.nan
+        elif kind == KIND_FLOAT:
+            values = arrays[f"{prefix}_v"]
+        else:
+            items = json.loads(arrays[f"{prefix}_v"].tobytes().decode("utf-8"))
+            values = np.array(
+                [
+                    (
+                        value
+                        if isinstance(value, (int, float))
+                        and not isinstance(value, bool)
+                        else np.nan
+                    )
+                    for value in items
+                ],
+                dtype=np.float64,
+            )
+        channels[entry["name"]] = (kind, values)
+    return time_us, channels
+
+
+# ------------------------------------------------------------------------------
+# Frozen copy of build_level() (volunteers.timeseries), writing version 2 levels
+# ------------------------------------------------------------------------------
+
+PYRAMID_RESOLUTIONS = (1, 5, 30, 300)
+LABEL_CHANNEL = "Anomaly"
+
+
+def build_level(time_us, channels, resolution_secs):
+    if time_us is None or not len(time_us):
+        return None
+    offsets = (time_us - time_us[0]) / 1e6
+    bucket = np.floor_divide(offsets, resolution_secs).astype(np.int64)
+    order = None if (np.diff(bucket) >= 0).all() else np.argsort(bucket, kind="stable")
+    if order is not None:
+        bucket = bucket[order]
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    buckets = bucket[starts]
+    if len(buckets) * 2 > len(time_us):
+        return None
+    names = [
+        name
+        for name, (kind, _) in channels.items()
+        if kind in (KIND_INT, KIND_FLOAT) and name != LABEL_CHANNEL
+    ]
+
+    arrays = {"bucket": buckets}
+    if names:
+        values = np.column_stack([channels[name][1] for name in names])
+        if order is not None:
+            values = values[order]
+        finite = ~np.isnan(values)
+        counts = np.add.reduceat(finite, starts, axis=0)
+        sums = np.add.reduceat(np.where(finite, values, 0.0), starts, axis=0)
+        arrays["min"] = np.fmin.reduceat(values, starts, axis=0)
+        arrays["max"] = np.fmax.reduceat(values, starts, axis=0)
+        arrays["mean"] = np.divide(
+            sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0
+        )
+    schema = {
+        "version": 2,
+        "resolution_secs": resolution_secs,
+        "num_buckets": len(buckets),
+        "start_us": int(time_us[0]),
+        "channels": names,
+    }
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return schema, buffer.getvalue()
+
+
+def build_levels(apps, schema_editor):
+    """Computes the downsample pyramid for every session that already has data."""
+    SessionTimeseries = apps.get_model("volunteers", "SessionTimeseries")
+    SessionTimeseriesLevel = apps.get_model("volunteers", "SessionTimeseriesLevel")
+
+    for row in SessionTimeseries.objects.iterator(chunk_size=50):
+        time_us, channels = decode_channels(row.schema, row.data)
+        levels = (
+            build_level(time_us, channels, resolution_secs)
+            for resolution_secs in PYRAMID_RESOLUTIONS
+        )
+        SessionTimeseriesLevel.objects.bulk_create(
+            SessionTimeseriesLevel(
+                session_id=row.session_id,
+                resolution_secs=schema["resolution_secs"],
+                num_buckets=schema["num_buckets"],
+                schema=schema,
+                data=blob,
+            )
+            for schema, blob in filter(None, levels)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0011_runningsession_parser_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionTimeseriesLevel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "resolution_secs",
+                    models.PositiveIntegerField(help_text="Bucket width in seconds"),
+                ),
+                ("num_buckets", models.PositiveIntegerField(default=0)),
+                (
+                    "schema",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Bucket width, start time and channel names",
+                    ),
+                ),
+                (
+                    "data",
+                    models.BinaryField(
+                        help_text="Compressed .npz archive of per-bucket min/max/mean arrays"
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeseries_levels",
+                        to="volunteers.runningsession",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["resolution_secs"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("session", "resolution_secs"),
+                        name="unique_session_level",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_levels, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,135 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:05
+
+import io
+import json
+
+import django.db.models.deletion
+import numpy as np
+from django.db import migrations, models
+
+LABEL_CHANNEL = "Anomaly"
+# update-anomalies used to write its flags under this key instead
+LEGACY_LABEL_KEY = "anomaly"
+
+
+# ------------------------------------------------------------------------------
+# Frozen helpers for the version 1 columnar archives (volunteers.timeseries), so
+# later changes to the live codec don't change what this migration does.
+# ------------------------------------------------------------------------------
+
+
+def unpack_flags(bitmap, count):
+    flags = np.unpackbits(np.frombuffer(bytes(bitmap), dtype=np.uint8))[:count]
+    flags = flags.astype(bool)
+    if len(flags) < count:
+        flags = np.concatenate([flags, np.zeros(count - len(flags), dtype=bool)])
+    return flags
+
+
+def channel_flags(schema, arrays, index):
+    """Returns which samples of channel ``index`` hold a truthy value."""
+    length = schema["length"]
+    prefix = f"c{index}"
+    kind = schema["channels"][index]["kind"]
+    if kind == "int":
+        flags = np.cumsum(arrays[f"{prefix}_v"].astype(np.int64)) != 0
+    elif kind == "float":
+        values = arrays[f"{prefix}_v"]
+        flags = (values != 0) & ~np.isnan(values)
+    elif kind == "json":
+        items = json.loads(arrays[f"{prefix}_v"].tobytes().decode("utf-8"))
+        flags = np.array([bool(value) for value in items], dtype=bool)
+    else:
+        flags = np.ones(length, dtype=bool)
+    for part in ("n", "p"):
+        if f"{prefix}_{part}" in arrays:
+            flags &= unpack_flags(arrays[f"{prefix}_{part}"], length)
+    return flags
+
+
+def drop_channel(schema, arrays, index):
+    """Removes channel ``index``, renumbering the arrays of the ones after it."""
+    kept = {}
+    for key, array in arrays.items():
+        if not key.startswith("c"):
+            kept[key] = array
+            continue
+        position, part = key[1:].split("_")
+        position = int(position)
+        if position != index:
+            kept[f"c{position - (position > index)}_{part}"] = array
+    schema = dict(
+        schema, channels=[c for i, c in enumerate(schema["channels"]) if i != index]
+    )
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **kept)
+    return schema, buffer.getvalue()
+
+
+def move_labels(apps, schema_editor):
+    """
+    Copies existing anomaly flags into SessionLabels, folding in the flags the
+    update-anomalies endpoint stored under the lowercase key, which is then
+    dropped from the series.
+    """
+    SessionTimeseries = apps.get_model("volunteers", "SessionTimeseries")
+    SessionLabels = apps.get_model("volunteers", "SessionLabels")
+
+    for row in SessionTimeseries.objects.iterator(chunk_size=50):
+        names = [channel["name"] for channel in row.schema.get("channels", [])]
+        if LABEL_CHANNEL not in names and LEGACY_LABEL_KEY not in names:
+            continue
+        with np.load(io.BytesIO(bytes(row.data)), allow_pickle=False) as archive:
+            arrays = {key: archive[key] for key in archive.files}
+        length = row.schema["length"]
+        flags = np.zeros(length, dtype=bool)
+        for name in (LABEL_CHANNEL, LEGACY_LABEL_KEY):
+            if name in names:
+                flags |= channel_flags(row.schema, arrays, names.index(name))
+
+        if LEGACY_LABEL_KEY in names:
+            row.schema, row.data = drop_channel(
+                row.schema, arrays, names.index(LEGACY_LABEL_KEY)
+            )
+            row.save(update_fields=["schema", "data"])
+        if flags.any():
+            SessionLabels.objects.create(
+                session_id=row.session_id,
+                num_records=length,
+                anomaly_bitmap=np.packbits(flags).tobytes(),
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0012_sessiontimeserieslevel"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionLabels",
+            fields=[
+                (
+                    "session",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="labels",
+                        serialize=False,
+                        to="volunteers.runningsession",
+                    ),
+                ),
+                ("num_records", models.PositiveIntegerField(default=0)),
+                (
+                    "anomaly_bitmap",
+                    models.BinaryField(
+                        default=bytes,
+                        help_text="np.packbits() of one anomaly flag per sample",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(move_labels, migrations.RunPython.noop),
+    ]
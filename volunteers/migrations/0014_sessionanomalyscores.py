@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0013_sessionlabels"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionAnomalyScores",
+            fields=[
+                (
+                    "session",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="anomaly_scores",
+                        serialize=False,
+                        to="volunteers.runningsession",
+                    ),
+                ),
+                ("detector_version", models.CharField(max_length=20)),
+                ("num_records", models.PositiveIntegerField(default=0)),
+                (
+                    "scores",
+                    models.BinaryField(
+                        help_text="Little-endian float16 score per sample, in [0, 1)"
+                    ),
+                ),
+                ("summary", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
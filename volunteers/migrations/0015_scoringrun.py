@@ -0,0 +1,92 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0014_sessionanomalyscores"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScoringRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "date_from",
+                    models.DateField(
+                        blank=True,
+                        help_text="Only sessions on or after this date",
+                        null=True,
+                    ),
+                ),
+                (
+                    "date_to",
+                    models.DateField(
+                        blank=True,
+                        help_text="Only sessions on or before this date",
+                        null=True,
+                    ),
+                ),
+                (
+                    "session_status",
+                    models.CharField(
+                        choices=[
+                            ("processing", "Processing"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="completed",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "detector_version",
+                    models.CharField(blank=True, max_length=20, null=True),
+                ),
+                ("task_id", models.CharField(blank=True, max_length=255, null=True)),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("processed", models.PositiveIntegerField(default=0)),
+                ("failed", models.PositiveIntegerField(default=0)),
+                ("sessions_per_second", models.FloatField(blank=True, null=True)),
+                ("error", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "volunteer",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scoring_runs",
+                        to="volunteers.volunteer",
+                    ),
+                ),
+            ],
+        ),
+    ]
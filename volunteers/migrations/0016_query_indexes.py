@@ -0,0 +1,93 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:24
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0015_scoringrun"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="runningsession",
+            name="volunteer",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="sessions",
+                to="volunteers.volunteer",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="runningsession",
+            index=models.Index(
+                fields=["volunteer", "-session_date", "-id"],
+                name="session_volunteer_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="runningsession",
+            index=models.Index(
+                fields=["-session_date", "-id"], name="session_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="runningsession",
+            index=models.Index(
+                fields=["total_distance_km"], name="session_distance_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="runningsession",
+            index=models.Index(
+                fields=["total_duration_secs"], name="session_duration_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="runningsession",
+            index=models.Index(fields=["avg_heart_rate"], name="session_avg_hr_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="runningsession",
+            index=models.Index(fields=["max_heart_rate"], name="session_max_hr_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="runningsession",
+            index=models.Index(
+                condition=models.Q(("status", "failed")),
+                fields=["id"],
+                name="session_failed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="runningsession",
+            index=models.Index(
+                condition=models.Q(("status", "processing")),
+                fields=["id"],
+                name="session_processing_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="volunteer",
+            index=models.Index(
+                fields=["status", "-registration_date"], name="volunteer_status_reg_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="volunteer",
+            index=models.Index(
+                fields=["-registration_date"], name="volunteer_registered_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="volunteer",
+            index=models.Index(
+                django.db.models.functions.text.Upper("email"),
+                name="volunteer_email_upper_idx",
+            ),
+        ),
+    ]
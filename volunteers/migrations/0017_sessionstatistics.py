@@ -0,0 +1,351 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:27
+
+import io
+import json
+
+import django.db.models.deletion
+import numpy as np
+import pandas as pd
+from django.db import migrations, models
+
+# ------------------------------------------------------------------------------
+# Frozen copy of the version 1 columnar decoder (volunteers.timeseries), so
+# later changes to the live codec don't change what this migration does.
+# ------------------------------------------------------------------------------
+
+KIND_INT = "int"
+KIND_FLOAT = "float"
+KIND_JSON = "json"
+KIND_TIMESTAMP = "timestamp"
+
+
+def unpack_flags(bitmap, count):
+    flags = np.unpackbits(np.frombuffer(bytes(bitmap), dtype=np.uint8))[:count]
+    flags = flags.astype(bool)
+    if len(flags) < count:
+        flags = np.concatenate([flags, np.zeros(count - len(flags), dtype=bool)])
+    return flags
+
+
+def decode_channels(schema, blob):
+    """
+    Returns the sample times (UTC epoch microseconds, or None) and, per
+    channel name, its values as float64 with NaN for nulls. Non-numeric
+    values of JSON channels are NaN too.
+    """
+    length = schema["length"]
+    with np.load(io.BytesIO(bytes(blob)), allow_pickle=False) as archive:
+        arrays = {key: archive[key] for key in archive.files}
+    time_us = None
+    if "time" in arrays:
+        time_us = np.cumsum(arrays["time"].astype(np.int64)) + schema["start_us"]
+
+    channels = {}
+    for i, entry in enumerate(schema["channels"]):
+        prefix = f"c{i}"
+        kind = entry["kind"]
+        if kind == KIND_TIMESTAMP:
+            continue
+        if kind == KIND_INT:
+            values = np.cumsum(arrays[f"{prefix}_v"].astype(np.int64))
+            values = values.astype(np.float64)
+            if f"{prefix}_n" in arrays:
+                values[~unpack_flags(arrays[f"{prefix}_n"], length)] = np.nan
+        elif kind == KIND_FLOAT:
+            values = arrays[f"{prefix}_v"]
+        else:
+            items = json.loads(arrays[f"{prefix}_v"].tobytes().decode("utf-8"))
+            values = np.array(
+                [
+                    (
+                        value
+                        if isinstance(value, (int, float))
+                        and not isinstance(value, bool)
+                        else np.nan
+                    )
+                    for value in items
+                ],
+                dtype=np.float64,
+            )
+        channels[entry["name"]] = (kind, values)
+    return time_us, channels
+
+
+# ------------------------------------------------------------------------------
+# Frozen copy of the version 1 statistics (volunteers.analytics)
+# ------------------------------------------------------------------------------
+
+STATS_VERSION = "1"
+LABEL_CHANNEL = "Anomaly"
+HR_ZONE_BOUNDS = (0.5, 0.6, 0.7, 0.8, 0.9)
+HR_ZONE_FIELDS = tuple(f"hr_zone{zone}_secs" for zone in range(len(HR_ZONE_BOUNDS) + 1))
+HR_PERCENTILES = (5, 25, 50, 75, 95)
+GAP_MIN_SECS = 10.0
+GAP_FACTOR = 5.0
+MOVING_SPEED = 0.5
+ELEVATION_WINDOW = 5
+MIN_DRIFT_SAMPLES = 120
+
+
+def reference_max_heart_rate(date_of_birth, when):
+    if date_of_birth is None or when is None:
+        return None
+    day = when.date()
+    age = (
+        day.year
+        - date_of_birth.year
+        - ((day.month, day.day) < (date_of_birth.month, date_of_birth.day))
+    )
+    return 220 - age
+
+
+def first_channel(channels, *names):
+    for name in names:
+        if name in channels:
+            return channels[name][1]
+    return None
+
+
+def finite_mean(values):
+    if values is None:
+        return None
+    values = values[np.isfinite(values)]
+    return round(float(values.mean()), 3) if len(values) else None
+
+
+def hr_drift_pct(heart_rate, speed):
+    if speed is None:
+        return None
+    moving = np.flatnonzero(
+        np.isfinite(heart_rate) & np.isfinite(speed) & (speed > MOVING_SPEED)
+    )
+    if len(moving) < MIN_DRIFT_SAMPLES:
+        return None
+    first, second = np.array_split(moving, 2)
+    ratio_first = heart_rate[first].mean() / speed[first].mean()
+    ratio_second = heart_rate[second].mean() / speed[second].mean()
+    return round(float((ratio_second / ratio_first - 1.0) * 100.0), 2)
+
+
+def session_statistics(length, time_us, channels, reference_hr):
+    stats = {
+        "stats_version": STATS_VERSION,
+        "num_samples": length,
+        "zone_reference_hr": reference_hr,
+    }
+
+    durations = None
+    stats.update(sample_interval_secs=None, num_gaps=0, longest_gap_secs=None)
+    if time_us is not None and length > 1:
+        deltas = np.diff(time_us) / 1e6
+        interval = float(np.median(deltas))
+        gaps = deltas > max(GAP_MIN_SECS, GAP_FACTOR * interval)
+        stats["sample_interval_secs"] = round(interval, 3)
+        stats["num_gaps"] = int(gaps.sum())
+        stats["longest_gap_secs"] = (
+            round(float(deltas[gaps].max()), 1) if gaps.any() else None
+        )
+        durations = np.append(np.where(gaps, interval, deltas), interval).clip(min=0)
+
+    heart_rate = first_channel(channels, "heart_rate")
+    if heart_rate is not None:
+        heart_rate = np.where(heart_rate > 0, heart_rate, np.nan)
+    valid = (
+        np.isfinite(heart_rate)
+        if heart_rate is not None
+        else np.zeros(length, dtype=bool)
+    )
+    stats["hr_samples"] = int(valid.sum())
+    if valid.any():
+        values = heart_rate[valid]
+        stats.update(
+            hr_min=float(values.min()),
+            hr_mean=round(float(values.mean()), 2),
+            hr_max=float(values.max()),
+        )
+        for percentile, value in zip(
+            HR_PERCENTILES, np.percentile(values, HR_PERCENTILES)
+        ):
+            stats[f"hr_p{percentile}"] = round(float(value), 2)
+    else:
+        stats.update(hr_min=None, hr_mean=None, hr_max=None)
+        stats.update({f"hr_p{percentile}": None for percentile in HR_PERCENTILES})
+
+    stats.update(dict.fromkeys(HR_ZONE_FIELDS))
+    if reference_hr and valid.any():
+        weights = durations if durations is not None else np.ones(length)
+        zones = np.searchsorted(
+            np.array(HR_ZONE_BOUNDS) * reference_hr, heart_rate[valid], side="right"
+        )
+        seconds = np.bincount(
+            zones, weights=weights[valid], minlength=len(HR_ZONE_FIELDS)
+        )
+        stats.update(
+            {
+                field: round(float(value), 1)
+                for field, value in zip(HR_ZONE_FIELDS, seconds)
+            }
+        )
+
+    speed = first_channel(channels, "enhanced_speed", "speed")
+    stats["cadence_mean"] = finite_mean(first_channel(channels, "cadence"))
+    stats["speed_mean"] = (
+        finite_mean(np.where(speed > MOVING_SPEED, speed, np.nan))
+        if speed is not None
+        else None
+    )
+    altitude = first_channel(channels, "enhanced_altitude", "altitude")
+    stats["elevation_gain_m"] = None
+    if altitude is not None and np.isfinite(altitude).sum() > ELEVATION_WINDOW:
+        smoothed = (
+            pd.Series(altitude)
+            .interpolate(limit_area="inside")
+            .rolling(ELEVATION_WINDOW, center=True)
+            .mean()
+        )
+        climbs = smoothed.diff().to_numpy()
+        stats["elevation_gain_m"] = round(float(np.nansum(np.clip(climbs, 0, None))), 1)
+    stats["hr_drift_pct"] = (
+        hr_drift_pct(heart_rate, speed) if heart_rate is not None else None
+    )
+
+    labels = first_channel(channels, LABEL_CHANNEL)
+    stats["anomaly_samples"] = int(np.nansum(labels > 0)) if labels is not None else 0
+    return stats
+
+
+def compute_statistics(apps, schema_editor):
+    """Computes the statistics of every session that already has data."""
+    SessionTimeseries = apps.get_model("volunteers", "SessionTimeseries")
+    SessionLabels = apps.get_model("volunteers", "SessionLabels")
+    SessionStatistics = apps.get_model("volunteers", "SessionStatistics")
+
+    rows = SessionTimeseries.objects.select_related("session__volunteer").iterator(
+        chunk_size=50
+    )
+    for row in rows:
+        time_us, channels = decode_channels(row.schema, row.data)
+        values = session_statistics(
+            row.schema["length"],
+            time_us,
+            channels,
+            reference_max_heart_rate(
+                row.session.volunteer.date_of_birth, row.session.session_date
+            ),
+        )
+        labels = SessionLabels.objects.filter(session_id=row.session_id).first()
+        if labels is not None and labels.num_records == row.num_records:
+            flags = unpack_flags(labels.anomaly_bitmap, labels.num_records)
+            values["anomaly_samples"] = int(flags.sum())
+        SessionStatistics.objects.create(session_id=row.session_id, **values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0016_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionStatistics",
+            fields=[
+                (
+                    "session",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="statistics",
+                        serialize=False,
+                        to="volunteers.runningsession",
+                    ),
+                ),
+                ("stats_version", models.CharField(max_length=20)),
+                ("num_samples", models.PositiveIntegerField(default=0)),
+                (
+                    "sample_interval_secs",
+                    models.FloatField(
+                        blank=True, help_text="Median time between samples", null=True
+                    ),
+                ),
+                (
+                    "num_gaps",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Pauses much longer than the sample interval",
+                    ),
+                ),
+                ("longest_gap_secs", models.FloatField(blank=True, null=True)),
+                ("hr_samples", models.PositiveIntegerField(default=0)),
+                ("hr_min", models.FloatField(blank=True, null=True)),
+                ("hr_mean", models.FloatField(blank=True, null=True)),
+                ("hr_max", models.FloatField(blank=True, null=True)),
+                ("hr_p5", models.FloatField(blank=True, null=True)),
+                ("hr_p25", models.FloatField(blank=True, null=True)),
+                ("hr_p50", models.FloatField(blank=True, null=True)),
+                ("hr_p75", models.FloatField(blank=True, null=True)),
+                ("hr_p95", models.FloatField(blank=True, null=True)),
+                (
+                    "hr_drift_pct",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Change in HR per unit speed, first half to second",
+                        null=True,
+                    ),
+                ),
+                (
+                    "zone_reference_hr",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="220 - age; zones are empty without it",
+                        null=True,
+                    ),
+                ),
+                (
+                    "hr_zone0_secs",
+                    models.FloatField(blank=True, help_text="Below 50%", null=True),
+                ),
+                (
+                    "hr_zone1_secs",
+                    models.FloatField(blank=True, help_text="50-60%", null=True),
+                ),
+                (
+                    "hr_zone2_secs",
+                    models.FloatField(blank=True, help_text="60-70%", null=True),
+                ),
+                (
+                    "hr_zone3_secs",
+                    models.FloatField(blank=True, help_text="70-80%", null=True),
+                ),
+                (
+                    "hr_zone4_secs",
+                    models.FloatField(blank=True, help_text="80-90%", null=True),
+                ),
+                (
+                    "hr_zone5_secs",
+                    models.FloatField(blank=True, help_text="90% and above", null=True),
+                ),
+                ("cadence_mean", models.FloatField(blank=True, null=True)),
+                (
+                    "speed_mean",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Mean speed while moving, in m/s",
+                        null=True,
+                    ),
+                ),
+                ("elevation_gain_m", models.FloatField(blank=True, null=True)),
+                (
+                    "anomaly_samples",
+                    models.PositiveIntegerField(
+                        default=0, help_text="Samples labeled as anomalous"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "session statistics",
+            },
+        ),
+        migrations.RunPython(compute_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:46
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0017_sessionstatistics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionUpload",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("session_date", models.DateTimeField()),
+                (
+                    "source_type",
+                    models.CharField(default="admin_upload", max_length=50),
+                ),
+                (
+                    "file_name",
+                    models.CharField(
+                        help_text="Name of the file on the client", max_length=255
+                    ),
+                ),
+                (
+                    "file_size",
+                    models.PositiveBigIntegerField(help_text="Size in bytes"),
+                ),
+                (
+                    "part_size",
+                    models.PositiveIntegerField(
+                        help_text="Size of every part but the last, in bytes"
+                    ),
+                ),
+                (
+                    "storage_name",
+                    models.CharField(
+                        help_text="Name the assembled file is stored under",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "multipart_id",
+                    models.CharField(
+                        blank=True,
+                        help_text="S3 UploadId; empty for local chunked uploads",
+                        max_length=1024,
+                        null=True,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("uploading", "Uploading"),
+                            ("completed", "Completed"),
+                        ],
+                        default="uploading",
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "session",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="upload",
+                        to="volunteers.runningsession",
+                    ),
+                ),
+                (
+                    "volunteer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="session_uploads",
+                        to="volunteers.volunteer",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.3 on 2026-10-17 01:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0018_sessionupload"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProcessingMetrics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "file_type",
+                    models.CharField(
+                        help_text="e.g. '.fit' or '.tcx.gz'", max_length=10
+                    ),
+                ),
+                ("parser_version", models.CharField(max_length=20)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("processing", "Processing"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "cached_result",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Reused the parse result of identical bytes instead of parsing",
+                    ),
+                ),
+                ("num_records", models.PositiveIntegerField(blank=True, null=True)),
+                (
+                    "bytes_in",
+                    models.PositiveBigIntegerField(
+                        blank=True,
+                        help_text="Size of the stored file, if it was read",
+                        null=True,
+                    ),
+                ),
+                (
+                    "bytes_out",
+                    models.PositiveBigIntegerField(
+                        blank=True,
+                        help_text="Size of the encoded time-series written",
+                        null=True,
+                    ),
+                ),
+                (
+                    "peak_rss_bytes",
+                    models.PositiveBigIntegerField(
+                        blank=True,
+                        help_text="Peak RSS of the worker process so far",
+                        null=True,
+                    ),
+                ),
+                ("fetch_secs", models.FloatField(blank=True, null=True)),
+                ("parse_secs", models.FloatField(blank=True, null=True)),
+                ("transform_secs", models.FloatField(blank=True, null=True)),
+                ("summary_secs", models.FloatField(blank=True, null=True)),
+                ("db_write_secs", models.FloatField(blank=True, null=True)),
+                ("total_secs", models.FloatField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "session",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="processing_metrics",
+                        to="volunteers.runningsession",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "processing metrics",
+                "indexes": [
+                    models.Index(
+                        fields=["created_at"], name="processing_metrics_time_idx"
+                    )
+                ],
+            },
+        ),
+    ]
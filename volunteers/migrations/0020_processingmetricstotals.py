@@ -0,0 +1,65 @@
+# Generated by Django 5.2.3 on 2026-10-17 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("volunteers", "0019_processingmetrics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProcessingMetricsTotals",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("file_type", models.CharField(max_length=10)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("processing", "Processing"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("cached_result", models.BooleanField(default=False)),
+                ("runs", models.PositiveBigIntegerField(default=0)),
+                (
+                    "counters",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Sums and histogram buckets of the rolled-up runs, keyed as in metrics.py",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "processing metrics totals",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="processingmetrics",
+            index=models.Index(
+                fields=["file_type", "created_at"], name="processing_metrics_type_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="processingmetricstotals",
+            constraint=models.UniqueConstraint(
+                fields=("file_type", "status", "cached_result"),
+                name="unique_processing_metrics_totals",
+            ),
+        ),
+    ]
@@ -1,4 +1,21 @@
-from django.db import models
+import datetime
+import uuid
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Upper
+from django.utils import timezone
+import logging
+
+import numpy as np
+
+from .analytics import age_on, compute_session_statistics, reference_max_heart_rate
+from .instrumentation import STAGE_SUMMARY, STAGE_TRANSFORM, STAGES, peak_rss_bytes, stage
+from .timeseries import (
+    KIND_INT, LABEL_CHANNEL, TIMESTAMP_KEY, Column, ColumnarSeries, build_pyramid, decode_level, match_timestamps,
+    unpack_flags,
+)
+
+logger = logging.getLogger(__name__)
 
 class Volunteer(models.Model):
     STATUS_PENDING = 'pending'
@@ -26,10 +43,34 @@ class Volunteer(models.Model):
     consent_acknowledged = models.BooleanField(default=False)
     registration_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Volunteer list, optionally filtered by status, newest first
+            models.Index(fields=['status', '-registration_date'], name='volunteer_status_reg_idx'),
+            models.Index(fields=['-registration_date'], name='volunteer_registered_idx'),
+            # Case-insensitive email lookups (see EmailCheckView)
+            models.Index(Upper('email'), name='volunteer_email_upper_idx'),
+        ]
+
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
 
 
+class UploadBatch(models.Model):
+    """
+    A group of session files uploaded together for one volunteer. Progress is
+    derived from the status of its sessions, so it never needs its own updates.
+    """
+    volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE, related_name='upload_batches')
+    source_type = models.CharField(max_length=50, help_text="e.g., 'admin_upload'")
+    task_group_id = models.CharField(max_length=255, blank=True, null=True, help_text="Celery chord/group id of the processing tasks")
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True, help_text="Set once every session has been processed")
+
+    def __str__(self):
+        return f"Upload batch {self.id} for {self.volunteer.email}"
+
+
 class RunningSession(models.Model):
     # --- Status field for background task tracking ---
     STATUS_PROCESSING = 'processing'
@@ -43,11 +84,15 @@ class RunningSession(models.Model):
     ]
     
     # --- Core Relationship & Uploaded File ---
-    volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE, related_name='sessions')
+    # Not indexed on its own: session_volunteer_date_idx leads with it
+    volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE, related_name='sessions', db_index=False)
     session_date = models.DateTimeField()
     source_type = models.CharField(max_length=50, help_text="e.g., 'admin_upload'")
     session_file = models.FileField(upload_to='session_files/', blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True, help_text="BLAKE2b-256 hex digest of the uploaded file")
+    parser_version = models.CharField(max_length=20, blank=True, null=True, help_text="Parser version that produced the stored results")
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PROCESSING)
+    batch = models.ForeignKey(UploadBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='sessions')
     
     # --- ADD THIS FIELD ---
     processing_error = models.TextField(blank=True, null=True, help_text="Stores the error message if processing fails")
@@ -58,9 +103,6 @@ class RunningSession(models.Model):
     avg_heart_rate = models.IntegerField(null=True, blank=True, help_text="Average heart rate in bpm")
     max_heart_rate = models.IntegerField(null=True, blank=True, help_text="Maximum heart rate in bpm")
     
-    # --- Field for full time-series data ---
-    timeseries_data = models.JSONField(blank=True, null=True, help_text="Stores the full time-series data from the file")
-
     # --- Fields for ML analysis ---
     ml_prediction = models.CharField(max_length=100, blank=True, null=True)
     ml_confidence = models.FloatField(blank=True, null=True)
@@ -69,5 +111,579 @@ class RunningSession(models.Model):
     # --- Metadata ---
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Sessions list (and its keyset cursor), per volunteer or overall, newest first
+            models.Index(fields=['volunteer', '-session_date', '-id'], name='session_volunteer_date_idx'),
+            models.Index(fields=['-session_date', '-id'], name='session_date_idx'),
+            # ?ordering= on the summary columns
+            models.Index(fields=['total_distance_km'], name='session_distance_idx'),
+            models.Index(fields=['total_duration_secs'], name='session_duration_idx'),
+            models.Index(fields=['avg_heart_rate'], name='session_avg_hr_idx'),
+            models.Index(fields=['max_heart_rate'], name='session_max_hr_idx'),
+            # Nearly every session is completed, so only the others are worth indexing
+            models.Index(fields=['id'], name='session_failed_idx', condition=models.Q(status='failed')),
+            models.Index(fields=['id'], name='session_processing_idx', condition=models.Q(status='processing')),
+        ]
+
+    def __str__(self):
+        return f"Session for {self.volunteer.email} on {self.session_date.strftime('%Y-%m-%d')}"
+
+    @staticmethod
+    def date_range(date_from=None, date_to=None):
+        """
+        A Q matching sessions on or between two local dates. Compares
+        session_date itself rather than session_date__date so the date indexes
+        can be used.
+        """
+        condition = models.Q()
+        if date_from is not None:
+            condition &= models.Q(session_date__gte=timezone.make_aware(datetime.datetime.combine(date_from, datetime.time.min)))
+        if date_to is not None:
+            next_day = date_to + datetime.timedelta(days=1)
+            condition &= models.Q(session_date__lt=timezone.make_aware(datetime.datetime.combine(next_day, datetime.time.min)))
+        return condition
+
+    # --- Time-series access (stored column-wise in SessionTimeseries) ---
+    def get_timeseries(self):
+        """Returns the session's ColumnarSeries with its labels applied, or None."""
+        try:
+            series = self.timeseries.to_series()
+        except SessionTimeseries.DoesNotExist:
+            return None
+        try:
+            return self.labels.apply(series)
+        except SessionLabels.DoesNotExist:
+            return series
+
+    @property
+    def timeseries_data(self):
+        """The time-series in its original list-of-records shape."""
+        series = self.get_timeseries()
+        return series.to_records() if series is not None else None
+
+    def set_timeseries_data(self, records):
+        """Encodes and stores a list of records, replacing any existing data."""
+        if records is None:
+            SessionTimeseries.objects.filter(session=self).delete()
+            SessionTimeseriesLevel.objects.filter(session=self).delete()
+            SessionLabels.objects.filter(session=self).delete()
+            SessionAnomalyScores.objects.filter(session=self).delete()
+            SessionStatistics.objects.filter(session=self).delete()
+            return None
+        return SessionTimeseries.store(self, ColumnarSeries.from_records(records))
+
+    def label_anomalies(self, labels, replace=False):
+        """
+        Sets the anomaly flag of every sample whose timestamp string is a key of
+        ``labels`` to the truthiness of its value; with ``replace`` all other
+        samples are cleared. Only the SessionLabels bitmap is rewritten, under a
+        row lock, so concurrent labelers don't overwrite each other.
+
+        Returns the number of samples changed, or None if there is no data.
+        """
+        try:
+            stored = SessionTimeseries.objects.get(session=self)
+        except SessionTimeseries.DoesNotExist:
+            return None
+        timestamps = list(labels)
+        time_us = ColumnarSeries.decode_time(stored.schema, stored.data)
+        timestamp_format = stored.schema.get('timestamp_format')
+        if time_us is not None and timestamp_format is not None:
+            samples, requests = match_timestamps(time_us, timestamp_format, timestamps)
+        else:
+            # Timestamps were stored verbatim, so compare the raw values
+            column = stored.to_series().column(TIMESTAMP_KEY)
+            position = {value: i for i, value in enumerate(timestamps)}
+            pairs = [
+                (sample, position[value]) for sample, value in enumerate(column.to_list() if column else [])
+                if isinstance(value, str) and value in position
+            ]
+            samples = np.array([sample for sample, _ in pairs], dtype=np.int64)
+            requests = np.array([request for _, request in pairs], dtype=np.int64)
+        values = np.array([bool(labels[value]) for value in timestamps], dtype=bool)[requests]
+
+        with transaction.atomic():
+            row, _ = SessionLabels.objects.select_for_update().get_or_create(
+                session=self, defaults={'num_records': stored.num_records},
+            )
+            flags = row.flags(stored.num_records)
+            before = flags.copy()
+            if replace:
+                flags[:] = False
+            flags[samples] = values
+            row.set_flags(flags)
+            row.save()
+            SessionStatistics.objects.filter(session=self).update(anomaly_samples=int(flags.sum()))
+        return int((flags != before).sum())
+
+
+class SessionTimeseries(models.Model):
+    """
+    Columnar storage for a session's full time-series data. The samples live in
+    a compressed binary archive (see volunteers/timeseries.py) instead of one
+    JSON object per record, which keeps the session rows small.
+    """
+    session = models.OneToOneField(RunningSession, on_delete=models.CASCADE, primary_key=True, related_name='timeseries')
+    start_time = models.DateTimeField(null=True, blank=True, help_text="Timestamp of the first sample")
+    num_records = models.PositiveIntegerField(default=0)
+    schema = models.JSONField(default=dict, help_text="Channel names, kinds and timestamp format")
+    data = models.BinaryField(help_text="Compressed .npz archive holding one array per channel")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Time-series for session {self.session_id} ({self.num_records} records)"
+
+    def to_series(self):
+        return ColumnarSeries.decode(self.schema, self.data)
+
+    @classmethod
+    def store(cls, session, series):
+        schema, blob = series.encode()
+        return cls.store_encoded(session, schema, blob, series.start_datetime(), len(series), series)
+
+    @classmethod
+    def store_encoded(cls, session, schema, blob, start_time, num_records, series=None):
+        """
+        Stores an already encoded series and rebuilds its downsample pyramid
+        and statistics. Pass the in-memory ``series`` if there is one to avoid
+        decoding it.
+        """
+        if series is None:
+            with stage(STAGE_TRANSFORM):
+                series = ColumnarSeries.decode(schema, blob)
+        SessionTimeseriesLevel.rebuild(session, series)
+        instance, _ = cls.objects.update_or_create(
+            session=session,
+            defaults={
+                'start_time': start_time,
+                'num_records': num_records,
+                'schema': schema,
+                'data': blob,
+            },
+        )
+        SessionStatistics.store(session, series)
+        return instance
+
+
+class SessionTimeseriesLevel(models.Model):
+    """
+    One level of a session's downsample pyramid: min/max/mean of every numeric
+    channel over fixed-width time buckets (see timeseries.build_level). Levels
+    that would not be at least half the size of the raw series are not stored.
+    """
+    session = models.ForeignKey(RunningSession, on_delete=models.CASCADE, related_name='timeseries_levels')
+    resolution_secs = models.PositiveIntegerField(help_text="Bucket width in seconds")
+    num_buckets = models.PositiveIntegerField(default=0)
+    schema = models.JSONField(default=dict, help_text="Bucket width, start time and channel names")
+    data = models.BinaryField(help_text="Compressed .npz archive of per-bucket min/max/mean arrays")
+
+    class Meta:
+        ordering = ['resolution_secs']
+        constraints = [
+            models.UniqueConstraint(fields=['session', 'resolution_secs'], name='unique_session_level'),
+        ]
+
+    def __str__(self):
+        return f"{self.resolution_secs}s level for session {self.session_id} ({self.num_buckets} buckets)"
+
+    def to_json(self, fields=None):
+        return decode_level(self.schema, self.data, fields)
+
+    @classmethod
+    def rebuild(cls, session, series):
+        """Replaces a session's pyramid with levels computed from ``series``."""
+        with stage(STAGE_SUMMARY):
+            pyramid = build_pyramid(series)
+        levels = [
+            cls(session=session, resolution_secs=resolution_secs, num_buckets=schema['num_buckets'], schema=schema, data=blob)
+            for resolution_secs, (schema, blob) in pyramid.items()
+        ]
+        with transaction.atomic():
+            cls.objects.filter(session=session).delete()
+            cls.objects.bulk_create(levels)
+        return levels
+
+
+class SessionLabels(models.Model):
+    """
+    Per-sample anomaly labels kept apart from the time-series as a bitmap
+    indexed by sample position. Labeling rewrites this small row only; the
+    flags are overlaid onto the series' Anomaly channel when it is read.
+    """
+    session = models.OneToOneField(RunningSession, on_delete=models.CASCADE, primary_key=True, related_name='labels')
+    num_records = models.PositiveIntegerField(default=0)
+    anomaly_bitmap = models.BinaryField(default=bytes, help_text="np.packbits() of one anomaly flag per sample")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Labels for session {self.session_id}"
+
+    def flags(self, num_records=None):
+        """
+        Returns the flags as a bool array. If the series has since changed
+        length, the stale labels can't be mapped onto it and all-False is used.
+        """
+        num_records = self.num_records if num_records is None else num_records
+        if num_records != self.num_records:
+            logger.warning(f"Discarding labels of session {self.session_id}: {self.num_records} labels for {num_records} samples")
+            return np.zeros(num_records, dtype=bool)
+        return unpack_flags(self.anomaly_bitmap, num_records)
+
+    def set_flags(self, flags):
+        self.num_records = len(flags)
+        self.anomaly_bitmap = np.packbits(flags).tobytes()
+
+    def apply(self, series):
+        """Returns ``series`` with its Anomaly channel replaced by these labels."""
+        if self.num_records != len(series):
+            logger.warning(f"Ignoring labels of session {self.session_id}: {self.num_records} labels for {len(series)} samples")
+            return series
+        columns = dict(series.columns)
+        columns[LABEL_CHANNEL] = Column(KIND_INT, self.flags().astype(np.int64))
+        return ColumnarSeries(series.length, columns, series.time_us, series.timestamp_format)
+
+
+class SessionAnomalyScores(models.Model):
+    """
+    Per-sample anomaly scores from the detection stage (see detection.py), one
+    float16 per sample in sample order, plus the detector's summary counts.
+    """
+    session = models.OneToOneField(RunningSession, on_delete=models.CASCADE, primary_key=True, related_name='anomaly_scores')
+    detector_version = models.CharField(max_length=20)
+    num_records = models.PositiveIntegerField(default=0)
+    scores = models.BinaryField(help_text="Little-endian float16 score per sample, in [0, 1)")
+    summary = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Anomaly scores for session {self.session_id}"
+
+    def to_array(self):
+        return np.frombuffer(bytes(self.scores), dtype='<f2').astype(np.float32)
+
+    @staticmethod
+    def values_from(result):
+        """Field values for a DetectionResult."""
+        return {
+            'detector_version': result.summary['detector_version'],
+            'num_records': len(result.scores),
+            'scores': result.scores.astype('<f2').tobytes(),
+            'summary': result.summary,
+        }
+
+    @classmethod
+    def store(cls, session, result):
+        """Saves a DetectionResult's scores for a session."""
+        instance, _ = cls.objects.update_or_create(session=session, defaults=cls.values_from(result))
+        return instance
+
+    @classmethod
+    def store_many(cls, results):
+        """
+        Saves DetectionResults for many sessions at once; ``results`` maps
+        session IDs to results. Uses a single upsert per call.
+        """
+        rows = [cls(session_id=session_id, **cls.values_from(result)) for session_id, result in results.items()]
+        cls.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['session'],
+            update_fields=['detector_version', 'num_records', 'scores', 'summary', 'updated_at'],
+        )
+
+
+class SessionStatistics(models.Model):
+    """
+    Summary statistics of a session's series (see analytics.py), computed
+    whenever the series is stored. Cohort analytics aggregate these rows.
+    """
+    session = models.OneToOneField(RunningSession, on_delete=models.CASCADE, primary_key=True, related_name='statistics')
+    stats_version = models.CharField(max_length=20)
+
+    # --- Sampling ---
+    num_samples = models.PositiveIntegerField(default=0)
+    sample_interval_secs = models.FloatField(null=True, blank=True, help_text="Median time between samples")
+    num_gaps = models.PositiveIntegerField(default=0, help_text="Pauses much longer than the sample interval")
+    longest_gap_secs = models.FloatField(null=True, blank=True)
+
+    # --- Heart rate ---
+    hr_samples = models.PositiveIntegerField(default=0)
+    hr_min = models.FloatField(null=True, blank=True)
+    hr_mean = models.FloatField(null=True, blank=True)
+    hr_max = models.FloatField(null=True, blank=True)
+    hr_p5 = models.FloatField(null=True, blank=True)
+    hr_p25 = models.FloatField(null=True, blank=True)
+    hr_p50 = models.FloatField(null=True, blank=True)
+    hr_p75 = models.FloatField(null=True, blank=True)
+    hr_p95 = models.FloatField(null=True, blank=True)
+    hr_drift_pct = models.FloatField(null=True, blank=True, help_text="Change in HR per unit speed, first half to second")
+
+    # --- Time in heart-rate zone, as a share of the age-predicted maximum ---
+    zone_reference_hr = models.PositiveIntegerField(null=True, blank=True, help_text="220 - age; zones are empty without it")
+    hr_zone0_secs = models.FloatField(null=True, blank=True, help_text="Below 50%")
+    hr_zone1_secs = models.FloatField(null=True, blank=True, help_text="50-60%")
+    hr_zone2_secs = models.FloatField(null=True, blank=True, help_text="60-70%")
+    hr_zone3_secs = models.FloatField(null=True, blank=True, help_text="70-80%")
+    hr_zone4_secs = models.FloatField(null=True, blank=True, help_text="80-90%")
+    hr_zone5_secs = models.FloatField(null=True, blank=True, help_text="90% and above")
+
+    # --- Effort and terrain ---
+    cadence_mean = models.FloatField(null=True, blank=True)
+    speed_mean = models.FloatField(null=True, blank=True, help_text="Mean speed while moving, in m/s")
+    elevation_gain_m = models.FloatField(null=True, blank=True)
+
+    # --- Labels ---
+    anomaly_samples = models.PositiveIntegerField(default=0, help_text="Samples labeled as anomalous")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'session statistics'
+
+    def __str__(self):
+        return f"Statistics for session {self.session_id}"
+
+    @classmethod
+    def store(cls, session, series):
+        """Computes and saves the statistics of a session's (labeled) series."""
+        try:
+            series = session.labels.apply(series)
+        except SessionLabels.DoesNotExist:
+            pass
+        age = age_on(session.volunteer.date_of_birth, session.session_date)
+        with stage(STAGE_SUMMARY):
+            values = compute_session_statistics(series, reference_max_heart_rate(age))
+        instance, _ = cls.objects.update_or_create(session=session, defaults=values)
+        return instance
+
+
+class ScoringRun(models.Model):
+    """
+    One rescoring of many sessions with the current detector, started from the
+    API after the detection thresholds change. The task updates the progress
+    counters after every chunk of sessions.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    # --- Which sessions to score ---
+    volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE, null=True, blank=True, related_name='scoring_runs')
+    date_from = models.DateField(null=True, blank=True, help_text="Only sessions on or after this date")
+    date_to = models.DateField(null=True, blank=True, help_text="Only sessions on or before this date")
+    session_status = models.CharField(max_length=10, choices=RunningSession.STATUS_CHOICES, default=RunningSession.STATUS_COMPLETED)
+
+    # --- Progress, written by the rescore_sessions task ---
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    detector_version = models.CharField(max_length=20, blank=True, null=True)
+    task_id = models.CharField(max_length=255, blank=True, null=True)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    sessions_per_second = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Scoring run {self.id} ({self.status})"
+
+    def get_sessions(self):
+        """The sessions matched by this run's filters."""
+        sessions = RunningSession.objects.filter(RunningSession.date_range(self.date_from, self.date_to), status=self.session_status)
+        if self.volunteer_id is not None:
+            sessions = sessions.filter(volunteer_id=self.volunteer_id)
+        return sessions
+
+
+class ParsedFileResult(models.Model):
+    """
+    Cached parser output keyed by the file's content hash, file type and parser
+    version. Re-uploads of an identical file, and re-processing of an unchanged
+    one, copy this result instead of parsing the file again.
+    """
+    content_hash = models.CharField(max_length=64, help_text="BLAKE2b-256 hex digest of the parsed file")
+    file_type = models.CharField(max_length=10, help_text="Extension that selected the parser, e.g. '.fit'")
+    parser_version = models.CharField(max_length=20)
+    summary = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    start_time = models.DateTimeField(null=True, blank=True)
+    num_records = models.PositiveIntegerField(default=0)
+    schema = models.JSONField(null=True, blank=True, help_text="Columnar schema, or null if the file had no time-series")
+    data = models.BinaryField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_hash', 'file_type', 'parser_version'],
+                name='unique_parsed_file_result',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.file_type} result {self.content_hash[:12]} (parser {self.parser_version})"
+
+    @classmethod
+    def lookup(cls, content_hash, file_type, parser_version):
+        return cls.objects.filter(
+            content_hash=content_hash, file_type=file_type, parser_version=parser_version
+        ).first()
+
+    @classmethod
+    def remember(cls, parser_version, parsed):
+        """
+        Stores the output of utils.parse_session_file(); if a concurrent insert
+        of the same key wins the race, that row is returned instead.
+        """
+        try:
+            with transaction.atomic():
+                return cls.objects.create(parser_version=parser_version, **parsed)
+        except IntegrityError:
+            return cls.lookup(parsed['content_hash'], parsed['file_type'], parser_version)
+
+    def to_series(self):
+        return ColumnarSeries.decode(self.schema, self.data) if self.schema is not None else None
+
+    def apply_timeseries(self, session, series=None):
+        """
+        Copies the cached time-series onto a session, replacing its data. Pass
+        the already decoded ``series`` if there is one.
+        """
+        if self.schema is None:
+            return session.set_timeseries_data(None)
+        return SessionTimeseries.store_encoded(session, self.schema, self.data, self.start_time, self.num_records, series)
+
+
+class SessionUpload(models.Model):
+    """
+    A session file uploaded straight to storage in parts (see uploads.py),
+    so its bytes never pass through a web worker. Completing the upload
+    creates the RunningSession and queues its processing.
+    """
+    STATUS_UPLOADING = 'uploading'
+    STATUS_COMPLETED = 'completed'
+
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, 'Uploading'),
+        (STATUS_COMPLETED, 'Completed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    # --- The session to create ---
+    volunteer = models.ForeignKey(Volunteer, on_delete=models.CASCADE, related_name='session_uploads')
+    session_date = models.DateTimeField()
+    source_type = models.CharField(max_length=50, default='admin_upload')
+
+    # --- The file ---
+    file_name = models.CharField(max_length=255, help_text="Name of the file on the client")
+    file_size = models.PositiveBigIntegerField(help_text="Size in bytes")
+    part_size = models.PositiveIntegerField(help_text="Size of every part but the last, in bytes")
+    storage_name = models.CharField(max_length=255, help_text="Name the assembled file is stored under")
+    multipart_id = models.CharField(max_length=1024, blank=True, null=True, help_text="S3 UploadId; empty for local chunked uploads")
+
+    # --- Progress ---
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_UPLOADING)
+    session = models.OneToOneField(RunningSession, on_delete=models.SET_NULL, null=True, blank=True, related_name='upload')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Upload of {self.file_name} ({self.status})"
+
+    @property
+    def part_count(self):
+        return max(1, -(-self.file_size // self.part_size))
+
+    def part_sizes(self):
+        """Yields ``(part_number, size)`` for every part; numbers start at 1."""
+        for number in range(1, self.part_count + 1):
+            yield number, min(self.part_size, self.file_size - (number - 1) * self.part_size)
+
+
+class ProcessingMetrics(models.Model):
+    """
+    Stage timings and sizes of one run of process_session_file (see
+    instrumentation.py), exported to Prometheus by metrics.py. Rows outlive
+    their session so that the exported totals only ever grow.
+    """
+    session = models.ForeignKey(RunningSession, on_delete=models.SET_NULL, null=True, blank=True, related_name='processing_metrics')
+    file_type = models.CharField(max_length=10, help_text="e.g. '.fit' or '.tcx.gz'")
+    parser_version = models.CharField(max_length=20)
+    status = models.CharField(max_length=10, choices=RunningSession.STATUS_CHOICES)
+    cached_result = models.BooleanField(default=False, help_text="Reused the parse result of identical bytes instead of parsing")
+
+    # --- Sizes ---
+    num_records = models.PositiveIntegerField(null=True, blank=True)
+    bytes_in = models.PositiveBigIntegerField(null=True, blank=True, help_text="Size of the stored file, if it was read")
+    bytes_out = models.PositiveBigIntegerField(null=True, blank=True, help_text="Size of the encoded time-series written")
+    peak_rss_bytes = models.PositiveBigIntegerField(null=True, blank=True, help_text="Peak RSS of the worker process so far")
+
+    # --- Seconds per stage; null if the stage didn't run ---
+    fetch_secs = models.FloatField(null=True, blank=True)
+    parse_secs = models.FloatField(null=True, blank=True)
+    transform_secs = models.FloatField(null=True, blank=True)
+    summary_secs = models.FloatField(null=True, blank=True)
+    db_write_secs = models.FloatField(null=True, blank=True)
+    total_secs = models.FloatField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'processing metrics'
+        indexes = [
+            models.Index(fields=['created_at'], name='processing_metrics_time_idx'),
+            models.Index(fields=['file_type', 'created_at'], name='processing_metrics_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"Processing of session {self.session_id} ({self.status}, {self.total_secs:.2f}s)"
+
+    @classmethod
+    def record(cls, session, trace):
+        """Stores the ProcessingTrace of one run for ``session``."""
+        seconds = {f'{name}_secs': trace.seconds.get(name) for name in STAGES}
+        return cls.objects.create(
+            session=session,
+            file_type=trace.file_type or '',
+            parser_version=trace.parser_version or '',
+            status=session.status,
+            cached_result=trace.cached_result,
+            num_records=trace.num_records,
+            bytes_in=trace.bytes_in,
+            bytes_out=trace.bytes_out,
+            peak_rss_bytes=peak_rss_bytes(),
+            total_secs=trace.total_seconds,
+            **seconds,
+        )
+
+
+class ProcessingMetricsTotals(models.Model):
+    """
+    Totals of the ProcessingMetrics rows older than METRICS_RETENTION_DAYS,
+    which metrics.roll_up_metrics() folds in here and deletes. The exported
+    counters add these to the rows still kept, so they keep growing while the
+    table stays small.
+    """
+    file_type = models.CharField(max_length=10)
+    status = models.CharField(max_length=10, choices=RunningSession.STATUS_CHOICES)
+    cached_result = models.BooleanField(default=False)
+    runs = models.PositiveBigIntegerField(default=0)
+    counters = models.JSONField(default=dict, help_text="Sums and histogram buckets of the rolled-up runs, keyed as in metrics.py")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'processing metrics totals'
+        constraints = [
+            models.UniqueConstraint(fields=['file_type', 'status', 'cached_result'], name='unique_processing_metrics_totals'),
+        ]
+
     def __str__(self):
-        return f"Session for {self.volunteer.email} on {self.session_date.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"{self.file_type} {self.status} totals ({self.runs} runs)"
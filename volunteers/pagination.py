@@ -1,7 +1,30 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 class CustomPageNumberPagination(PageNumberPagination):
     # Allows the frontend to specify the page size with a URL parameter, e.g., ?page_size=25
     page_size_query_param = 'page_size'
     # Sets a reasonable upper limit for how many items can be requested at once
-    max_page_size = 1000
\ No newline at end of file
+    max_page_size = 1000
+
+
+class SessionCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the sessions list, newest first. A cursor holds the
+    session_date a page starts from (and how many rows sharing it were already
+    returned), so deep pages cost the same as the first one and no COUNT(*) is
+    run. ?ordering= changes the key the cursor follows.
+    """
+    ordering = ('-session_date', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_previous_link(self):
+        # On a final page whose rows all share one session_date, DRF's link
+        # steps back a whole page_size from the end of the list, which skips
+        # rows when that page is short; step back over the rows shown instead
+        page_size = self.page_size
+        self.page_size = len(self.page) or page_size
+        try:
+            return super().get_previous_link()
+        finally:
+            self.page_size = page_size
@@ -0,0 +1,52 @@
+# backend/volunteers/renderers.py
+
+from collections.abc import Mapping
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .timeseries import ColumnarSeries
+
+
+class PrometheusTextRenderer(BaseRenderer):
+    """Plain text for the Prometheus metrics endpoint; errors are sent as JSON text."""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return JSONRenderer().render(data)
+
+
+class SessionArrowRenderer(BaseRenderer):
+    """
+    Renders a session as an Arrow IPC stream: one record batch holding its
+    time-series with typed columns (see ColumnarSeries.to_arrow()), and the
+    session's other fields as JSON in the schema metadata under 'session'.
+    Error bodies travel the same way, with an empty batch.
+
+    The serializer hands over the ColumnarSeries itself when this renderer is
+    selected, so samples never pass through Python dicts or ISO strings.
+    """
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # pyarrow is imported lazily: only this format needs it
+        import pyarrow as pa
+
+        payload = dict(data) if isinstance(data, Mapping) else {'detail': data}
+        series = payload.pop('timeseries_data', None)
+        if isinstance(series, list):
+            series = ColumnarSeries.from_records(series)
+        batch = series.to_arrow() if series is not None else pa.record_batch([])
+        metadata = {b'session': JSONRenderer().render(payload)}
+        batch = batch.replace_schema_metadata(metadata)
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue().to_pybytes()
@@ -1,7 +1,23 @@
 # backend/volunteers/serializers.py
 
+import contextlib
+import gzip
+import os
+import tempfile
+import zipfile
+import zlib
+
+import pandas as pd
+from django.conf import settings
+from django.core.files import File
+from django.db.models import Q
 from rest_framework import serializers
-from .models import Volunteer, RunningSession
+from .models import Volunteer, RunningSession, ScoringRun, SessionUpload, UploadBatch
+from .analytics import ANALYTICS_GROUPS
+from .export import EXPORT_CSV, EXPORT_FORMATS
+from .timeseries import DOWNSAMPLE_LTTB, DOWNSAMPLE_METHODS
+from .session_files import ARCHIVE_EXTENSIONS, COMPRESSED_EXTENSIONS, archive_members
+from .utils import session_file_type, supported_file_types
 
 # VolunteerSerializer remains the same
 class VolunteerSerializer(serializers.ModelSerializer):
@@ -23,9 +39,13 @@ class RunningSessionSerializer(serializers.ModelSerializer):
     volunteer_first_name = serializers.CharField(source='volunteer.first_name', read_only=True)
     volunteer_last_name = serializers.CharField(source='volunteer.last_name', read_only=True)
     
-    # This explicitly defines the timeseries_data field as a read-only JSON field.
-    # It's a good practice for clarity and safety.
-    timeseries_data = serializers.JSONField(read_only=True)
+    # This explicitly defines the timeseries_data field as read-only. The data is
+    # stored column-wise and rebuilt into the original list-of-records shape; a
+    # 'timeseries_query' in the context (see TimeseriesQuerySerializer) limits it
+    # to a window, a set of channels and/or a number of points. With
+    # 'timeseries_columnar' the ColumnarSeries itself is returned for binary
+    # renderers (see renderers.SessionArrowRenderer).
+    timeseries_data = serializers.SerializerMethodField()
     
     class Meta:
         model = RunningSession
@@ -44,6 +64,125 @@ class RunningSessionSerializer(serializers.ModelSerializer):
             'volunteer_last_name'
         ]
 
+    def get_timeseries_data(self, obj):
+        query = self.context.get('timeseries_query')
+        columnar = self.context.get('timeseries_columnar', False)
+        if not query and not columnar:
+            return obj.timeseries_data
+        series = obj.get_timeseries()
+        if series is None:
+            return None
+        if query:
+            series = TimeseriesQuerySerializer.apply(query, series)
+        return series if columnar else series.to_records()
+
+
+class RunningSessionListSerializer(serializers.Serializer):
+    """
+    Read-only summary of a session for the list endpoint. It serializes the
+    dicts of a values() query (see RunningSessionViewSet.get_queryset), so a
+    page costs one query and builds no model instances or series.
+    """
+    # Columns selected from RunningSession; the volunteer names are joined in
+    MODEL_FIELDS = (
+        'id', 'volunteer', 'session_date', 'source_type', 'session_file', 'status', 'processing_error',
+        'total_distance_km', 'total_duration_secs', 'avg_heart_rate', 'max_heart_rate',
+        'ml_prediction', 'ml_confidence', 'admin_label', 'uploaded_at',
+    )
+
+    id = serializers.IntegerField()
+    volunteer = serializers.IntegerField()
+    session_date = serializers.DateTimeField()
+    source_type = serializers.CharField()
+    session_file = serializers.SerializerMethodField()
+    status = serializers.CharField()
+    processing_error = serializers.CharField(allow_null=True)
+    total_distance_km = serializers.FloatField(allow_null=True)
+    total_duration_secs = serializers.FloatField(allow_null=True)
+    avg_heart_rate = serializers.IntegerField(allow_null=True)
+    max_heart_rate = serializers.IntegerField(allow_null=True)
+    ml_prediction = serializers.CharField(allow_null=True)
+    ml_confidence = serializers.FloatField(allow_null=True)
+    admin_label = serializers.CharField(allow_null=True)
+    uploaded_at = serializers.DateTimeField()
+    volunteer_first_name = serializers.CharField()
+    volunteer_last_name = serializers.CharField()
+
+    def get_session_file(self, row):
+        """The file's URL, absolute like the detail's FileField renders it."""
+        if not row['session_file']:
+            return None
+        url = RunningSession._meta.get_field('session_file').storage.url(row['session_file'])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class TimeseriesQuerySerializer(serializers.Serializer):
+    """
+    Query parameters that window a session's time-series, e.g.
+    ``?start=600&end=1200&fields=heart_rate,speed&max_points=500``.
+
+    ``start`` and ``end`` are either seconds from the first sample or ISO
+    8601 datetimes (UTC if no offset is given).
+    """
+    start = serializers.CharField(required=False)
+    end = serializers.CharField(required=False)
+    fields = serializers.CharField(required=False, help_text="Comma-separated channel names")
+    max_points = serializers.IntegerField(required=False, min_value=2)
+    downsample = serializers.ChoiceField(choices=DOWNSAMPLE_METHODS, default=DOWNSAMPLE_LTTB)
+
+    QUERY_PARAMS = ('start', 'end', 'fields', 'max_points', 'downsample')
+
+    def _parse_bound(self, value):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            timestamp = pd.Timestamp(value)
+        except ValueError:
+            raise serializers.ValidationError("Expected seconds from the start or an ISO 8601 datetime.")
+        if timestamp is pd.NaT:
+            raise serializers.ValidationError("Expected seconds from the start or an ISO 8601 datetime.")
+        return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp
+
+    def validate_start(self, value):
+        return self._parse_bound(value)
+
+    def validate_end(self, value):
+        return self._parse_bound(value)
+
+    def validate_fields(self, value):
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    @classmethod
+    def from_request(cls, request):
+        """Returns the validated query, or None if the request asked for no windowing."""
+        if not any(param in request.query_params for param in cls.QUERY_PARAMS):
+            return None
+        serializer = cls(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    @staticmethod
+    def _bound_us(bound, series):
+        if bound is None:
+            return None
+        if isinstance(bound, float):
+            return series.start_us + int(bound * 1e6) if series.start_us is not None else None
+        return bound.value // 1000
+
+    @classmethod
+    def apply(cls, query, series):
+        """Applies a validated query to a ColumnarSeries."""
+        fields = query.get('fields')
+        if fields:
+            series = series.select(fields)
+        series = series.between(cls._bound_us(query.get('start'), series), cls._bound_us(query.get('end'), series))
+        channel = fields[0] if fields else None
+        return series.downsample(query.get('max_points'), query.get('downsample', DOWNSAMPLE_LTTB), channel)
+
+
 # SessionLabelUpdateSerializer remains the same
 class SessionLabelUpdateSerializer(serializers.ModelSerializer):
     """A simple serializer for updating only the session-level admin_label."""
@@ -68,21 +207,267 @@ class RecordLabelUpdateSerializer(serializers.Serializer):
     def update(self, instance, validated_data):
         """
         This method is called when .save() is executed on the serializer in the view.
-        It updates the 'Anomaly' flag within the JSONField.
+        It sets the 'Anomaly' flag of the listed records and clears it everywhere else.
         """
         anomalous_ts_set = set(validated_data.get('anomalous_timestamps', []))
-        
-        if instance.timeseries_data is None:
-            # Cannot label records if there are none, so we do nothing.
-            return instance
-
-        # Iterate through the records and update the 'Anomaly' flag
-        for record in instance.timeseries_data:
-            if record.get('timestamp') in anomalous_ts_set:
-                record['Anomaly'] = 1
-            else:
-                # This part is crucial to un-mark records that are no longer considered anomalous
-                record['Anomaly'] = 0
-        
-        instance.save()
-        return instance
\ No newline at end of file
+
+        # Cannot label records if there are none, in which case this does nothing.
+        # Only the session's label bitmap is rewritten, never the samples.
+        instance.label_anomalies(dict.fromkeys(anomalous_ts_set, 1), replace=True)
+        return instance
+
+
+# --- Batch uploads ---
+class UploadBatchSerializer(serializers.ModelSerializer):
+    """
+    Read-only view of a batch. The counts are annotated onto the queryset by
+    UploadBatchViewSet, so a batch's progress costs a single query.
+    """
+    total = serializers.IntegerField(read_only=True)
+    processing = serializers.IntegerField(read_only=True)
+    completed = serializers.IntegerField(read_only=True)
+    failed = serializers.IntegerField(read_only=True)
+    progress = serializers.SerializerMethodField()
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadBatch
+        fields = [
+            'id', 'volunteer', 'source_type', 'created_at', 'completed_at',
+            'total', 'processing', 'completed', 'failed', 'progress', 'status',
+        ]
+
+    def get_progress(self, obj):
+        """Percentage of sessions that have finished, successfully or not."""
+        if not obj.total:
+            return 100.0
+        return round(100.0 * (obj.completed + obj.failed) / obj.total, 1)
+
+    def get_status(self, obj):
+        return RunningSession.STATUS_PROCESSING if obj.processing else RunningSession.STATUS_COMPLETED
+
+
+# Bytes copied at a time from a batch upload's archive members
+MEMBER_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadBatchCreateSerializer(serializers.Serializer):
+    """
+    Validates a batch upload: any number of files under ``files`` and/or a zip
+    archive under ``archive``. Archive members of other types are skipped.
+    """
+    volunteer = serializers.PrimaryKeyRelatedField(queryset=Volunteer.objects.all())
+    source_type = serializers.CharField(max_length=50, default='admin_upload')
+    files = serializers.ListField(child=serializers.FileField(), required=False, default=list)
+    archive = serializers.FileField(required=False)
+
+    def validate_files(self, files):
+        unsupported = [f.name for f in files if session_file_type(f.name) not in supported_file_types()]
+        if unsupported:
+            raise serializers.ValidationError(f"Unsupported file type: {', '.join(unsupported)}")
+        return files
+
+    def validate_archive(self, archive):
+        if not zipfile.is_zipfile(archive):
+            raise serializers.ValidationError("The archive must be a .zip file.")
+        archive.seek(0)
+        return archive
+
+    def validate(self, attrs):
+        if not attrs.get('files') and not attrs.get('archive'):
+            raise serializers.ValidationError("Provide at least one file or a zip archive.")
+        return attrs
+
+    def iter_files(self):
+        """
+        Yields every session file in the upload, reading archive members one at
+        a time. Members are kept gzipped (run.fit -> run.fit.gz); the parsers
+        decompress them while reading.
+
+        A member that can't be read, or is larger than
+        BATCH_UPLOAD_MAX_MEMBER_SIZE, fails the upload with a ValidationError
+        naming it.
+        """
+        yield from self.validated_data.get('files', [])
+        archive = self.validated_data.get('archive')
+        if archive is None:
+            return
+        with zipfile.ZipFile(archive) as zf:
+            for info in archive_members(zf):
+                name = os.path.basename(info.filename)
+                file_type = session_file_type(name)
+                if file_type not in supported_file_types():
+                    continue
+                compress = not file_type.endswith(COMPRESSED_EXTENSIONS + ARCHIVE_EXTENSIONS)
+                member_file = self.extract_member(zf, info, compress)
+                try:
+                    yield File(member_file, name=f'{name}.gz' if compress else name)
+                finally:
+                    member_file.close()
+
+    @staticmethod
+    def extract_member(zf, info, compress):
+        """
+        Copies an archive member into a temporary file, gzipping it if
+        ``compress``, a chunk at a time. The size limit is checked against the
+        bytes actually read, as the sizes in the archive may be forged.
+        """
+        limit = settings.BATCH_UPLOAD_MAX_MEMBER_SIZE
+        too_large = serializers.ValidationError(
+            {'archive': [f"'{info.filename}' is larger than the {limit:,} byte limit for a session file."]}
+        )
+        if info.file_size > limit:
+            raise too_large
+        member_file = tempfile.TemporaryFile()
+        try:
+            with zf.open(info) as member, (
+                gzip.GzipFile(filename='', mode='wb', fileobj=member_file, mtime=0) if compress
+                else contextlib.nullcontext(member_file)
+            ) as target:
+                size = 0
+                for chunk in iter(lambda: member.read(MEMBER_CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    if size > limit:
+                        raise too_large
+                    target.write(chunk)
+        except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError) as e:
+            member_file.close()
+            raise serializers.ValidationError({'archive': [f"'{info.filename}' can't be read: {e}"]})
+        except BaseException:
+            member_file.close()
+            raise
+        member_file.seek(0)
+        return member_file
+
+
+# --- Direct uploads ---
+class SessionUploadSerializer(serializers.ModelSerializer):
+    """
+    A direct upload of one session file (see uploads.py). It is created from
+    the file's name and size; ``parts`` then tells the client where to send
+    each part, and which parts have been received already. The upload
+    backend is passed in the context as 'uploads'.
+    """
+    part_count = serializers.IntegerField(read_only=True)
+    parts = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SessionUpload
+        fields = [
+            'id', 'volunteer', 'session_date', 'source_type', 'file_name', 'file_size',
+            'part_size', 'part_count', 'parts', 'status', 'session', 'created_at', 'completed_at',
+        ]
+        read_only_fields = ['part_size', 'status', 'session', 'created_at', 'completed_at']
+
+    def validate_file_name(self, value):
+        if session_file_type(value) not in supported_file_types():
+            raise serializers.ValidationError(f"Unsupported file type: {value}")
+        return value
+
+    def validate_file_size(self, value):
+        if not 0 < value <= settings.SESSION_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Session files must be between 1 byte and {settings.SESSION_UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+    def get_parts(self, obj):
+        """Every part's number and size; unreceived parts also get the URL to PUT them to."""
+        if obj.status != SessionUpload.STATUS_UPLOADING:
+            return []
+        uploads, request = self.context['uploads'], self.context['request']
+        received = uploads.received_parts(obj)
+        parts = []
+        for number, size in obj.part_sizes():
+            part = {'part_number': number, 'size': size, 'received': received.get(number) == size}
+            if not part['received']:
+                part['url'] = uploads.part_url(obj, number, request)
+            parts.append(part)
+        return parts
+
+
+class ScoringRunSerializer(serializers.ModelSerializer):
+    """
+    A rescoring run: the filters are written once on creation, everything
+    else is progress reported by the rescore_sessions task.
+    """
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ScoringRun
+        fields = [
+            'id', 'volunteer', 'date_from', 'date_to', 'session_status',
+            'status', 'detector_version', 'total', 'processed', 'failed', 'progress',
+            'sessions_per_second', 'error', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'status', 'detector_version', 'total', 'processed', 'failed',
+            'sessions_per_second', 'error', 'created_at', 'started_at', 'finished_at',
+        ]
+
+    def get_progress(self, obj):
+        """Percentage of matched sessions scored so far."""
+        if not obj.total:
+            return 100.0 if obj.status == ScoringRun.STATUS_COMPLETED else 0.0
+        return round(100.0 * obj.processed / obj.total, 1)
+
+    def validate(self, attrs):
+        date_from, date_to = attrs.get('date_from'), attrs.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError("date_from must not be after date_to.")
+        return attrs
+
+
+class SessionFilterSerializer(serializers.Serializer):
+    """
+    Session filters shared by the export and analytics endpoints, read from
+    the query string: ?volunteer=&date_from=&date_to=&status=&labeled=
+    """
+    volunteer = serializers.PrimaryKeyRelatedField(queryset=Volunteer.objects.all(), required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=RunningSession.STATUS_CHOICES, default=RunningSession.STATUS_COMPLETED)
+    labeled = serializers.BooleanField(default=False, help_text="Only sessions with labeled samples or an admin label")
+
+    def validate(self, attrs):
+        date_from, date_to = attrs.get('date_from'), attrs.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError("date_from must not be after date_to.")
+        return attrs
+
+    def filter(self, sessions):
+        """Applies the validated filters to a RunningSession queryset."""
+        data = self.validated_data
+        sessions = sessions.filter(
+            RunningSession.date_range(data.get('date_from'), data.get('date_to')), status=data['status'],
+        )
+        if 'volunteer' in data:
+            sessions = sessions.filter(volunteer=data['volunteer'])
+        if data['labeled']:
+            # Not labels__isnull: the bitmap row outlives its last flag
+            sessions = sessions.filter(Q(statistics__anomaly_samples__gt=0) | Q(admin_label__isnull=False))
+        return sessions
+
+
+class SessionExportSerializer(SessionFilterSerializer):
+    """Options of a labeled dataset export: the filters plus ?fields=."""
+    file_format = serializers.ChoiceField(choices=list(EXPORT_FORMATS), default=EXPORT_CSV)
+    fields = serializers.CharField(required=False, help_text="Comma-separated channels to export")
+
+    def validate_fields(self, value):
+        return [name.strip() for name in value.split(',') if name.strip()] or None
+
+
+class SessionAnalyticsSerializer(SessionFilterSerializer):
+    """
+    Options of a cohort report: the filters plus ?group_by=, a comma-separated
+    list of ANALYTICS_GROUPS, e.g. ``?group_by=smartwatch,month``.
+    """
+    group_by = serializers.CharField(required=False, default='')
+
+    def validate_group_by(self, value):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in ANALYTICS_GROUPS]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown grouping: {', '.join(unknown)}. Choose from {', '.join(ANALYTICS_GROUPS)}."
+            )
+        return list(dict.fromkeys(names))
@@ -0,0 +1,235 @@
+# backend/volunteers/session_files.py
+
+import contextlib
+import gzip
+import hashlib
+import os
+import tempfile
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.files import File
+
+# ==============================================================================
+# SESSION FILE ACCESS
+# ==============================================================================
+# Session files may be stored compressed: gzipped (run.fit.gz) or as a zip
+# holding one activity. Parsers read them through open_session_file(), which
+# decompresses on the fly while they read, so a compressed upload is never
+# expanded to disk. Compression is recognised by its magic bytes, not by the
+# file name.
+#
+# A session file ("source") is either a filesystem path or a seekable binary
+# file object; a file object's ``name`` stands in for the file name.
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZIP_MAGIC = b'PK\x03\x04'
+
+COMPRESSED_EXTENSIONS = ('.gz',)
+ARCHIVE_EXTENSIONS = ('.zip',)
+
+
+def archive_members(archive):
+    """The entries of a zip that can be session files (no folders or OS metadata)."""
+    return [
+        info for info in archive.infolist()
+        if not info.is_dir() and not os.path.basename(info.filename).startswith('.')
+        and '__MACOSX' not in info.filename
+    ]
+
+
+def source_name(source):
+    """File name of a session file given as a path or a file object."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(source)
+    return os.path.basename(getattr(source, 'name', None) or '')
+
+
+def _single_member(archive, source):
+    members = archive_members(archive)
+    if len(members) != 1:
+        raise ValueError(
+            f"'{source_name(source)}' must contain exactly one session file, found {len(members)}. "
+            "Upload archives of several sessions as a batch."
+        )
+    return members[0]
+
+
+@contextlib.contextmanager
+def open_session_file(source):
+    """
+    Opens a session file as a binary stream of its (decompressed) contents.
+    Use as a context manager. A file object is read from its start and left
+    open, so the same one can be opened again.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        opened = open(source, 'rb')
+    else:
+        opened = contextlib.nullcontext(source)
+    with opened as raw:
+        raw.seek(0)
+        magic = raw.read(4)
+        raw.seek(0)
+        if magic.startswith(GZIP_MAGIC):
+            with gzip.GzipFile(fileobj=raw, mode='rb') as stream:
+                yield stream
+        elif magic == ZIP_MAGIC:
+            with zipfile.ZipFile(raw) as archive, archive.open(_single_member(archive, source)) as stream:
+                yield stream
+        else:
+            yield raw
+
+
+def read_session_file(source):
+    """The decompressed contents of a session file, as bytes."""
+    with open_session_file(source) as stream:
+        return stream.read()
+
+
+def inner_file_name(source):
+    """
+    Name of the activity file itself: without a .gz suffix, or the member's
+    name for a zip.
+    """
+    name = source_name(source)
+    lower = name.lower()
+    for extension in COMPRESSED_EXTENSIONS:
+        if lower.endswith(extension):
+            return name[:-len(extension)]
+    if lower.endswith(ARCHIVE_EXTENSIONS) and zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            members = archive_members(archive)
+            if len(members) == 1:
+                return os.path.basename(members[0].filename)
+    return name
+
+
+# ==============================================================================
+# STORED SESSION FILES
+# ==============================================================================
+# Processing reads a session's file through open_stored_file(). Files on a
+# local storage (FileSystemStorage) are opened where they are. Files on any
+# other storage (S3) are downloaded once into a local read-through cache and
+# opened from there, so processing the same file again doesn't download it
+# again. The cache is kept under SESSION_FILE_CACHE_SIZE bytes by deleting
+# the least recently used files; it may be shared by every worker on a host.
+#
+# Another worker's eviction can delete a file between its path being handed
+# out and it being opened. Files used in the last EVICTION_GRACE_SECS are
+# therefore never evicted, and open() fetches a file again if it is gone all
+# the same. Once open, a file can be read whoever deletes it.
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Long enough for reprocess_sessions to get through the files it has queued
+EVICTION_GRACE_SECS = 10 * 60
+
+
+class SessionFileCache:
+    """A directory of downloaded session files, evicted least recently used first."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, content_hash, field_file):
+        return os.path.join(self.directory, f'{content_hash}-{os.path.basename(field_file.name)}')
+
+    def path(self, field_file, content_hash=None):
+        """
+        Local path of a stored file, downloading it on a miss. Files are kept
+        under their content hash, computed while downloading, so a file is
+        found again once its session knows the hash.
+        """
+        if content_hash:
+            path = self._path(content_hash, field_file)
+            try:
+                # A hit: mark the file as recently used
+                os.utime(path)
+                return path
+            except FileNotFoundError:
+                pass
+
+        os.makedirs(self.directory, exist_ok=True)
+        # Downloaded under a temporary name and renamed once complete, so other
+        # workers never see a partial file
+        fd, download = tempfile.mkstemp(dir=self.directory, prefix='.download-')
+        try:
+            # The same digest as utils.compute_content_hash()
+            digest = hashlib.blake2b(digest_size=32)
+            with os.fdopen(fd, 'wb') as local, field_file.storage.open(field_file.name, 'rb') as remote:
+                for chunk in iter(lambda: remote.read(DOWNLOAD_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    local.write(chunk)
+            path = self._path(digest.hexdigest(), field_file)
+            os.replace(download, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(download)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def open(self, field_file, content_hash=None):
+        """Opens a stored file from the cache, fetching it again if it was evicted meanwhile."""
+        try:
+            return open(self.path(field_file, content_hash), 'rb')
+        except FileNotFoundError:
+            return open(self.path(field_file), 'rb')
+
+    def evict(self, keep=None):
+        """
+        Deletes the least recently used files until the cache fits in
+        max_bytes, sparing those used in the last EVICTION_GRACE_SECS.
+        """
+        recent = time.time() - EVICTION_GRACE_SECS
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # Evicted by another worker meanwhile
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for used, size, path in sorted(entries):
+            if total <= self.max_bytes or used > recent:
+                break
+            if path == keep:
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+            total -= size
+
+
+def session_file_cache():
+    return SessionFileCache(settings.SESSION_FILE_CACHE_DIR, settings.SESSION_FILE_CACHE_SIZE)
+
+
+def stored_file_path(field_file, content_hash=None):
+    """
+    Local path of a session's stored file (a FieldFile): the file itself on a
+    local storage, otherwise its cached download. Without the file's
+    ``content_hash`` the cache can't be searched, so it is downloaded.
+    """
+    try:
+        return field_file.path
+    except NotImplementedError:
+        return session_file_cache().path(field_file, content_hash)
+
+
+@contextlib.contextmanager
+def open_stored_file(field_file, content_hash=None):
+    """
+    Opens a session's stored file for the parsers. The file object carries
+    the stored name, from which the file type is read.
+    """
+    try:
+        opened = open(field_file.path, 'rb')
+    except NotImplementedError:
+        opened = session_file_cache().open(field_file, content_hash)
+    with opened as f:
+        yield File(f, name=field_file.name)
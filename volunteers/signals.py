@@ -0,0 +1,35 @@
+# backend/volunteers/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import invalidate_sessions, invalidate_volunteers
+from .models import RunningSession, SessionLabels, SessionTimeseries, Volunteer
+
+# ==============================================================================
+# RESPONSE CACHE INVALIDATION
+# ==============================================================================
+# Every model that makes up a cached response invalidates it when saved or
+# deleted. This covers the API's writes, label edits (update-anomalies and
+# label-records save SessionLabels) and processing; bulk_create/bulk_update
+# send no signals, so those callers invalidate explicitly.
+
+
+@receiver(post_save, sender=RunningSession)
+@receiver(post_delete, sender=RunningSession)
+def session_changed(sender, instance, **kwargs):
+    invalidate_sessions([instance.pk])
+
+
+@receiver(post_save, sender=SessionTimeseries)
+@receiver(post_delete, sender=SessionTimeseries)
+@receiver(post_save, sender=SessionLabels)
+@receiver(post_delete, sender=SessionLabels)
+def session_data_changed(sender, instance, **kwargs):
+    invalidate_sessions([instance.session_id])
+
+
+@receiver(post_save, sender=Volunteer)
+@receiver(post_delete, sender=Volunteer)
+def volunteer_changed(sender, instance, **kwargs):
+    invalidate_volunteers()
@@ -1,15 +1,162 @@
-from celery import shared_task
-from .models import RunningSession
-from .utils import analyze_session_file  # <-- IMPORT THE NEW MAIN FUNCTION
+import contextlib
+import datetime
+import time
+
+import billiard
+from celery import chord, shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, send_mail
+from django.db import InterfaceError, OperationalError, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+from .caching import invalidate_sessions
+from .detection import DETECTOR_VERSION, PREDICTION_INSUFFICIENT_DATA, detect_anomalies, detect_encoded
+from .metrics import roll_up_metrics
+from .instrumentation import STAGE_DB_WRITE, STAGE_FETCH, STAGE_SUMMARY, STAGE_TRANSFORM, current_trace, stage, tracing
+from .models import (
+    RunningSession, ParsedFileResult, ProcessingMetrics, ScoringRun, SessionAnomalyScores, SessionTimeseries, UploadBatch,
+    Volunteer,
+)
+from .session_files import open_stored_file
+from .utils import parse_session_file  # <-- IMPORT THE NEW MAIN FUNCTION
+from .utils import PARSER_VERSION, compute_content_hash, session_file_type
 import logging
 
+try:
+    from botocore.exceptions import ConnectionError as StorageConnectionError, HTTPClientError
+except ImportError:  # Optional: only needed when media files live on S3
+    StorageConnectionError = HTTPClientError = ConnectionError
+
 # Get an instance of a logger
 logger = logging.getLogger(__name__)
 
-@shared_task
-def process_session_file(session_id):
+# Queue of upload batch processing (the other routes are CELERY_TASK_ROUTES)
+QUEUE_BULK = 'bulk'
+
+# Failures worth retrying a processing run for: the storage or the database
+# was briefly unreachable. Anything else (a corrupt file) fails the session.
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, OperationalError, InterfaceError, StorageConnectionError, HTTPClientError)
+# Retries wait 10s, 20s, 40s, ... (with jitter, at most 10 minutes)
+PROCESSING_MAX_RETRIES = 5
+PROCESSING_RETRY_BACKOFF = 10
+PROCESSING_RETRY_BACKOFF_MAX = 600
+
+# Sessions scored, and written back, per rescore_sessions transaction
+RESCORE_CHUNK_SIZE = 100
+
+# Session columns written by apply_parse_result() and store_parse_result(),
+# for bulk_update() callers
+PARSE_RESULT_FIELDS = [
+    'content_hash', 'parser_version', 'total_distance_km', 'total_duration_secs',
+    'avg_heart_rate', 'max_heart_rate', 'status', 'processing_error', 'session_date',
+    'ml_prediction', 'ml_confidence',
+]
+# Session columns filled from a parser's summary
+SUMMARY_FIELDS = ['total_distance_km', 'total_duration_secs', 'avg_heart_rate', 'max_heart_rate']
+
+
+def apply_summary(session, summary_data):
+    """Copies a parser summary's totals onto a session without saving it."""
+    for field in SUMMARY_FIELDS:
+        setattr(session, field, summary_data.get(field))
+
+
+def apply_parse_result(session, result):
+    """
+    Copies a ParsedFileResult's summary onto a session without saving it.
+    The time-series is written separately with store_parse_result().
+    """
+    session.content_hash = result.content_hash
+    session.parser_version = result.parser_version
+    # Update the session model instance with the results
+    apply_summary(session, result.summary)
+    session.status = RunningSession.STATUS_COMPLETED
+    session.processing_error = None # Clear any previous errors
+    if session.batch_id and result.start_time:
+        # Batch uploads don't supply dates; the first sample provides it
+        session.session_date = result.start_time
+
+
+def run_detection(session, series):
+    """
+    Scores a session's samples and sets ml_prediction / ml_confidence on the
+    (unsaved) session. The per-sample scores are stored right away.
+    """
+    if series is None:
+        SessionAnomalyScores.objects.filter(session=session).delete()
+        session.ml_prediction, session.ml_confidence = PREDICTION_INSUFFICIENT_DATA, None
+        return None
+    with stage(STAGE_SUMMARY):
+        detection = detect_anomalies(series)
+    SessionAnomalyScores.store(session, detection)
+    session.ml_prediction = detection.prediction
+    session.ml_confidence = detection.confidence
+    return detection
+
+
+def store_parse_result(session, result):
+    """
+    Writes a parse result's time-series and detection output for a session.
+    Call inside a transaction, then save the session's PARSE_RESULT_FIELDS.
+    """
+    with stage(STAGE_TRANSFORM):
+        series = result.to_series()
+    # The full time-series is stored column-wise in its own table
+    result.apply_timeseries(session, series)
+    run_detection(session, series)
+
+
+def cached_parse_result(session, file_type):
+    """The cached parse result for a session's file content, if there is one."""
+    result = ParsedFileResult.lookup(session.content_hash, file_type, PARSER_VERSION)
+    if result is not None:
+        logger.info(f"Reusing cached parse result for Session ID: {session.id}")
+        trace = current_trace()
+        if trace is not None:
+            trace.cached_result = True
+    return result
+
+
+def load_parse_result(session):
+    """
+    Returns the ParsedFileResult for a session's file, filling in its content
+    hash if missing. Identical bytes parsed by the same parser version give
+    identical results, so copies of a file already seen skip parsing
+    entirely, and with the hash known up front the file isn't even fetched.
+    """
+    file_type = session_file_type(session.session_file.name)
+    if session.content_hash:
+        result = cached_parse_result(session, file_type)
+        if result is not None:
+            return result
+    with contextlib.ExitStack() as stack:
+        with stage(STAGE_FETCH):
+            # Works with any storage: remote files are read from a local cache
+            session_file = stack.enter_context(open_stored_file(session.session_file, session.content_hash))
+            trace = current_trace()
+            if trace is not None:
+                trace.bytes_in = session_file.size
+            if not session.content_hash:
+                session.content_hash = compute_content_hash(session_file)
+                result = cached_parse_result(session, file_type)
+                if result is not None:
+                    return result
+        parsed = parse_session_file(session_file, session.content_hash)
+    with stage(STAGE_DB_WRITE):
+        return ParsedFileResult.remember(PARSER_VERSION, parsed)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=PROCESSING_MAX_RETRIES, soft_time_limit=300, time_limit=330)
+def process_session_file(self, session_id):
     """
     Celery task to process an uploaded session file in the background.
+
+    The task is idempotent: a session that is no longer processing was
+    already finished by an earlier delivery of it, and is left alone. So it
+    is acknowledged late (redelivered if its worker dies) and retried with
+    backoff when the storage or database is briefly unavailable.
     """
     logger.info(f"Starting to process session file for Session ID: {session_id}")
     
@@ -18,33 +165,243 @@ def process_session_file(session_id):
     except RunningSession.DoesNotExist:
         logger.error(f"Session with ID {session_id} does not exist.")
         return
+    if session.status != RunningSession.STATUS_PROCESSING:
+        logger.info(f"Session ID {session_id} was already processed ({session.status}); skipping.")
+        return
 
+    # Stage timings and sizes are stored per run (see instrumentation.py)
+    with tracing() as trace:
+        trace.file_type = session_file_type(session.session_file.name or '')
+        trace.parser_version = PARSER_VERSION
+        try:
+            result = load_parse_result(session)
+            trace.num_records = result.num_records
+            trace.bytes_out = len(result.data) if result.data is not None else 0
+            apply_parse_result(session, result)
+            with stage(STAGE_DB_WRITE), transaction.atomic():
+                store_parse_result(session, result)
+                session.save()
+
+            logger.info(f"Successfully processed session file for Session ID: {session_id}")
+
+        except TRANSIENT_ERRORS as e:
+            if self.request.retries >= self.max_retries:
+                mark_session_failed(session, e)
+            else:
+                countdown = get_exponential_backoff_interval(
+                    PROCESSING_RETRY_BACKOFF, self.request.retries, PROCESSING_RETRY_BACKOFF_MAX, full_jitter=True,
+                )
+                logger.warning(f"Retrying session ID {session_id} in {countdown}s after: {e}")
+                raise self.retry(exc=e, countdown=countdown)
+        except Exception as e:
+            mark_session_failed(session, e)
+    record_processing_metrics(session, trace)
+
+
+def mark_session_failed(session, error):
+    logger.error(f"Error processing session ID {session.id}: {error}")
+    # If any error occurs during processing, mark the session as 'failed'
+    session.status = RunningSession.STATUS_FAILED
+    session.processing_error = str(error) # Save the error message to the database
+    session.save()
+
+
+def record_processing_metrics(session, trace):
+    """Stores a processing run's trace; a failure to do so only gets logged."""
+    stages = ', '.join(f"{name} {seconds:.3f}s" for name, seconds in trace.seconds.items())
+    logger.info(f"Session ID {session.id} took {trace.total_seconds:.3f}s ({stages})")
     try:
-        # Get the file path from the model's FileField
-        file_path = session.session_file.path
-        
-        # --- THIS IS THE KEY CHANGE ---
-        # Analyze the file using our new helper dispatcher function
-        summary_data, timeseries_data = analyze_session_file(file_path)
-
-        if summary_data is None and timeseries_data is None:
-            raise ValueError(f"Failed to parse file '{session.session_file.name}', it might be corrupt or an invalid format.")
-
-        # Update the session model instance with the results
-        session.total_distance_km = summary_data.get('total_distance_km')
-        session.total_duration_secs = summary_data.get('total_duration_secs')
-        session.avg_heart_rate = summary_data.get('avg_heart_rate')
-        session.max_heart_rate = summary_data.get('max_heart_rate')
-        session.timeseries_data = timeseries_data
-        session.status = RunningSession.STATUS_COMPLETED
-        session.processing_error = None # Clear any previous errors
-        session.save()
-        
-        logger.info(f"Successfully processed session file for Session ID: {session_id}")
+        ProcessingMetrics.record(session, trace)
+    except Exception as e:
+        logger.warning(f"Could not store processing metrics for Session ID {session.id}: {e}")
+
 
+@shared_task
+def roll_up_processing_metrics():
+    """
+    Daily (see CELERY_BEAT_SCHEDULE): folds processing metrics older than
+    METRICS_RETENTION_DAYS into their per-file-type totals.
+    """
+    deleted = roll_up_metrics(timezone.now() - datetime.timedelta(days=settings.METRICS_RETENTION_DAYS))
+    logger.info(f"Rolled up {deleted} processing metrics rows")
+    return deleted
+
+
+@shared_task
+def finalize_upload_batch(results, batch_id):
+    """
+    Chord callback that runs once every session of a batch has been processed.
+    """
+    UploadBatch.objects.filter(id=batch_id).update(completed_at=timezone.now())
+    logger.info(f"Finished processing upload batch {batch_id}")
+
+
+def dispatch_upload_batch(batch, session_ids):
+    """
+    Queues a batch's processing tasks as one chord, published over a single
+    broker connection, and stamps the batch once every task has finished.
+    """
+    # Batches go to their own queue, behind which single uploads never wait
+    header = [process_session_file.s(session_id).set(queue=QUEUE_BULK) for session_id in session_ids]
+    result = chord(header)(finalize_upload_batch.s(batch.id))
+    UploadBatch.objects.filter(id=batch.id).update(task_group_id=result.id)
+    return result
+
+
+def _detect_chunk(rows, pool):
+    """Yields (session_id, DetectionResult-or-exception) for (session_id, schema, data) rows."""
+    if pool is None:
+        for session_id, schema, data in rows:
+            try:
+                yield session_id, detect_encoded(schema, data)
+            except Exception as e:
+                yield session_id, e
+        return
+    pending = [(session_id, pool.apply_async(detect_encoded, (schema, bytes(data)))) for session_id, schema, data in rows]
+    for session_id, result in pending:
+        try:
+            yield session_id, result.get()
+        except Exception as e:
+            yield session_id, e
+
+
+def score_session_chunk(session_ids, pool=None):
+    """
+    Re-runs detection for a chunk of sessions and writes the results back in
+    one transaction. Returns the number of sessions that failed to score.
+    """
+    rows = SessionTimeseries.objects.filter(session_id__in=session_ids).values_list('session_id', 'schema', 'data')
+    sessions = RunningSession.objects.only('id', 'ml_prediction', 'ml_confidence').in_bulk(session_ids)
+    results, failed = {}, 0
+    for session_id, result in _detect_chunk(rows, pool):
+        if isinstance(result, Exception):
+            logger.error(f"Error scoring session ID {session_id}: {result}")
+            sessions.pop(session_id, None)
+            failed += 1
+            continue
+        if session_id not in sessions:
+            continue
+        results[session_id] = result
+        sessions[session_id].ml_prediction = result.prediction
+        sessions[session_id].ml_confidence = result.confidence
+
+    # Sessions without a stored time-series have nothing to score
+    without_series = [session_id for session_id in sessions if session_id not in results]
+    for session_id in without_series:
+        sessions[session_id].ml_prediction, sessions[session_id].ml_confidence = PREDICTION_INSUFFICIENT_DATA, None
+
+    with transaction.atomic():
+        SessionAnomalyScores.store_many(results)
+        SessionAnomalyScores.objects.filter(session_id__in=without_series).delete()
+        RunningSession.objects.bulk_update(sessions.values(), ['ml_prediction', 'ml_confidence'])
+        invalidate_sessions(sessions)
+    return failed
+
+
+# A run is repeated from the start if its worker dies, which is harmless
+@shared_task(acks_late=True, soft_time_limit=2 * 3600, time_limit=2 * 3600 + 300)
+def rescore_sessions(run_id):
+    """
+    Celery task that re-runs anomaly detection over the sessions matched by a
+    ScoringRun, chunk by chunk, recording progress and throughput on the run.
+    """
+    run = ScoringRun.objects.get(id=run_id)
+    session_ids = list(run.get_sessions().order_by('id').values_list('id', flat=True))
+    runs = ScoringRun.objects.filter(id=run_id)
+    runs.update(
+        status=ScoringRun.STATUS_RUNNING, detector_version=DETECTOR_VERSION, started_at=timezone.now(),
+        total=len(session_ids), processed=0, failed=0, error=None,
+    )
+    logger.info(f"Scoring run {run_id}: rescoring {len(session_ids)} session(s)")
+
+    # Celery's prefork children are daemonic: multiprocessing won't let them
+    # start processes, billiard (Celery's own fork of it) will
+    workers = settings.RESCORE_WORKERS
+    pool = billiard.get_context('spawn').Pool(workers) if workers > 1 else None
+
+    started = time.perf_counter()
+    processed = failed = 0
+    try:
+        for i in range(0, len(session_ids), RESCORE_CHUNK_SIZE):
+            chunk = session_ids[i:i + RESCORE_CHUNK_SIZE]
+            failed += score_session_chunk(chunk, pool)
+            processed += len(chunk)
+            rate = processed / (time.perf_counter() - started)
+            runs.update(processed=processed, failed=failed, sessions_per_second=round(rate, 2))
+            logger.info(f"Scoring run {run_id}: {processed}/{len(session_ids)} at {rate:.1f} sessions/s")
+    except Exception as e:
+        logger.error(f"Scoring run {run_id} failed: {e}")
+        runs.update(status=ScoringRun.STATUS_FAILED, error=str(e), finished_at=timezone.now())
+        return
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    runs.update(status=ScoringRun.STATUS_COMPLETED, finished_at=timezone.now())
+    logger.info(f"Finished scoring run {run_id}")
+
+
+# ==============================================================================
+# EMAIL
+# ==============================================================================
+# Sent by the email workers, so a slow mail server never holds up a request.
+# Each email is its own task: a failed send is retried with backoff without
+# sending the other one again.
+
+EMAIL_TASK_OPTIONS = {
+    'autoretry_for': (Exception,),
+    'dont_autoretry_for': (Volunteer.DoesNotExist,),
+    'max_retries': 5,
+    'retry_backoff': 30,
+    'retry_backoff_max': 30 * 60,
+    'soft_time_limit': 60,
+    'time_limit': 90,
+}
+
+
+@shared_task(**EMAIL_TASK_OPTIONS)
+def send_registration_notification(volunteer_id):
+    """Tells the study admin that a volunteer has registered."""
+    volunteer = Volunteer.objects.get(id=volunteer_id)
+    send_mail(
+        subject=f"New Volunteer Registration: {volunteer.first_name} {volunteer.last_name}",
+        message=(
+            f"A new volunteer has registered for the Heart Rate Anomaly study.\n\n"
+            f"Name: {volunteer.first_name} {volunteer.last_name}\nEmail: {volunteer.email}\n\n"
+            f"Please log in to the admin panel to review and approve them."
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[settings.ADMIN_EMAIL],
+        fail_silently=False,
+    )
+
+
+@shared_task(**EMAIL_TASK_OPTIONS)
+def send_registration_confirmation(volunteer_id):
+    """Confirms a volunteer's registration to them."""
+    volunteer = Volunteer.objects.get(id=volunteer_id)
+    context = {
+        'first_name': volunteer.first_name, 'last_name': volunteer.last_name, 'email': volunteer.email,
+        'date_of_birth': volunteer.date_of_birth, 'gender': volunteer.gender, 'nationality': volunteer.nationality,
+        'platform': volunteer.platform, 'smartwatch': volunteer.smartwatch, 'run_frequency': volunteer.run_frequency,
+    }
+    html_content = render_to_string('volunteers/volunteer_confirmation_email.html', context)
+    email = EmailMultiAlternatives(
+        subject="Registration Confirmation: Heart Rate Anomaly Study",
+        body=strip_tags(html_content),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[volunteer.email],
+    )
+    email.attach_alternative(html_content, "text/html")
+    email.send()
+
+
+def queue_registration_emails(volunteer_id):
+    """Queues a new volunteer's emails; registration succeeds even if this fails."""
+    try:
+        if settings.ADMIN_EMAIL:
+            send_registration_notification.delay(volunteer_id)
+        send_registration_confirmation.delay(volunteer_id)
     except Exception as e:
-        logger.error(f"Error processing session ID {session_id}: {e}")
-        # If any error occurs during processing, mark the session as 'failed'
-        session.status = RunningSession.STATUS_FAILED
-        session.processing_error = str(e) # Save the error message to the database
-        session.save()
\ No newline at end of file
+        logger.error(f"Could not queue the registration emails of volunteer {volunteer_id}: {e}")
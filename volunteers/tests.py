@@ -1,3 +1,1940 @@
-from django.test import TestCase
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from types import SimpleNamespace
+from unittest import mock, skipIf
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import OperationalError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+try:
+    import boto3
+    from moto import mock_aws
+    from storages.backends.s3 import S3Storage
+except ImportError:  # Optional: only the S3 cache tests need them
+    mock_aws = None
+
+from core.celery import app as celery_app
+
+from .caching import _version_key
+from .compression import ENCODING_BROTLI, ENCODING_GZIP, accepted_encodings, choose_encoding
+from .detection import (
+    DETECTOR_VERSION, PREDICTION_ANOMALOUS, PREDICTION_INSUFFICIENT_DATA, PREDICTION_NORMAL, detect_anomalies,
+    detect_encoded,
+)
+from .fit_records import UnsupportedFitLayout
+from .management.commands.reprocess_sessions import Command as ReprocessCommand
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics, roll_up_metrics
+from .models import (
+    ParsedFileResult, ProcessingMetrics, ProcessingMetricsTotals, RunningSession, ScoringRun, SessionAnomalyScores,
+    SessionLabels, SessionStatistics, SessionTimeseries, SessionUpload, UploadBatch, Volunteer,
+)
+from .serializers import SessionFilterSerializer
+from . import tasks
+from .tasks import process_session_file, run_detection
+from .timeseries import (
+    DOWNSAMPLE_LTTB, DOWNSAMPLE_MINMAX, KIND_FLOAT, KIND_INT, KIND_JSON, KIND_TIMESTAMP, ColumnarSeries,
+    build_level, build_pyramid, decode_level, lttb_indices, match_timestamps, minmax_indices,
+)
+from .uploads import MIN_PART_SIZE
+from .session_files import EVICTION_GRACE_SECS, SessionFileCache, inner_file_name, open_stored_file
+from .utils import (
+    CSV_CHUNK_ROWS, PARSER_VERSION, CsvParser, FitParser, GpxParser, TcxParser, _analyze_fit_records,
+    analyze_csv_file, analyze_fit_file, analyze_session_file, analyze_tcx_file, clean_summary_data,
+    compute_content_hash, detect_parser, parse_session_file, session_file_type, summarize_csv_file,
+    summarize_fit_file, summarize_session_file, summarize_tcx_file, supported_file_types,
+)
+from .views import SessionUploadViewSet
+
+SHARED_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'volunteers-tests'},
+}
+
+
+def make_volunteer(email='runner@example.com'):
+    return Volunteer.objects.create(
+        first_name='Test', last_name='Runner', email=email, gender='female', nationality='Thai',
+        date_of_birth=datetime.date(1990, 1, 1), platform='Garmin Connect', smartwatch='Forerunner',
+        run_frequency='weekly',
+    )
+
+
+def make_session(volunteer, **fields):
+    fields.setdefault('session_date', timezone.now())
+    fields.setdefault('source_type', 'admin_upload')
+    fields.setdefault('status', RunningSession.STATUS_COMPLETED)
+    return RunningSession.objects.create(volunteer=volunteer, **fields)
+
+
+class AdminAPITestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.volunteer = make_volunteer()
+
+
+# ==============================================================================
+# RESPONSE CACHE
+# ==============================================================================
+
+@override_settings(CACHES=SHARED_CACHE)
+class ResponseCacheTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        self.session = make_session(self.volunteer, status=RunningSession.STATUS_PROCESSING)
+        self.url = f'/api/sessions/{self.session.id}/'
+
+    def test_bump_from_another_client_invalidates_response(self):
+        first = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(first['X-Cache'], 'miss')
+        self.assertEqual(self.client.get(self.url, HTTP_ACCEPT='application/json')['X-Cache'], 'hit')
+
+        # A Celery worker finishes the session: its own cache client bumps the counter
+        RunningSession.objects.filter(id=self.session.id).update(status=RunningSession.STATUS_COMPLETED)
+        caches.create_connection('default').incr(_version_key(f'session:{self.session.id}'))
+
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.json()['status'], RunningSession.STATUS_COMPLETED)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_no_shared_cache_disables_response_caching(self):
+        first = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertNotIn('X-Cache', first)
+        self.assertNotIn('ETag', first)
+        RunningSession.objects.filter(id=self.session.id).update(status=RunningSession.STATUS_COMPLETED)
+        self.assertEqual(self.client.get(self.url, HTTP_ACCEPT='application/json').json()['status'], RunningSession.STATUS_COMPLETED)
+
+
+def make_records(count=10, anomalies=()):
+    start = datetime.datetime(2024, 5, 1, 6, 0, tzinfo=datetime.timezone.utc)
+    return [
+        {
+            'timestamp': (start + datetime.timedelta(seconds=i)).isoformat(),
+            'heart_rate': 120 + i,
+            'speed': 3.0 + i / 10,
+            'Anomaly': int(i in anomalies),
+        }
+        for i in range(count)
+    ]
+
+
+# ==============================================================================
+# RESPONSE COMPRESSION AND THE ARROW FORMAT
+# ==============================================================================
+
+class EncodingNegotiationTests(SimpleTestCase):
+    def encoding(self, accept_encoding):
+        return choose_encoding(RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_accepted_encodings(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='GZip;q=0.5, br;q=0, deflate;q=x, identity')
+        self.assertEqual(accepted_encodings(request), {'gzip', 'identity'})
+        self.assertEqual(accepted_encodings(RequestFactory().get('/')), set())
+
+    def test_choose_encoding(self):
+        self.assertEqual(self.encoding('gzip, deflate, br'), ENCODING_BROTLI)
+        self.assertEqual(self.encoding('*'), ENCODING_BROTLI)
+        self.assertEqual(self.encoding('gzip, br;q=0'), ENCODING_GZIP)
+        self.assertIsNone(self.encoding('identity'))
+        self.assertIsNone(self.encoding(''))
+        with mock.patch('volunteers.compression.brotli', None):
+            self.assertEqual(self.encoding('br, gzip'), ENCODING_GZIP)
+            self.assertIsNone(self.encoding('br'))
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class CompressedResponseTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        caches['default'].clear()
+        self.session = make_session(self.volunteer)
+        self.session.set_timeseries_data(make_records(200))
+        self.url = f'/api/sessions/{self.session.id}/'
+        self.identity = self.client.get(self.url, HTTP_ACCEPT='application/json')
+
+    def test_identity(self):
+        self.assertNotIn('Content-Encoding', self.identity)
+        self.assertIn('Accept-Encoding', self.identity['Vary'])
+        self.assertTrue(self.identity['ETag'].startswith('"'))
+        self.assertEqual(len(self.identity.json()['timeseries_data']), 200)
+
+    def test_brotli_and_gzip(self):
+        import brotli
+
+        for encoding, decompress in ((ENCODING_BROTLI, brotli.decompress), (ENCODING_GZIP, gzip.decompress)):
+            with self.subTest(encoding):
+                response = self.client.get(self.url, HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING=encoding)
+                self.assertEqual(response['Content-Encoding'], encoding)
+                self.assertEqual(decompress(response.content), self.identity.content)
+                self.assertEqual(response['Content-Length'], str(len(response.content)))
+                self.assertLess(len(response.content), len(self.identity.content))
+                self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_compressed_responses_have_weak_etags(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(response['ETag'], f"W/{self.identity['ETag']}")
+        # Either form revalidates
+        for etag in (response['ETag'], self.identity['ETag']):
+            revalidated = self.client.get(self.url, HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(revalidated.status_code, 304)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_uncached_responses(self):
+        # Compressed right after rendering, unless too small to bother
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], ENCODING_GZIP)
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.identity.json())
+        session = make_session(self.volunteer)
+        response = self.client.get(f'/api/sessions/{session.id}/', HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+
+class ArrowRendererTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.session = make_session(self.volunteer)
+        records = make_records(5)
+        records[2]['heart_rate'] = None
+        records[3]['note'] = {'lap': 2}
+        self.session.set_timeseries_data(records)
+
+    def read(self, response):
+        import pyarrow as pa
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.arrow.stream')
+        table = pa.ipc.open_stream(response.content).read_all()
+        return table, json.loads(table.schema.metadata[b'session'])
+
+    def test_typed_columns(self):
+        import pyarrow as pa
+
+        table, session = self.read(self.client.get(
+            f'/api/sessions/{self.session.id}/', HTTP_ACCEPT='application/vnd.apache.arrow.stream'
+        ))
+        self.assertEqual(session['id'], self.session.id)
+        self.assertNotIn('timeseries_data', session)
+        self.assertEqual(table.column_names, ['timestamp', 'heart_rate', 'speed', 'Anomaly', 'note'])
+        self.assertEqual(table.schema.field('timestamp').type, pa.timestamp('us', tz='UTC'))
+        self.assertEqual(table.schema.field('heart_rate').type, pa.int8())
+        self.assertEqual(table.column('heart_rate').to_pylist(), [120, 121, None, 123, 124])
+        self.assertEqual(table.column('speed').to_pylist(), [3.0, 3.1, 3.2, 3.3, 3.4])
+        self.assertEqual(table.column('note').to_pylist(), [None, None, None, '{"lap": 2}', None])
+
+    def test_format_parameter_and_window(self):
+        table, _ = self.read(self.client.get(f'/api/sessions/{self.session.id}/', {'format': 'arrow', 'fields': 'speed', 'start': 3}))
+        self.assertEqual(table.column_names, ['timestamp', 'speed'])
+        self.assertEqual(table.column('speed').to_pylist(), [3.3, 3.4])
+
+    def test_errors_and_other_actions(self):
+        import pyarrow as pa
+
+        response = self.client.get('/api/sessions/999999/', HTTP_ACCEPT='application/vnd.apache.arrow.stream')
+        self.assertEqual(response.status_code, 404)
+        table = pa.ipc.open_stream(response.content).read_all()
+        self.assertEqual(table.num_rows, 0)
+        self.assertIn('detail', json.loads(table.schema.metadata[b'session']))
+        # Only session detail is offered as Arrow
+        response = self.client.get('/api/sessions/', HTTP_ACCEPT='application/vnd.apache.arrow.stream')
+        self.assertEqual(response.status_code, 406)
+
+
+# ==============================================================================
+# SESSION FILTERS
+# ==============================================================================
+
+class SessionFilterTests(TestCase):
+    def setUp(self):
+        self.session = make_session(make_volunteer())
+        self.session.set_timeseries_data(make_records())
+        self.timestamps = [record['timestamp'] for record in make_records()]
+
+    def labeled_ids(self):
+        filters = SessionFilterSerializer(data={'labeled': True})
+        filters.is_valid(raise_exception=True)
+        return list(filters.filter(RunningSession.objects.all()).values_list('id', flat=True))
+
+    def test_label_unlabel_round_trip(self):
+        self.assertEqual(self.labeled_ids(), [])
+        self.session.label_anomalies({self.timestamps[3]: True, self.timestamps[4]: True})
+        self.assertEqual(self.labeled_ids(), [self.session.id])
+        self.session.label_anomalies({self.timestamps[3]: False, self.timestamps[4]: False})
+        # The bitmap row remains, empty
+        self.assertTrue(SessionLabels.objects.filter(session=self.session).exists())
+        self.assertEqual(self.labeled_ids(), [])
+
+    def test_admin_label_counts_as_labeled(self):
+        RunningSession.objects.filter(id=self.session.id).update(admin_label='Anomaly')
+        self.assertEqual(self.labeled_ids(), [self.session.id])
+
+
+# ==============================================================================
+# COLUMNAR TIME-SERIES CODEC
+# ==============================================================================
+
+def round_trip(records, channels=None):
+    schema, blob = ColumnarSeries.from_records(records).encode()
+    return ColumnarSeries.decode(schema, blob, channels)
+
+
+class ColumnarSeriesTests(SimpleTestCase):
+    def test_round_trip_each_kind(self):
+        records = [
+            {
+                'timestamp': f'2024-05-01T06:00:{i:02d}+00:00',
+                'heart_rate': 140 + i,
+                'distance': 2 ** 40 + i,  # needs more than 32 bits
+                'speed': 3.25 * i,
+                'mixed': [1, 2.5, 'x', True][i % 4],
+                'Anomaly': i % 2,
+            }
+            for i in range(8)
+        ]
+        series = round_trip(records)
+        self.assertEqual(series.to_records(), records)
+        self.assertEqual(
+            {name: column.kind for name, column in series.columns.items()},
+            {'timestamp': KIND_TIMESTAMP, 'heart_rate': KIND_INT, 'distance': KIND_INT,
+             'speed': KIND_FLOAT, 'mixed': KIND_JSON, 'Anomaly': KIND_INT},
+        )
+
+    def test_timestamp_formats_and_delta_times(self):
+        for fmt, timestamps in {
+            'iso': ['2024-05-01T06:00:00+00:00', '2024-05-01T06:00:01+00:00', '2024-05-01T06:00:05+00:00'],
+            'iso_us': ['2024-05-01T06:00:00.250000+00:00', '2024-05-01T06:00:01.500000+00:00'],
+            'csv': ['2024-05-01T06:00:00.000000+0000', '2024-05-01T06:00:00.500000+0000'],
+            'zulu': ['2025-01-17T22:03:54Z', '2025-01-17T22:03:53Z'],  # out of order
+            'zulu_ms': ['2025-01-17T22:03:54.000Z', '2025-01-17T22:03:54.125Z'],
+        }.items():
+            with self.subTest(fmt):
+                records = [{'timestamp': value} for value in timestamps]
+                original = ColumnarSeries.from_records(records)
+                self.assertEqual(original.timestamp_format, fmt)
+                schema, blob = original.encode()
+                np.testing.assert_array_equal(ColumnarSeries.decode_time(schema, blob), original.time_us)
+                self.assertEqual(ColumnarSeries.decode(schema, blob).to_records(), records)
+
+    def test_unparseable_timestamps_are_kept_verbatim(self):
+        records = [{'timestamp': '01/05/2024 06:00'}, {'timestamp': None}]
+        series = round_trip(records)
+        self.assertIsNone(series.time_us)
+        self.assertEqual(series.to_records(), records)
+
+    def test_missing_values_and_keys(self):
+        records = [
+            {'timestamp': '2024-05-01T06:00:00+00:00', 'heart_rate': None, 'speed': 3.0},
+            {'timestamp': '2024-05-01T06:00:01+00:00', 'heart_rate': 150, 'speed': None},
+            {'timestamp': '2024-05-01T06:00:02+00:00', 'heart_rate': None, 'cadence': 170},
+            {'timestamp': '2024-05-01T06:00:03+00:00', 'heart_rate': -5, 'speed': 3.5},
+        ]
+        series = round_trip(records)
+        self.assertEqual(series.to_records(), records)
+        heart_rate = series.column('heart_rate')
+        self.assertEqual(heart_rate.kind, KIND_INT)
+        np.testing.assert_array_equal(heart_rate.as_float(), [np.nan, 150, np.nan, -5])
+
+    def test_empty_series(self):
+        series = round_trip([])
+        self.assertEqual(len(series), 0)
+        self.assertEqual(series.to_records(), [])
+        self.assertIsNone(series.start_datetime())
+
+    def test_decode_selected_channels(self):
+        records = [{'timestamp': f'2024-05-01T06:00:0{i}+00:00', 'heart_rate': 120 + i, 'speed': 2.5} for i in range(3)]
+        series = round_trip(records, channels=['heart_rate'])
+        self.assertEqual(series.channels, ['heart_rate'])
+        self.assertEqual(series.column('heart_rate').to_list(), [120, 121, 122])
+        self.assertEqual(series.start_us, ColumnarSeries.from_records(records).start_us)
+
+
+class MatchTimestampsTests(SimpleTestCase):
+    def test_matches_exact_spelling_only(self):
+        series = ColumnarSeries.from_records([
+            {'timestamp': value} for value in
+            ['2024-05-01T06:00:00+00:00', '2024-05-01T06:00:01+00:00', '2024-05-01T06:00:01+00:00', '2024-05-01T06:00:02+00:00']
+        ])
+        samples, requests = match_timestamps(series.time_us, series.timestamp_format, [
+            '2024-05-01T06:00:01+00:00',   # two samples
+            '2024-05-01T06:00:02Z',        # same instant, other spelling
+            '2024-05-01T06:00:09+00:00',   # no sample
+            None,
+            '2024-05-01T06:00:00+00:00',
+        ])
+        self.assertEqual(sorted(zip(samples.tolist(), requests.tolist())), [(0, 4), (1, 0), (2, 0)])
+
+    def test_unsorted_and_empty(self):
+        series = ColumnarSeries.from_records([
+            {'timestamp': '2025-01-17T22:03:55Z'}, {'timestamp': '2025-01-17T22:03:54Z'},
+        ])
+        samples, requests = match_timestamps(series.time_us, series.timestamp_format, ['2025-01-17T22:03:54Z'])
+        self.assertEqual((samples.tolist(), requests.tolist()), ([1], [0]))
+        for time_us, values in ((series.time_us, []), (None, ['2025-01-17T22:03:54Z'])):
+            samples, requests = match_timestamps(time_us, series.timestamp_format, values)
+            self.assertEqual((len(samples), len(requests)), (0, 0))
+
+
+# ==============================================================================
+# TIME-SERIES WINDOWING AND DOWNSAMPLING
+# ==============================================================================
+
+class DownsampleTests(SimpleTestCase):
+    def test_lttb_keeps_the_ends_and_the_shape(self):
+        x = np.arange(100, dtype=np.float64)
+        y = np.where(x == 40, 200.0, 100.0)
+        index = lttb_indices(x, y, 10)
+        self.assertEqual(len(index), 10)
+        self.assertEqual((index[0], index[-1]), (0, 99))
+        self.assertTrue((np.diff(index) > 0).all())
+        self.assertIn(40, index)
+
+    def test_lttb_edge_cases(self):
+        x = np.arange(5, dtype=np.float64)
+        np.testing.assert_array_equal(lttb_indices(x, x, 5), np.arange(5))
+        np.testing.assert_array_equal(lttb_indices(x, x, 9), np.arange(5))
+        np.testing.assert_array_equal(lttb_indices(x, x, 2), [0, 4])
+        # Missing values, even all of them, still give max_points samples
+        for y in (np.array([1.0, np.nan, 3.0, np.nan, 5.0] * 4), np.full(20, np.nan)):
+            index = lttb_indices(np.arange(20, dtype=np.float64), y, 6)
+            self.assertEqual(len(np.unique(index)), 6)
+
+    def test_minmax_keeps_spikes(self):
+        y = np.full(100, 100.0)
+        y[37], y[71] = 250.0, 10.0
+        index = minmax_indices(y, 10)
+        self.assertLessEqual(len(index), 10)
+        self.assertIn(37, index)
+        self.assertIn(71, index)
+        self.assertTrue((np.diff(index) > 0).all())
+
+    def test_minmax_edge_cases(self):
+        np.testing.assert_array_equal(minmax_indices(np.arange(4.0), 4), np.arange(4))
+        self.assertEqual(len(minmax_indices(np.arange(10.0), 1)), 2)
+        # NaNs are never picked while a bucket has values; all-NaN buckets still yield a sample
+        y = np.array([np.nan, 5.0, np.nan, 1.0] + [np.nan] * 4)
+        index = minmax_indices(y, 4)
+        self.assertEqual(index[:2].tolist(), [1, 3])
+        self.assertEqual(len(index), 3)
+
+    def test_downsample_picks_a_numeric_channel(self):
+        records = [{'timestamp': f'2024-05-01T06:{i // 60:02d}:{i % 60:02d}+00:00', 'note': 'x', 'speed': 3.0}
+                   for i in range(50)]
+        records[25]['speed'] = 9.0
+        series = ColumnarSeries.from_records(records)
+        for method in (DOWNSAMPLE_LTTB, DOWNSAMPLE_MINMAX):
+            with self.subTest(method):
+                downsampled = series.downsample(8, method, channel='note')
+                self.assertLessEqual(len(downsampled), 8)
+                self.assertIn(9.0, downsampled.column('speed').to_list())
+        self.assertIs(series.downsample(50), series)
+        self.assertIs(series.downsample(None), series)
+        # No numeric channel: evenly spaced samples
+        only_text = series.select(['note'])
+        self.assertEqual(len(only_text.downsample(5)), 5)
+
+
+class TimeseriesWindowTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.session = make_session(self.volunteer)
+        self.session.set_timeseries_data(make_records(60))
+        self.url = f'/api/sessions/{self.session.id}/'
+
+    def timeseries(self, **params):
+        response = self.client.get(self.url, params, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['timeseries_data']
+
+    def test_no_query_returns_everything(self):
+        self.assertEqual(self.timeseries(), make_records(60))
+
+    def test_start_and_end_in_seconds(self):
+        data = self.timeseries(start='10', end='12.5')
+        self.assertEqual([record['heart_rate'] for record in data], [130, 131, 132])
+
+    def test_start_and_end_as_datetimes(self):
+        data = self.timeseries(start='2024-05-01T06:00:58Z')
+        self.assertEqual([record['heart_rate'] for record in data], [178, 179])
+        # Naive datetimes are UTC
+        data = self.timeseries(end='2024-05-01T06:00:01')
+        self.assertEqual([record['heart_rate'] for record in data], [120, 121])
+        data = self.timeseries(start='2024-05-01T08:00:05+02:00', end='2024-05-01T08:00:05+02:00')
+        self.assertEqual([record['heart_rate'] for record in data], [125])
+
+    def test_fields(self):
+        data = self.timeseries(fields='heart_rate, unknown', end='1')
+        self.assertEqual(data, [
+            {'timestamp': record['timestamp'], 'heart_rate': record['heart_rate']} for record in make_records(2)
+        ])
+
+    def test_max_points(self):
+        for method in ('lttb', 'minmax'):
+            with self.subTest(method):
+                data = self.timeseries(max_points=10, downsample=method)
+                self.assertLessEqual(len(data), 10)
+                self.assertEqual(data[0], make_records(60)[0])
+        data = self.timeseries(max_points=10)
+        self.assertEqual(data[-1], make_records(60)[-1])
+
+    def test_window_then_downsample(self):
+        data = self.timeseries(start='20', end='39', fields='speed', max_points=5)
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data[0]['speed'], 5.0)
+        self.assertEqual(data[-1]['speed'], 6.9)
+        self.assertEqual(set(data[0]), {'timestamp', 'speed'})
+
+    def test_invalid_query(self):
+        for params in ({'start': 'yesterday-ish'}, {'max_points': 1}, {'downsample': 'average'}):
+            with self.subTest(params):
+                response = self.client.get(self.url, params, HTTP_ACCEPT='application/json')
+                self.assertEqual(response.status_code, 400)
+
+
+# ==============================================================================
+# DOWNSAMPLE PYRAMID
+# ==============================================================================
+
+class PyramidTests(SimpleTestCase):
+    def series(self, offsets, heart_rates):
+        start = datetime.datetime(2024, 5, 1, 6, 0, tzinfo=datetime.timezone.utc)
+        return ColumnarSeries.from_records([
+            {'timestamp': (start + datetime.timedelta(seconds=offset)).isoformat(), 'heart_rate': heart_rate,
+             'note': 'x', 'Anomaly': 0}
+            for offset, heart_rate in zip(offsets, heart_rates)
+        ])
+
+    def test_bucket_statistics(self):
+        series = self.series(range(10), [100, 110, None, 130, 140, None, None, None, None, None])
+        schema, blob = build_level(series, 5)
+        self.assertEqual((schema['num_buckets'], schema['channels']), (2, ['heart_rate']))
+        level = decode_level(schema, blob)
+        self.assertEqual(level['start_time'], '2024-05-01T06:00:00+00:00')
+        self.assertEqual(level['offsets'], [0, 5])
+        # Missing samples are skipped; a bucket without any has no statistics
+        self.assertEqual(level['channels'], {'heart_rate': {'min': [100.0, None], 'max': [140.0, None], 'mean': [120.0, None]}})
+
+    def test_unsorted_samples_and_gaps(self):
+        series = self.series([0, 61, 2, 60, 1, 3], [100, 150, 120, 160, 110, 130])
+        level = decode_level(*build_level(series, 30))
+        self.assertEqual(level['offsets'], [0, 60])
+        self.assertEqual(level['channels']['heart_rate'], {'min': [100.0, 150.0], 'max': [130.0, 160.0], 'mean': [115.0, 155.0]})
+
+    def test_useless_levels_are_skipped(self):
+        series = self.series(range(600), [120] * 600)
+        self.assertIsNone(build_level(series, 1))
+        self.assertEqual(sorted(build_pyramid(series)), [5, 30, 300])
+        self.assertEqual(build_pyramid(series)[300][0]['num_buckets'], 2)
+        without_times = ColumnarSeries.from_records([{'timestamp': 'n/a', 'heart_rate': 120}] * 20)
+        self.assertEqual(build_pyramid(without_times), {})
+
+    def test_fields(self):
+        series = ColumnarSeries.from_records([
+            {'timestamp': f'2024-05-01T06:00:{i:02d}+00:00', 'heart_rate': 120, 'speed': 3.0} for i in range(20)
+        ])
+        schema, blob = build_level(series, 5)
+        self.assertEqual(list(decode_level(schema, blob)['channels']), ['heart_rate', 'speed'])
+        self.assertEqual(list(decode_level(schema, blob, ['speed', 'cadence'])['channels']), ['speed'])
+
+
+class OverviewTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.session = make_session(self.volunteer)
+        self.session.set_timeseries_data(make_records(600))
+        self.url = f'/api/sessions/{self.session.id}/overview/'
+
+    def test_finest_level_within_max_points(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['resolution_secs'], 5)
+        self.assertEqual(data['available_resolutions'], [5, 30, 300])
+        self.assertEqual(len(data['offsets']), 120)
+        self.assertEqual(data['channels']['heart_rate']['max'][:2], [124.0, 129.0])
+        self.assertNotIn('Anomaly', data['channels'])
+        self.assertEqual(self.client.get(self.url, {'max_points': 20}).json()['resolution_secs'], 30)
+        # Nothing fits: the coarsest level
+        self.assertEqual(self.client.get(self.url, {'max_points': 1}).json()['resolution_secs'], 300)
+
+    def test_resolution_and_fields(self):
+        data = self.client.get(self.url, {'resolution': 300, 'fields': 'speed'}).json()
+        self.assertEqual(data['offsets'], [0, 300])
+        self.assertEqual(list(data['channels']), ['speed'])
+
+    def test_invalid_parameters(self):
+        for params in ({'resolution': 60}, {'resolution': 'hourly'}, {'max_points': 'many'}):
+            with self.subTest(params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['available_resolutions'], [5, 30, 300])
+
+    def test_levels_are_replaced_and_removed_with_the_series(self):
+        self.session.set_timeseries_data(make_records(60))
+        self.assertEqual(len(self.client.get(self.url, {'resolution': 5}).json()['offsets']), 12)
+        self.session.set_timeseries_data(None)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+# ==============================================================================
+# ANOMALY DETECTION
+# ==============================================================================
+
+def effort_records(heart_rates, speeds=None):
+    """Samples one second apart; None marks a missing heart rate."""
+    start = datetime.datetime(2024, 5, 1, 6, 0, tzinfo=datetime.timezone.utc)
+    if speeds is None:
+        speeds = 3 + np.sin(np.arange(len(heart_rates)) / 40)
+    return [
+        {
+            'timestamp': (start + datetime.timedelta(seconds=i)).isoformat(),
+            'heart_rate': None if heart_rate is None else int(round(heart_rate)),
+            'speed': float(speed),
+        }
+        for i, (heart_rate, speed) in enumerate(zip(heart_rates, speeds))
+    ]
+
+
+class DetectorTests(SimpleTestCase):
+    def setUp(self):
+        # Heart rate following speed, with a little noise
+        noise = np.random.default_rng(0).normal(0, 1, 300)
+        self.heart_rates = list(140 + 10 * np.sin(np.arange(300) / 40) + noise)
+
+    def detect(self, heart_rates):
+        return detect_anomalies(ColumnarSeries.from_records(effort_records(heart_rates)))
+
+    def test_steady_run_is_normal(self):
+        result = self.detect(self.heart_rates)
+        self.assertEqual((result.prediction, result.confidence), (PREDICTION_NORMAL, 1.0))
+        self.assertFalse(result.flags.any())
+        self.assertTrue(((result.scores >= 0) & (result.scores < 0.5)).all())
+        self.assertEqual(result.summary['detector_version'], DETECTOR_VERSION)
+        self.assertEqual((result.summary['valid_samples'], result.summary['flagged_samples']), (300, 0))
+
+    def test_spike(self):
+        self.heart_rates[150] = 200
+        result = self.detect(self.heart_rates)
+        self.assertEqual(np.flatnonzero(result.flags).tolist(), [150])
+        self.assertGreater(result.scores[150], 0.5)
+        self.assertEqual(result.summary['spike_samples'], 1)
+        self.assertEqual(result.prediction, PREDICTION_NORMAL)
+        self.assertLess(result.confidence, 1.0)
+
+    def test_implausible_heart_rate(self):
+        self.heart_rates[100] = 250
+        result = self.detect(self.heart_rates)
+        self.assertTrue(result.flags[100])
+        self.assertEqual(result.summary['out_of_range_samples'], 1)
+
+    def test_dropout_inside_the_recording(self):
+        self.heart_rates[100:115] = [None] * 15
+        # Missing values before the first reading aren't a dropout
+        self.heart_rates[:5] = [None] * 5
+        result = self.detect(self.heart_rates)
+        self.assertTrue(result.flags[100:115].all())
+        self.assertFalse(result.flags[:5].any())
+        self.assertEqual(result.summary['dropout_samples'], 15)
+        self.assertEqual(result.summary['valid_samples'], 280)
+
+    def test_flatline(self):
+        self.heart_rates[100:170] = [150] * 70
+        result = self.detect(self.heart_rates)
+        self.assertEqual(result.summary['flatline_samples'], 70)
+        self.assertTrue(result.flags[100:170].all())
+        self.assertEqual(result.prediction, PREDICTION_ANOMALOUS)
+
+    def test_heart_rate_not_following_effort(self):
+        self.heart_rates[100:160] = [value + 35 for value in self.heart_rates[100:160]]
+        result = self.detect(self.heart_rates)
+        self.assertEqual(result.summary['mismatch_samples'], 60)
+        self.assertEqual(result.summary['spike_samples'], 0)
+        self.assertEqual(result.summary['flagged_fraction'], 0.2)
+        self.assertEqual((result.prediction, result.confidence), (PREDICTION_ANOMALOUS, 1.0))
+
+    def test_insufficient_data(self):
+        for heart_rates in (self.heart_rates[:50], [None] * 300, [0] * 300):
+            result = self.detect(heart_rates)
+            self.assertEqual((result.prediction, result.confidence), (PREDICTION_INSUFFICIENT_DATA, None))
+            self.assertFalse(result.flags.any())
+        no_heart_rate = ColumnarSeries.from_records([{'speed': 3.0}] * 100)
+        self.assertEqual(detect_anomalies(no_heart_rate).prediction, PREDICTION_INSUFFICIENT_DATA)
+
+    def test_encoded_series(self):
+        self.heart_rates[150] = 200
+        records = effort_records(self.heart_rates)
+        for record in records:
+            record['note'] = 'not decoded'
+        series = ColumnarSeries.from_records(records)
+        expected = detect_anomalies(series)
+        result = detect_encoded(*series.encode())
+        np.testing.assert_array_equal(result.scores, expected.scores)
+        self.assertEqual(result.summary, expected.summary)
+
+
+class AnomalyScoresTests(AdminAPITestCase):
+    def test_scores_endpoint(self):
+        heart_rates = list(140 + 10 * np.sin(np.arange(300) / 40))
+        heart_rates[150] = 200
+        session = make_session(self.volunteer)
+        series = ColumnarSeries.from_records(effort_records(heart_rates))
+        session.set_timeseries_data(effort_records(heart_rates))
+        run_detection(session, series)
+        session.save()
+
+        data = self.client.get(f'/api/sessions/{session.id}/anomaly-scores/').json()
+        self.assertEqual(data['ml_prediction'], PREDICTION_NORMAL)
+        self.assertEqual(data['detector_version'], DETECTOR_VERSION)
+        self.assertEqual(len(data['scores']), 300)
+        self.assertEqual(int(np.argmax(data['scores'])), 150)
+        self.assertEqual(data['summary']['spike_samples'], 1)
+
+        run_detection(session, None)
+        session.save()
+        self.assertEqual(self.client.get(f'/api/sessions/{session.id}/anomaly-scores/').status_code, 404)
+        session.refresh_from_db()
+        self.assertEqual(session.ml_prediction, PREDICTION_INSUFFICIENT_DATA)
+
+
+# ==============================================================================
+# SCORING RUNS
+# ==============================================================================
+
+class ScoringRunTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        heart_rates = list(140 + 10 * np.sin(np.arange(300) / 40))
+        self.normal = make_session(self.volunteer, ml_prediction=PREDICTION_ANOMALOUS)
+        self.normal.set_timeseries_data(effort_records(heart_rates))
+        self.flatlined = make_session(self.volunteer)
+        self.flatlined.set_timeseries_data(effort_records(heart_rates[:100] + [150] * 200))
+        self.without_series = make_session(self.volunteer, ml_prediction=PREDICTION_NORMAL, ml_confidence=0.9)
+        self.other_volunteer = make_session(make_volunteer('other@example.com'))
+
+    def rescore(self, **filters):
+        run = ScoringRun.objects.create(volunteer=self.volunteer, **filters)
+        with mock.patch('volunteers.tasks._detect_chunk', wraps=tasks._detect_chunk) as detect_chunk:
+            tasks.rescore_sessions(run.id)
+        run.refresh_from_db()
+        return run, detect_chunk
+
+    def predictions(self):
+        return dict(RunningSession.objects.values_list('id', 'ml_prediction'))
+
+    def test_create_starts_the_run_on_commit(self):
+        with mock.patch('volunteers.views.rescore_sessions') as rescore, self.captureOnCommitCallbacks(execute=True):
+            rescore.delay.return_value.id = 'task-1'
+            response = self.client.post('/api/scoring-runs/', {'volunteer': self.volunteer.id, 'date_from': '2024-01-01'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['status'], ScoringRun.STATUS_PENDING)
+        rescore.delay.assert_called_once_with(response.json()['id'])
+        self.assertEqual(ScoringRun.objects.get().task_id, 'task-1')
+
+        response = self.client.post('/api/scoring-runs/', {'date_from': '2024-02-01', 'date_to': '2024-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(RESCORE_WORKERS=1)
+    def test_rescore_in_process(self):
+        run, detect_chunk = self.rescore()
+        self.assertIsNone(detect_chunk.call_args.args[1])
+        self.assertEqual((run.status, run.detector_version), (ScoringRun.STATUS_COMPLETED, DETECTOR_VERSION))
+        self.assertEqual((run.total, run.processed, run.failed), (3, 3, 0))
+        self.assertEqual(self.client.get(f'/api/scoring-runs/{run.id}/').json()['progress'], 100.0)
+        predictions = self.predictions()
+        self.assertEqual(predictions[self.normal.id], PREDICTION_NORMAL)
+        self.assertEqual(predictions[self.flatlined.id], PREDICTION_ANOMALOUS)
+        self.assertEqual(predictions[self.without_series.id], PREDICTION_INSUFFICIENT_DATA)
+        self.assertIsNone(predictions[self.other_volunteer.id])
+        self.assertEqual(SessionAnomalyScores.objects.get(session=self.flatlined).summary['flatline_samples'], 200)
+
+    @override_settings(RESCORE_WORKERS=2)
+    def test_rescore_through_the_detector_pool(self):
+        SessionTimeseries.objects.filter(session=self.normal).update(data=b'not an archive')
+        run, detect_chunk = self.rescore()
+        self.assertIsNotNone(detect_chunk.call_args.args[1])
+        self.assertEqual((run.status, run.total, run.processed, run.failed), (ScoringRun.STATUS_COMPLETED, 3, 3, 1))
+        predictions = self.predictions()
+        # A session that failed to score keeps its previous prediction
+        self.assertEqual(predictions[self.normal.id], PREDICTION_ANOMALOUS)
+        self.assertEqual(predictions[self.flatlined.id], PREDICTION_ANOMALOUS)
+        self.assertEqual(predictions[self.without_series.id], PREDICTION_INSUFFICIENT_DATA)
+        self.assertEqual(SessionAnomalyScores.objects.get(session=self.flatlined).summary['flatline_samples'], 200)
+
+    @override_settings(RESCORE_WORKERS=1)
+    def test_failed_run(self):
+        with mock.patch('volunteers.tasks.score_session_chunk', side_effect=OperationalError('database is gone')):
+            run, _ = self.rescore()
+        self.assertEqual((run.status, run.error), (ScoringRun.STATUS_FAILED, 'database is gone'))
+        self.assertIsNotNone(run.finished_at)
+
+
+# ==============================================================================
+# LABELED DATASET EXPORT
+# ==============================================================================
+
+class ExportTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = make_session(self.volunteer, session_date=datetime.datetime(2024, 5, 1, 6, tzinfo=datetime.timezone.utc))
+        self.first.set_timeseries_data(make_records(3, anomalies=[1]))
+        self.second = make_session(self.volunteer, session_date=datetime.datetime(2024, 5, 2, 6, tzinfo=datetime.timezone.utc))
+        self.second.set_timeseries_data([{'timestamp': '2024-05-02T06:00:00+00:00', 'heart_rate': 99, 'cadence': 170, 'Anomaly': 0}])
+        # Matched, but without samples to export
+        make_session(self.volunteer)
+        # Not matched
+        make_session(self.volunteer, status=RunningSession.STATUS_FAILED).set_timeseries_data(make_records(2))
+
+    def export(self, file_format, **params):
+        response = self.client.get(f'/api/sessions/export/{file_format}/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        frame = pd.read_csv(io.BytesIO(self.export('csv')))
+        self.assertEqual(list(frame.columns), [
+            'session_id', 'volunteer_id', 'session_date', 'source_type', 'admin_label', 'ml_prediction',
+            'gender', 'nationality', 'age', 'platform', 'smartwatch', 'run_frequency',
+            'timestamp', 'heart_rate', 'speed', 'cadence', 'anomaly',
+        ])
+        self.assertEqual(frame['session_id'].tolist(), [self.first.id] * 3 + [self.second.id])
+        self.assertEqual(frame['heart_rate'].tolist(), [120, 121, 122, 99])
+        self.assertEqual(frame['anomaly'].tolist(), [0, 1, 0, 0])
+        self.assertEqual(frame['cadence'].isna().tolist(), [True, True, True, False])
+        self.assertEqual(frame['timestamp'][0], '2024-05-01T06:00:00Z')
+        self.assertEqual(frame['session_date'][3], '2024-05-02T06:00:00Z')
+        self.assertEqual(frame['age'][0], 34)
+        self.assertNotIn(b'runner@example.com', self.export('csv'))
+
+    def test_selected_columns(self):
+        frame = pd.read_csv(io.BytesIO(self.export('csv', fields='cadence,timestamp,Anomaly,unknown')))
+        self.assertEqual(list(frame.columns[12:]), ['timestamp', 'cadence', 'unknown', 'anomaly'])
+        self.assertEqual(frame['cadence'].tolist()[3], 170)
+
+    def test_parquet_and_arrow(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        parquet = pq.read_table(io.BytesIO(self.export('parquet', fields='heart_rate')))
+        arrow = pa.ipc.open_stream(self.export('arrow', fields='heart_rate')).read_all()
+        for table in (parquet, arrow):
+            self.assertEqual(table.column_names[12:], ['timestamp', 'heart_rate', 'anomaly'])
+            self.assertEqual(table.schema.field('timestamp').type, pa.timestamp('us', tz='UTC'))
+            self.assertEqual(table.column('heart_rate').to_pylist(), [120.0, 121.0, 122.0, 99.0])
+            self.assertEqual(table.column('anomaly').to_pylist(), [0, 1, 0, 0])
+        # One row group per session
+        self.assertEqual(pq.ParquetFile(io.BytesIO(self.export('parquet'))).num_row_groups, 2)
+
+    def test_filters(self):
+        self.first.label_anomalies({make_records(3)[2]['timestamp']: True})
+        frame = pd.read_csv(io.BytesIO(self.export('csv', labeled='true')))
+        self.assertEqual(set(frame['session_id']), {self.first.id})
+        self.assertEqual(len(self.export('csv', date_from='2025-01-01').splitlines()), 1)
+        response = self.client.get('/api/sessions/export/csv/', {'date_from': '2024-06-01', 'date_to': '2024-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_counts_the_sessions_written(self):
+        output = os.path.join(tempfile.mkdtemp(), 'sessions.parquet')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        stderr = io.StringIO()
+        call_command('export_sessions', output, '--format', 'parquet', '--fields', 'heart_rate', stderr=stderr)
+        self.assertIn('Exported 2 session(s)', stderr.getvalue())
+        import pyarrow.parquet as pq
+        self.assertEqual(pq.read_table(output).num_rows, 4)
+
+
+# ==============================================================================
+# ANOMALY LABELS
+# ==============================================================================
+
+class AnomalyLabelTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.session = make_session(self.volunteer)
+        self.session.set_timeseries_data(make_records(20))
+        self.timestamps = [record['timestamp'] for record in make_records(20)]
+
+    def flags(self):
+        session = RunningSession.objects.get(id=self.session.id)
+        return np.flatnonzero(session.get_timeseries().column('Anomaly').values).tolist()
+
+    def anomaly_samples(self):
+        return SessionStatistics.objects.get(session=self.session).anomaly_samples
+
+    def test_set_and_clear_ranges(self):
+        changed = self.session.label_anomalies({value: True for value in self.timestamps[5:10]})
+        self.assertEqual(changed, 5)
+        self.assertEqual(self.flags(), [5, 6, 7, 8, 9])
+        self.assertEqual(self.anomaly_samples(), 5)
+
+        changed = self.session.label_anomalies({value: False for value in self.timestamps[8:12]})
+        self.assertEqual(changed, 2)
+        self.assertEqual(self.flags(), [5, 6, 7])
+        self.assertEqual(self.anomaly_samples(), 3)
+
+        changed = self.session.label_anomalies({self.timestamps[0]: 1, self.timestamps[19]: 1}, replace=True)
+        self.assertEqual(changed, 5)
+        self.assertEqual(self.flags(), [0, 19])
+        self.assertEqual(self.anomaly_samples(), 2)
+
+    def test_other_channels_are_untouched(self):
+        self.session.label_anomalies({self.timestamps[3]: True})
+        records = RunningSession.objects.get(id=self.session.id).timeseries_data
+        expected = make_records(20, anomalies={3})
+        self.assertEqual(records, expected)
+
+    def test_update_anomalies_endpoint(self):
+        url = f'/api/sessions/{self.session.id}/update-anomalies/'
+        updates = [{'timestamp': value, 'anomaly': True} for value in self.timestamps[2:6]]
+        updates.append({'timestamp': '2024-05-01T07:00:00+00:00', 'anomaly': True})  # no such sample
+        response = self.client.patch(url, {'updates': updates}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'success', 'message': '5 records checked.'})
+        self.assertEqual(self.flags(), [2, 3, 4, 5])
+        self.assertEqual(self.anomaly_samples(), 4)
+
+        response = self.client.patch(url, {'updates': [{'timestamp': self.timestamps[2], 'anomaly': False}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.flags(), [3, 4, 5])
+        self.assertEqual(self.anomaly_samples(), 3)
+
+    def test_update_anomalies_without_series(self):
+        session = make_session(self.volunteer)
+        response = self.client.patch(
+            f'/api/sessions/{session.id}/update-anomalies/', {'updates': [{'timestamp': self.timestamps[0], 'anomaly': True}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+# ==============================================================================
+# SESSIONS LIST PAGINATION
+# ==============================================================================
+
+class SessionPaginationTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        other = make_volunteer('other@example.com')
+        base = datetime.datetime(2024, 5, 1, 6, 0, 0, 250000, tzinfo=datetime.timezone.utc)
+        # 23 sessions on 4 dates, so most pages end inside a run of equal dates
+        for i in range(23):
+            make_session(self.volunteer if i % 3 else other, session_date=base - datetime.timedelta(days=i % 4))
+        self.expected = list(
+            RunningSession.objects.order_by('-session_date', '-id').values_list('id', flat=True)
+        )
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            pages.append([row['id'] for row in body['results']])
+            url = body[link]
+        return pages
+
+    def test_cursor_walks_every_row_once(self):
+        pages = self.walk('/api/sessions/?pagination=cursor&page_size=5', 'next')
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertEqual([pk for page in pages for pk in page], self.expected)
+
+    def test_cursor_walks_back_from_the_last_page(self):
+        last = self.client.get('/api/sessions/?pagination=cursor&page_size=5', HTTP_ACCEPT='application/json').json()
+        while last['next']:
+            last = self.client.get(last['next'], HTTP_ACCEPT='application/json').json()
+        self.assertIsNone(last['next'])
+        pages = self.walk(last['previous'], 'previous')
+        self.assertEqual([pk for page in reversed(pages) for pk in page] + [row['id'] for row in last['results']], self.expected)
+
+    def test_cursor_with_volunteer_filter(self):
+        pages = self.walk(f'/api/sessions/?volunteer={self.volunteer.id}&pagination=cursor&page_size=4', 'next')
+        expected = list(
+            RunningSession.objects.filter(volunteer=self.volunteer).order_by('-session_date', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual([pk for page in pages for pk in page], expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/sessions/?cursor=not-a-cursor', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_follows_ordering(self):
+        for i, session in enumerate(RunningSession.objects.order_by('id')):
+            RunningSession.objects.filter(id=session.id).update(avg_heart_rate=100 + i % 7)
+        pages = self.walk('/api/sessions/?pagination=cursor&page_size=5&ordering=avg_heart_rate', 'next')
+        rows = RunningSession.objects.order_by('avg_heart_rate', 'id').values_list('id', 'avg_heart_rate')
+        walked = [pk for page in pages for pk in page]
+        self.assertCountEqual(walked, self.expected)
+        heart_rates = dict(rows)
+        self.assertEqual([heart_rates[pk] for pk in walked], sorted(heart_rates.values()))
+
+    def test_rows_link_their_session_file(self):
+        session = RunningSession.objects.get(id=self.expected[0])
+        RunningSession.objects.filter(id=session.id).update(session_file='session_files/run.fit')
+        results = self.client.get('/api/sessions/?pagination=cursor', HTTP_ACCEPT='application/json').json()['results']
+        self.assertEqual(results[0]['session_file'], 'http://testserver/media/session_files/run.fit')
+        self.assertIsNone(results[1]['session_file'])
+        detail = self.client.get(f'/api/sessions/{session.id}/', HTTP_ACCEPT='application/json').json()
+        self.assertEqual(detail['session_file'], results[0]['session_file'])
+
+    def test_page_number_fallback(self):
+        seen = []
+        for page in range(1, 6):
+            response = self.client.get(f'/api/sessions/?page={page}&page_size=5', HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertEqual(body['count'], 23)
+            self.assertEqual(body['next'] is None, page == 5)
+            seen += [row['id'] for row in body['results']]
+        self.assertEqual(seen, self.expected)
+        response = self.client.get('/api/sessions/?page=6&page_size=5', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+# ==============================================================================
+# DIRECT UPLOADS
+# ==============================================================================
+
+class ChunkedUploadTests(AdminAPITestCase):
+    """Direct uploads to local storage, whose part URLs point back at the API."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, SESSION_UPLOAD_PART_SIZE=MIN_PART_SIZE))
+        self.content = bytes(range(256)) * ((MIN_PART_SIZE + 1000) // 256)
+        response = self.client.post('/api/uploads/', {
+            'volunteer': self.volunteer.id, 'session_date': '2024-05-01T06:00:00Z', 'source_type': 'admin_upload',
+            'file_name': 'run.csv', 'file_size': len(self.content),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.upload = response.json()
+        self.urls = {part['part_number']: part['url'] for part in self.upload['parts']}
+        # Part URLs are used without credentials, like presigned ones
+        self.anonymous = APIClient()
+
+    def part(self, number):
+        start = (number - 1) * MIN_PART_SIZE
+        return self.content[start:start + MIN_PART_SIZE]
+
+    def put(self, url, body):
+        return self.anonymous.put(url, body, content_type='application/octet-stream')
+
+    def complete(self):
+        return self.client.post(f"/api/uploads/{self.upload['id']}/complete/")
+
+    def test_parts_out_of_order(self):
+        self.assertEqual(self.upload['part_count'], 2)
+        self.assertEqual(self.put(self.urls[2], self.part(2)).status_code, 200)
+        resumed = self.client.get(f"/api/uploads/{self.upload['id']}/").json()
+        self.assertEqual([part['received'] for part in resumed['parts']], [False, True])
+        self.assertEqual(self.put(self.urls[1], self.part(1)).status_code, 200)
+
+        with mock.patch('volunteers.views.process_session_file') as task, self.captureOnCommitCallbacks(execute=True):
+            response = self.complete()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], SessionUpload.STATUS_COMPLETED)
+        session = RunningSession.objects.get(id=response.json()['session'])
+        task.delay.assert_called_once_with(session.id)
+        with session.session_file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_bad_or_expired_signature(self):
+        url, _, signature = self.urls[1].partition('?signature=')
+        self.assertEqual(self.put(f'{url}?signature={signature[:-2]}xx', self.part(1)).status_code, 403)
+        self.assertEqual(self.put(url, self.part(1)).status_code, 403)
+        # A valid signature for another part
+        self.assertEqual(self.put(f"{url}?signature={self.urls[2].partition('?signature=')[2]}", self.part(1)).status_code, 403)
+        with override_settings(SESSION_UPLOAD_URL_EXPIRY=-1):
+            self.assertEqual(self.put(self.urls[1], self.part(1)).status_code, 403)
+        self.assertEqual(self.put(self.urls[1], self.part(1)).status_code, 200)
+
+    def test_part_size_and_number_are_checked(self):
+        self.assertEqual(self.put(self.urls[1], self.part(1)[:-1]).status_code, 400)
+        self.assertEqual(self.put(self.urls[2], self.part(2) + b'x').status_code, 400)
+
+    def test_incomplete_upload_cannot_be_completed(self):
+        self.put(self.urls[1], self.part(1))
+        response = self.complete()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(SessionUpload.objects.get(id=self.upload['id']).status, SessionUpload.STATUS_UPLOADING)
+        self.assertFalse(RunningSession.objects.exists())
+
+    def test_completing_twice(self):
+        for number in (1, 2):
+            self.put(self.urls[number], self.part(number))
+        # The second request loaded the upload before the first one completed it
+        stale = SessionUpload.objects.get(id=self.upload['id'])
+        with mock.patch('volunteers.views.process_session_file') as task, self.captureOnCommitCallbacks(execute=True):
+            first = self.complete()
+            with mock.patch.object(SessionUploadViewSet, 'get_object', return_value=stale):
+                second = self.complete()
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(first.json()['session'], second.json()['session'])
+        self.assertEqual(RunningSession.objects.count(), 1)
+        task.delay.assert_called_once_with(first.json()['session'])
+        # Parts can't be sent to a completed upload
+        self.assertEqual(self.put(self.urls[1], self.part(1)).status_code, 409)
+
+    def test_other_endpoints_require_an_admin(self):
+        self.assertEqual(self.anonymous.get(f"/api/uploads/{self.upload['id']}/").status_code, 401)
+        self.assertEqual(self.anonymous.post(f"/api/uploads/{self.upload['id']}/complete/").status_code, 401)
+
+
+# ==============================================================================
+# REPROCESSING
+# ==============================================================================
+
+class ReprocessWriteBatchTests(TestCase):
+    def setUp(self):
+        volunteer = make_volunteer()
+        self.sessions = [make_session(volunteer, status=RunningSession.STATUS_PROCESSING) for _ in range(3)]
+        self.command = ReprocessCommand(stdout=io.StringIO(), stderr=io.StringIO())
+        self.command.total, self.command.summary_only = 3, False
+        self.command.done = self.command.failed = 0
+        self.command.started = 0.0
+
+    def result(self, distance):
+        return SimpleNamespace(
+            content_hash=f'hash-{distance}', parser_version='test', start_time=None,
+            summary={'total_distance_km': distance, 'total_duration_secs': 60.0, 'avg_heart_rate': 140, 'max_heart_rate': 170},
+        )
+
+    def test_failing_session_does_not_undo_the_batch(self):
+        def store(session, result):
+            RunningSession.objects.filter(id=session.id).update(admin_label='stored')
+            if session.id == self.sessions[1].id:
+                raise ValueError("could not store")
+
+        pairs = [(session, self.result(float(i + 1))) for i, session in enumerate(self.sessions)]
+        with mock.patch('volunteers.management.commands.reprocess_sessions.store_parse_result', side_effect=store):
+            self.command.write_batch(pairs)
+
+        first, failed, last = (RunningSession.objects.get(id=session.id) for session in self.sessions)
+        self.assertEqual((first.status, first.total_distance_km, first.admin_label), (RunningSession.STATUS_COMPLETED, 1.0, 'stored'))
+        self.assertEqual((last.status, last.total_distance_km, last.admin_label), (RunningSession.STATUS_COMPLETED, 3.0, 'stored'))
+        # Its own writes are rolled back and its totals left as they were
+        self.assertEqual(
+            (failed.status, failed.processing_error, failed.total_distance_km, failed.content_hash, failed.admin_label),
+            (RunningSession.STATUS_FAILED, "could not store", None, None, None),
+        )
+        self.assertEqual((self.command.done, self.command.failed), (3, 1))
+
+
+# ==============================================================================
+# CONTENT HASHES AND THE PARSE CACHE
+# ==============================================================================
+
+class ParseCacheTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+    def upload(self, name='run.csv', content=None):
+        content = content or CSV_DOCUMENT
+        with mock.patch('volunteers.views.process_session_file') as task:
+            response = self.client.post('/api/sessions/', {
+                'volunteer': self.volunteer.id, 'session_date': '2024-05-01T06:00:00Z', 'source_type': 'admin_upload',
+                'session_file': SimpleUploadedFile(name, content),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        task.delay.assert_called_once_with(response.json()['id'])
+        return RunningSession.objects.get(id=response.json()['id'])
+
+    def process(self, session):
+        process_session_file(session.id)
+        return RunningSession.objects.get(id=session.id)
+
+    def test_hash_is_computed_at_upload(self):
+        session = self.upload()
+        self.assertEqual(session.content_hash, compute_content_hash(io.BytesIO(CSV_DOCUMENT)))
+        with session.session_file.open('rb') as f:
+            self.assertEqual(compute_content_hash(f), session.content_hash)
+
+    def test_identical_files_are_parsed_once(self):
+        first = self.process(self.upload())
+        self.assertEqual(first.status, RunningSession.STATUS_COMPLETED)
+        self.assertEqual(ParsedFileResult.objects.get().parser_version, PARSER_VERSION)
+
+        with mock.patch('volunteers.tasks.parse_session_file') as parse:
+            second = self.process(self.upload('copy.csv'))
+        parse.assert_not_called()
+        self.assertEqual(second.status, RunningSession.STATUS_COMPLETED)
+        self.assertEqual(
+            (second.total_duration_secs, second.avg_heart_rate, second.total_distance_km, second.parser_version),
+            (first.total_duration_secs, first.avg_heart_rate, first.total_distance_km, first.parser_version),
+        )
+        self.assertEqual(second.timeseries_data, first.timeseries_data)
+        self.assertEqual(ParsedFileResult.objects.count(), 1)
+
+    def test_other_parser_version_parses_again(self):
+        self.process(self.upload())
+        with mock.patch('volunteers.tasks.PARSER_VERSION', 'next'):
+            session = self.process(self.upload('copy.csv'))
+        self.assertEqual(session.parser_version, 'next')
+        self.assertEqual(
+            sorted(ParsedFileResult.objects.values_list('parser_version', flat=True)), sorted([PARSER_VERSION, 'next'])
+        )
+
+    def test_other_content_is_parsed(self):
+        self.process(self.upload())
+        session = self.process(self.upload('other.csv', CSV_DOCUMENT.replace(b'06:00:03', b'06:00:04')))
+        self.assertEqual(session.total_duration_secs, 4.0)
+        self.assertEqual(ParsedFileResult.objects.count(), 2)
+
+    def test_deduplicated_storage(self):
+        with override_settings(DEDUPLICATE_SESSION_FILES=True):
+            first, second = self.upload(), self.upload('copy.csv')
+        self.assertEqual(second.session_file.name, first.session_file.name)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'session_files'))), 1)
+        # Off by default: every upload is stored
+        self.assertNotEqual(self.upload('third.csv').session_file.name, first.session_file.name)
+
+
+# ==============================================================================
+# PARSING
+# ==============================================================================
+
+CORPUS = settings.BASE_DIR / 'session_files'
+
+
+class FitDecoderTests(SimpleTestCase):
+    # Files from several devices and years of the corpus
+    files = [
+        '13500716453_2025-01-31_06-49-PM_4-54.fit',
+        '12913581794_2024-11-16_07-30-PM_13-32.fit',
+        '8646784639_2023-03-02_05-46-PM_8-43_Mm5pxUe.fit',
+        '7353813329_2022-06-09_06-54-PM_30-47.fit',
+    ]
+
+    def test_vectorized_decoder_matches_per_record_parser(self):
+        for name in self.files:
+            with self.subTest(name):
+                summary, records = analyze_fit_file(CORPUS / name)
+                expected_summary, expected_records = _analyze_fit_records(CORPUS / name)
+                self.assertEqual(records, expected_records)
+                self.assertEqual(clean_summary_data(summary), clean_summary_data(expected_summary))
+                self.assertEqual(clean_summary_data(summarize_fit_file(CORPUS / name)), clean_summary_data(expected_summary))
+
+    def test_unsupported_layout_falls_back_to_fitparse(self):
+        path = CORPUS / self.files[0]
+        with mock.patch('volunteers.utils.decode_fit_file', side_effect=UnsupportedFitLayout("test")):
+            self.assertEqual(analyze_fit_file(path)[1], _analyze_fit_records(path)[1])
+
+TCX_DOCUMENT = b'''<?xml version="1.0" encoding="UTF-8"?>
+<TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2"
+    xmlns:ns3="http://www.garmin.com/xmlschemas/ActivityExtension/v2">
+  <Activities><Activity Sport="Running"><Id>2025-01-17T22:03:53Z</Id>
+    <Lap StartTime="2025-01-17T22:03:53Z">
+      <TotalTimeSeconds>125.5</TotalTimeSeconds><DistanceMeters>412.345</DistanceMeters>
+      <Track>
+        <Trackpoint>
+          <Time>2025-01-17T22:03:53Z</Time>
+          <Position><LatitudeDegrees>13.75</LatitudeDegrees><LongitudeDegrees>100.5</LongitudeDegrees></Position>
+          <AltitudeMeters>4.2</AltitudeMeters><DistanceMeters>0.0</DistanceMeters>
+          <HeartRateBpm><Value>101</Value></HeartRateBpm>
+          <Extensions><ns3:TPX><ns3:Speed>2.5</ns3:Speed><ns3:RunCadence>80</ns3:RunCadence></ns3:TPX></Extensions>
+        </Trackpoint>
+        <Trackpoint>
+          <Time>2025-01-17T22:03:54Z</Time>
+          <DistanceMeters>2.5</DistanceMeters>
+          <Extensions><ns3:TPX><ns3:Speed>2.75</ns3:Speed></ns3:TPX></Extensions>
+        </Trackpoint>
+        <Trackpoint>
+          <HeartRateBpm><Value>180</Value></HeartRateBpm>
+        </Trackpoint>
+        <Trackpoint>
+          <Time>2025-01-17T22:03:56Z</Time>
+          <HeartRateBpm><Value>110</Value></HeartRateBpm>
+        </Trackpoint>
+      </Track>
+    </Lap>
+    <Lap StartTime="2025-01-17T22:05:59Z">
+      <TotalTimeSeconds>60</TotalTimeSeconds><DistanceMeters>100</DistanceMeters>
+      <Track><Trackpoint><Time>2025-01-17T22:06:00Z</Time><HeartRateBpm><Value>120</Value></HeartRateBpm></Trackpoint></Track>
+    </Lap>
+  </Activity></Activities>
+</TrainingCenterDatabase>
+'''
+
+
+class TcxParserTests(SimpleTestCase):
+    # What the ET.parse/findall parser returned for TCX_DOCUMENT: only the
+    # first lap's totals, and heart rates from trackpoints without a time too
+    expected_summary = {'total_distance_km': 0.41, 'total_duration_secs': 125.5, 'avg_heart_rate': 128, 'max_heart_rate': 180}
+    expected_records = [
+        {'timestamp': '2025-01-17T22:03:53Z', 'heart_rate': 101, 'position_lat': 13.75, 'position_long': 100.5,
+         'altitude': 4.2, 'distance': 0.0, 'speed': 2.5, 'cadence': 160, 'Anomaly': 0},
+        {'timestamp': '2025-01-17T22:03:54Z', 'heart_rate': None, 'position_lat': None, 'position_long': None,
+         'altitude': None, 'distance': 2.5, 'speed': 2.75, 'cadence': None, 'Anomaly': 0},
+        {'timestamp': '2025-01-17T22:03:56Z', 'heart_rate': 110, 'position_lat': None, 'position_long': None,
+         'altitude': None, 'distance': None, 'Anomaly': 0},
+        {'timestamp': '2025-01-17T22:06:00Z', 'heart_rate': 120, 'position_lat': None, 'position_long': None,
+         'altitude': None, 'distance': None, 'Anomaly': 0},
+    ]
+
+    def test_matches_the_tree_parser(self):
+        summary, records = analyze_tcx_file(io.BytesIO(TCX_DOCUMENT))
+        self.assertEqual(summary, self.expected_summary)
+        self.assertEqual(records, self.expected_records)
+        # Keys keep their order, as the JSON of the records did
+        self.assertEqual([list(record) for record in records], [list(record) for record in self.expected_records])
+        self.assertEqual(summarize_tcx_file(io.BytesIO(TCX_DOCUMENT)), self.expected_summary)
+
+    def test_corpus_file(self):
+        summary, records = analyze_tcx_file(CORPUS / 'activity_17987162750.tcx')
+        self.assertEqual(summary, {'total_distance_km': 1.0, 'total_duration_secs': 464.12, 'avg_heart_rate': 142, 'max_heart_rate': 164})
+        self.assertEqual(len(records), 2591)
+        self.assertEqual(records[0], {
+            'timestamp': '2025-01-12T22:31:16.000Z', 'heart_rate': 89, 'position_lat': 13.740132506936789,
+            'position_long': 100.52496864460409, 'altitude': 7.599999904632568, 'distance': 2.4800000190734863,
+            'speed': 0.0, 'cadence': 0, 'Anomaly': 0,
+        })
+
+    def test_malformed_document(self):
+        truncated = io.BytesIO(TCX_DOCUMENT[:-200])
+        self.assertEqual(analyze_tcx_file(truncated), (None, None))
+        self.assertIsNone(summarize_tcx_file(io.BytesIO(TCX_DOCUMENT[:-200])))
+
+
+CSV_DOCUMENT = (
+    b'Time,Heart Rate,distance,position_lat,enhanced_altitude,enhanced_speed,cadence,calories\n'
+    b'2024-05-01 06:00:00,,0,160000000,2550,2.5,80,1\n'
+    b'2024-05-01 06:00:01,120,,160000100,2551,2.6,81,1\n'
+    b',130,5.5,,,,,\n'
+    b'2024-05-01 06:00:02,,7.5,,2552,2.7,82,2\n'
+    b'2024-05-01 06:00:03,125,10,160000300,2553,2.8,,2\n'
+)
+
+
+def semicircles(value):
+    return value * (180.0 / 2**31)
+
+
+class CsvParserTests(SimpleTestCase):
+    # What the whole-frame pd.read_csv parser returned for CSV_DOCUMENT, less
+    # the unmapped calories column that is no longer read
+    expected_summary = {'total_duration_secs': 3.0, 'avg_heart_rate': 125.0, 'max_heart_rate': 130.0, 'total_distance_km': 0.01}
+    expected_records = [
+        {'timestamp': '2024-05-01T06:00:00.000000+0000', 'heart_rate': None, 'distance': 0.0,
+         'position_lat': semicircles(160000000), 'enhanced_altitude': 2550.0, 'enhanced_speed': 2.5, 'cadence': 80.0,
+         'altitude': 2550 / 5.0 - 500.0, 'speed': 2.5, 'Anomaly': 0},
+        {'timestamp': '2024-05-01T06:00:01.000000+0000', 'heart_rate': 120.0, 'distance': 0.0,
+         'position_lat': semicircles(160000100), 'enhanced_altitude': 2551.0, 'enhanced_speed': 2.6, 'cadence': 81.0,
+         'altitude': 2551 / 5.0 - 500.0, 'speed': 2.6, 'Anomaly': 0},
+        # Forward-filled from the row without a time, which is dropped
+        {'timestamp': '2024-05-01T06:00:02.000000+0000', 'heart_rate': 130.0, 'distance': 7.5,
+         'position_lat': semicircles(160000100), 'enhanced_altitude': 2552.0, 'enhanced_speed': 2.7, 'cadence': 82.0,
+         'altitude': 2552 / 5.0 - 500.0, 'speed': 2.7, 'Anomaly': 0},
+        {'timestamp': '2024-05-01T06:00:03.000000+0000', 'heart_rate': 125.0, 'distance': 10.0,
+         'position_lat': semicircles(160000300), 'enhanced_altitude': 2553.0, 'enhanced_speed': 2.8, 'cadence': None,
+         'altitude': 2553 / 5.0 - 500.0, 'speed': 2.8, 'Anomaly': 0},
+    ]
+
+    def parse(self, document, chunk_rows):
+        with mock.patch('volunteers.utils.CSV_CHUNK_ROWS', chunk_rows):
+            summary, records = analyze_csv_file(io.BytesIO(document))
+            self.assertEqual(summarize_csv_file(io.BytesIO(document)), summary)
+        return summary, records
+
+    def test_matches_the_whole_frame_parser(self):
+        # Forward-fills and the summary carry across chunk boundaries
+        for chunk_rows in (CSV_CHUNK_ROWS, 2, 1):
+            with self.subTest(chunk_rows=chunk_rows):
+                summary, records = self.parse(CSV_DOCUMENT, chunk_rows)
+                self.assertEqual(summary, self.expected_summary)
+                self.assertEqual(records, self.expected_records)
+
+    def test_malformed_numbers_are_coerced(self):
+        summary, records = self.parse(CSV_DOCUMENT.replace(b'2.7,82', b'2.7,n/a'), 2)
+        self.assertEqual(summary, self.expected_summary)
+        self.assertEqual(records[:2] + records[3:], self.expected_records[:2] + self.expected_records[3:])
+        self.assertEqual(records[2], dict(self.expected_records[2], cadence=None))
+
+    def test_whole_number_channels(self):
+        document = (
+            b'timestamp,hr,Power\n2024-05-01T06:00:00Z,120,200\n'
+            b'2024-05-01T06:00:01Z,121,201\n2024-05-01T06:00:02Z,122,202.5\n'
+        )
+        for chunk_rows in (CSV_CHUNK_ROWS, 2):
+            with self.subTest(chunk_rows=chunk_rows):
+                summary, records = self.parse(document, chunk_rows)
+                self.assertEqual(summary, {'total_duration_secs': 2.0, 'avg_heart_rate': 121.0, 'max_heart_rate': 122})
+                # heart_rate has no fractions, so stays int; power turns float as a whole
+                self.assertEqual([(type(r['heart_rate']), type(r['power'])) for r in records], [(int, float)] * 3)
+                self.assertEqual([r['power'] for r in records], [200.0, 201.0, 202.5])
+
+    def test_missing_time_column(self):
+        with self.assertRaisesMessage(ValueError, "must contain a 'timestamp' or 'Time' column"):
+            analyze_csv_file(io.BytesIO(b'hr,distance\n120,0\n'))
+
+
+class ParserOutputTests(SimpleTestCase):
+    """
+    Parse results are cached per PARSER_VERSION, so a parser whose output
+    changes must bump it. Add the new version's digest here when you do.
+    """
+    files = [
+        '13500716453_2025-01-31_06-49-PM_4-54.fit',
+        'activity_17987162750.tcx',
+        '7353813243_2022-06-10_09-25-PM_33-55.csv',
+    ]
+    digests = {
+        '2026.10.2': '803bb7bf9bbb0934741214adfaa92f5d1e6dece3184ada7144a87db31ddc8f90',
+    }
+
+    def test_output_matches_the_parser_version(self):
+        outputs = [analyze_session_file(CORPUS / name) for name in self.files]
+        digest = hashlib.sha256(json.dumps(outputs, cls=DjangoJSONEncoder).encode()).hexdigest()
+        self.assertIn(PARSER_VERSION, self.digests, "Record the output digest of the new PARSER_VERSION")
+        self.assertEqual(digest, self.digests[PARSER_VERSION], "The parsers' output changed: bump PARSER_VERSION")
+
+
+GPX_DOCUMENT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<!-- exported -->
+<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1"
+     xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">
+  <trk><trkseg>
+    <trkpt lat="52.0" lon="4.0"><ele>1.5</ele><time>2024-05-01T06:00:00Z</time>
+      <extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>120</gpxtpx:hr><gpxtpx:cad>80</gpxtpx:cad></gpxtpx:TrackPointExtension></extensions>
+    </trkpt>
+    <trkpt lat="52.001" lon="4.0"><time>2024-05-01T06:00:10Z</time>
+      <extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>130</gpxtpx:hr></gpxtpx:TrackPointExtension></extensions>
+    </trkpt>
+    <trkpt><extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>140</gpxtpx:hr></gpxtpx:TrackPointExtension></extensions></trkpt>
+    <trkpt lat="52.002" lon="4.0"><time>2024-05-01T06:00:20Z</time></trkpt>
+  </trkseg></trk>
+</gpx>
+"""
+
+
+class SessionFileFormatTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def zipped(self, members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, content in members.items():
+                zf.writestr(name, content)
+        return buffer.getvalue()
+
+    def test_gpx(self):
+        summary, records = analyze_session_file(self.write('run.gpx', GPX_DOCUMENT))
+        self.assertEqual([record['timestamp'] for record in records], [
+            '2024-05-01T06:00:00Z', '2024-05-01T06:00:10Z', '2024-05-01T06:00:20Z',
+        ])
+        self.assertEqual(records[0], {
+            'timestamp': '2024-05-01T06:00:00Z', 'heart_rate': 120, 'position_lat': 52.0, 'position_long': 4.0,
+            'altitude': 1.5, 'cadence': 80, 'Anomaly': 0, 'distance': 0.0,
+        })
+        self.assertAlmostEqual(records[2]['distance'], 222.39, places=2)
+        # The point without a time still counts towards the heart rate summary
+        self.assertEqual(summary, {
+            'total_distance_km': 0.22, 'total_duration_secs': 20.0, 'avg_heart_rate': 130, 'max_heart_rate': 140,
+        })
+
+    def test_malformed_gpx(self):
+        path = self.write('run.gpx', GPX_DOCUMENT[:-40])
+        with self.assertRaisesMessage(ValueError, "might be corrupt"):
+            parse_session_file(path, 'hash')
+
+    def test_files_are_matched_by_content(self):
+        fit = (CORPUS / '13500716453_2025-01-31_06-49-PM_4-54.fit').read_bytes()
+        self.assertIs(detect_parser(self.write('run.csv', GPX_DOCUMENT)), GpxParser)
+        self.assertIs(detect_parser(self.write('export.dat', fit)), FitParser)
+        self.assertIs(detect_parser(self.write('run.txt', b'\xef\xbb\xbfTime,Heart Rate\n')), CsvParser)
+        self.assertIs(detect_parser(io.BytesIO(TCX_DOCUMENT)), TcxParser)
+        # Unrecognised content falls back to the extension
+        self.assertIs(detect_parser(self.write('notes.csv', b'lap,split\n1,300\n')), CsvParser)
+        with self.assertRaisesMessage(ValueError, "Unsupported file type: .txt"):
+            detect_parser(self.write('notes.txt', b'hello'))
+
+    def test_gzipped_files(self):
+        fit_path = CORPUS / '13500716453_2025-01-31_06-49-PM_4-54.fit'
+        path = self.write('run.FIT.gz', gzip.compress(fit_path.read_bytes()))
+        self.assertEqual(session_file_type('run.FIT.gz'), '.fit.gz')
+        self.assertEqual(inner_file_name(path), 'run.FIT')
+        self.assertIs(detect_parser(path), FitParser)
+        self.assertEqual(analyze_session_file(path), analyze_session_file(fit_path))
+        # By content, whatever the name
+        misnamed = self.write('run.gpx', gzip.compress(GPX_DOCUMENT))
+        self.assertEqual(analyze_session_file(misnamed), analyze_session_file(self.write('plain.gpx', GPX_DOCUMENT)))
+
+    def test_zipped_files(self):
+        tcx_path = CORPUS / 'activity_17987162750.tcx'
+        path = self.write('run.zip', self.zipped({
+            'export/activity.tcx': tcx_path.read_bytes(),
+            '__MACOSX/export/._activity.tcx': b'metadata',
+            'export/.DS_Store': b'metadata',
+        }))
+        self.assertEqual(inner_file_name(path), 'activity.tcx')
+        self.assertIs(detect_parser(path), TcxParser)
+        self.assertEqual(analyze_session_file(path), analyze_session_file(tcx_path))
+        with open(path, 'rb') as f:
+            self.assertEqual(summarize_session_file(f), summarize_session_file(tcx_path))
+
+    def test_zip_of_several_files(self):
+        path = self.write('runs.zip', self.zipped({'a.gpx': GPX_DOCUMENT, 'b.gpx': GPX_DOCUMENT}))
+        with self.assertRaisesMessage(ValueError, "'runs.zip' must contain exactly one session file, found 2"):
+            analyze_session_file(path)
+
+    def test_supported_file_types(self):
+        types = supported_file_types()
+        for file_type in ('.fit', '.tcx', '.csv', '.gpx', '.fit.gz', '.gpx.gz', '.zip'):
+            self.assertIn(file_type, types)
+
+
+class UnreadableFileTests(SimpleTestCase):
+    # A FIT file of the corpus whose records can't be decoded
+    corrupt_fit = CORPUS / '7355148598_2022-06-23_05-55-PM_13-54.fit'
+
+    def test_full_and_summary_parsing_both_fail(self):
+        with self.assertRaisesMessage(ValueError, "might be corrupt"):
+            parse_session_file(self.corrupt_fit, 'hash')
+        with self.assertRaisesMessage(ValueError, "might be corrupt"):
+            summarize_session_file(self.corrupt_fit)
+
+    def test_clean_summary_data(self):
+        self.assertEqual(clean_summary_data(None), {})
+        self.assertEqual(clean_summary_data({}), {})
+        self.assertEqual(clean_summary_data({'a': np.float64('nan'), 'b': np.int32(3)}), {'a': None, 'b': 3})
+
+
+# ==============================================================================
+# STORED SESSION FILES
+# ==============================================================================
+
+@skipIf(mock_aws is None, "moto is not installed")
+class SessionFileCacheTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.dict(os.environ, {'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing'}))
+        self.enterContext(mock_aws())
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='sessions')
+        self.storage = S3Storage(bucket_name='sessions', region_name='us-east-1')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = SessionFileCache(self.directory, max_bytes=2500)
+
+    def stored(self, name, content):
+        field = RunningSession._meta.get_field('session_file')
+        field_file = FieldFile(None, field, self.storage.save(f'session_files/{name}', ContentFile(content)))
+        field_file.storage = self.storage
+        return field_file
+
+    def cached(self):
+        return sorted(name.split('-', 1)[1] for name in os.listdir(self.directory))
+
+    def age(self, path, secs):
+        used = time.time() - secs
+        os.utime(path, (used, used))
+
+    def test_fill_and_reuse_by_hash(self):
+        field_file = self.stored('run.fit', b'x' * 1000)
+        content_hash = compute_content_hash(io.BytesIO(b'x' * 1000))
+        path = self.cache.path(field_file)
+        self.assertEqual(os.path.basename(path), f'{content_hash}-run.fit')
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'x' * 1000)
+
+        with mock.patch.object(self.storage, 'open', wraps=self.storage.open) as storage_open:
+            self.assertEqual(self.cache.path(field_file, content_hash), path)
+            storage_open.assert_not_called()
+            # Without the hash the file can't be looked up
+            self.assertEqual(self.cache.path(field_file), path)
+            storage_open.assert_called_once()
+        self.assertEqual(self.cached(), ['run.fit'])
+
+    def test_least_recently_used_files_are_evicted(self):
+        first, second = self.stored('first.fit', b'1' * 1000), self.stored('second.fit', b'2' * 1000)
+        first_path, second_path = self.cache.path(first), self.cache.path(second)
+        self.age(first_path, 3600)
+        self.age(second_path, 1800)
+        # A hit makes first the most recently used
+        self.cache.path(first, compute_content_hash(io.BytesIO(b'1' * 1000)))
+        self.age(first_path, 900)
+        self.cache.path(self.stored('third.fit', b'3' * 1000))
+        self.assertEqual(self.cached(), ['first.fit', 'third.fit'])
+        # Downloads in progress are never evicted
+        self.assertFalse(any(name.startswith('.') for name in os.listdir(self.directory)))
+
+    def test_recently_used_files_are_kept_over_the_limit(self):
+        for name in ('first.fit', 'second.fit', 'third.fit'):
+            self.cache.path(self.stored(name, b'x' * 1000))
+        self.assertEqual(self.cached(), ['first.fit', 'second.fit', 'third.fit'])
+        for name in os.listdir(self.directory):
+            self.age(os.path.join(self.directory, name), EVICTION_GRACE_SECS + 60)
+        self.cache.evict()
+        self.assertEqual(len(self.cached()), 2)
+
+    def test_file_evicted_before_it_is_opened(self):
+        field_file = self.stored('run.fit', b'x' * 1000)
+        content_hash = compute_content_hash(io.BytesIO(b'x' * 1000))
+        path = self.cache.path(field_file)
+        cache_path = self.cache.path
+
+        def evicted_meanwhile(*args, **kwargs):
+            found = cache_path(*args, **kwargs)
+            if os.path.exists(path) and len(args) + len(kwargs) > 1:
+                os.unlink(found)
+            return found
+
+        with mock.patch.object(self.cache, 'path', side_effect=evicted_meanwhile):
+            with self.cache.open(field_file, content_hash) as f:
+                self.assertEqual(f.read(), b'x' * 1000)
+        self.assertEqual(self.cached(), ['run.fit'])
+
+    def test_processing_a_session_on_s3(self):
+        content = (CORPUS / '13500716453_2025-01-31_06-49-PM_4-54.fit').read_bytes()
+        field_file = self.stored('run.fit', content)
+        session = make_session(make_volunteer(), session_file=field_file.name, status=RunningSession.STATUS_PROCESSING)
+        field = RunningSession._meta.get_field('session_file')
+        with mock.patch.object(field, 'storage', self.storage), \
+                override_settings(SESSION_FILE_CACHE_DIR=self.directory, SESSION_FILE_CACHE_SIZE=10 ** 6):
+            process_session_file(session.id)
+            session.refresh_from_db()
+            self.assertEqual(session.status, RunningSession.STATUS_COMPLETED)
+            self.assertEqual(session.content_hash, compute_content_hash(io.BytesIO(content)))
+            self.assertEqual(self.cached(), ['run.fit'])
+            with mock.patch.object(self.storage, 'open') as storage_open, open_stored_file(session.session_file, session.content_hash) as f:
+                self.assertEqual(f.read(), content)
+                self.assertEqual(f.name, field_file.name)
+            storage_open.assert_not_called()
+
+
+# ==============================================================================
+# BATCH UPLOADS
+# ==============================================================================
+
+class UploadBatchTests(AdminAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+    def stored_files(self):
+        directory = os.path.join(self.media_root, 'session_files')
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def archive(self, compression=zipfile.ZIP_STORED, corrupt=None):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression) as zf:
+            zf.writestr('first.csv', b'timestamp,heart_rate\n2024-05-01T06:00:00Z,120\n')
+            zf.writestr('runs/second.csv', b'timestamp,heart_rate\n2024-05-01T06:00:01Z,121\n' * 20)
+        data = buffer.getvalue()
+        if corrupt:
+            data = corrupt(data)
+        return SimpleUploadedFile('runs.zip', data, content_type='application/zip')
+
+    def post(self, archive):
+        return self.client.post('/api/batches/', {'volunteer': self.volunteer.id, 'archive': archive}, format='multipart')
+
+    def assertNothingStored(self):
+        self.assertFalse(UploadBatch.objects.exists())
+        self.assertFalse(RunningSession.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_members_are_stored_and_queued_on_commit(self):
+        with mock.patch('volunteers.views.dispatch_upload_batch') as dispatch, self.captureOnCommitCallbacks(execute=True):
+            response = self.post(self.archive(zipfile.ZIP_DEFLATED))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.stored_files()), 2)
+        sessions = RunningSession.objects.filter(batch_id=response.json()['id']).order_by('id')
+        self.assertEqual(len(sessions), 2)
+        dispatch.assert_called_once()
+        # Members are stored gzipped
+        with sessions[1].session_file.open('rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), b'timestamp,heart_rate\n2024-05-01T06:00:01Z,121\n' * 20)
+        self.assertTrue(sessions[1].session_file.name.endswith('.csv.gz'))
+
+    def test_batch_is_dispatched_as_one_chord(self):
+        batch = UploadBatch.objects.create(volunteer=self.volunteer, source_type='admin_upload')
+        with mock.patch('volunteers.tasks.chord') as chord:
+            chord.return_value.return_value.id = 'chord-1'
+            tasks.dispatch_upload_batch(batch, [11, 12])
+        header = chord.call_args.args[0]
+        self.assertEqual([(signature.task, signature.args, signature.options['queue']) for signature in header], [
+            ('volunteers.tasks.process_session_file', (11,), tasks.QUEUE_BULK),
+            ('volunteers.tasks.process_session_file', (12,), tasks.QUEUE_BULK),
+        ])
+        callback = chord.return_value.call_args.args[0]
+        self.assertEqual((callback.task, callback.args), ('volunteers.tasks.finalize_upload_batch', (batch.id,)))
+        batch.refresh_from_db()
+        self.assertEqual(batch.task_group_id, 'chord-1')
+        self.assertIsNone(batch.completed_at)
+
+        tasks.finalize_upload_batch([None, None], batch.id)
+        batch.refresh_from_db()
+        self.assertIsNotNone(batch.completed_at)
+
+    def test_member_failing_its_crc_check(self):
+        # second.csv fails its CRC check, after first.csv has been stored
+        response = self.post(self.archive(corrupt=lambda data: data.replace(b'01Z,121', b'01Z,999', 1)))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("'runs/second.csv' can't be read", response.json()['archive'][0])
+        self.assertNothingStored()
+
+    def test_member_with_a_corrupt_stream(self):
+        def corrupt(data):
+            # Garbles the deflate stream of second.csv
+            start = data.index(b'runs/second.csv') + len(b'runs/second.csv')
+            return data[:start] + bytes(0xff for _ in range(8)) + data[start + 8:]
+
+        response = self.post(self.archive(zipfile.ZIP_DEFLATED, corrupt=corrupt))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("'runs/second.csv' can't be read", response.json()['archive'][0])
+        self.assertNothingStored()
+
+    def test_oversized_member(self):
+        with override_settings(BATCH_UPLOAD_MAX_MEMBER_SIZE=100):
+            response = self.post(self.archive(zipfile.ZIP_DEFLATED))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("'runs/second.csv' is larger than the 100 byte limit", response.json()['archive'][0])
+        self.assertNothingStored()
+
+    def test_member_larger_than_its_directory_entry_claims(self):
+        infolist = zipfile.ZipFile.infolist
+
+        def forged_infolist(zf):
+            infos = infolist(zf)
+            for info in infos:
+                info.file_size = 10
+            return infos
+
+        with mock.patch.object(zipfile.ZipFile, 'infolist', forged_infolist):
+            response = self.post(self.archive(zipfile.ZIP_DEFLATED))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("'first.csv' can't be read", response.json()['archive'][0])
+        self.assertNothingStored()
+
+    def test_failed_insert_leaves_no_files(self):
+        with mock.patch.object(RunningSession.objects, 'bulk_create', side_effect=RuntimeError("insert failed")):
+            with self.assertRaises(RuntimeError):
+                self.post(self.archive())
+        self.assertEqual(self.stored_files(), [])
+
+
+# ==============================================================================
+# PROMETHEUS METRICS
+# ==============================================================================
+
+class MetricsTests(AdminAPITestCase):
+    def record(self, file_type='.fit', age=None, **fields):
+        fields.setdefault('status', RunningSession.STATUS_COMPLETED)
+        fields.setdefault('parse_secs', 0.2)
+        fields.setdefault('total_secs', 0.3)
+        row = ProcessingMetrics.objects.create(file_type=file_type, parser_version=PARSER_VERSION, **fields)
+        if age is not None:
+            ProcessingMetrics.objects.filter(id=row.id).update(created_at=timezone.now() - age)
+        return row
+
+    def test_admin_or_metrics_token_required(self):
+        anonymous = APIClient()
+        with override_settings(METRICS_TOKEN='s3cret'):
+            self.assertEqual(anonymous.get('/api/metrics/').status_code, 401)
+            self.assertEqual(anonymous.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+            self.assertEqual(anonymous.get('/api/metrics/', HTTP_AUTHORIZATION='Basic s3cret').status_code, 401)
+            response = anonymous.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer s3cret')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], METRICS_CONTENT_TYPE)
+        # Without a configured token an empty bearer doesn't get in
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(anonymous.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer ').status_code, 401)
+        non_admin = APIClient()
+        non_admin.force_authenticate(User.objects.create_user('volunteer', 'v@example.com', 'password'))
+        self.assertEqual(non_admin.get('/api/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 200)
+
+    def test_exposition(self):
+        self.record(num_records=100, bytes_in=2000, peak_rss_bytes=5000)
+        self.record(num_records=50, bytes_in=1000, parse_secs=3.0, total_secs=4.0, peak_rss_bytes=7000)
+        self.record(cached_result=True, parse_secs=None, total_secs=0.01)
+        self.record('.csv', status=RunningSession.STATUS_FAILED, parse_secs=0.001, total_secs=0.002)
+        lines = render_metrics().splitlines()
+
+        self.assertIn('# TYPE session_processing_runs_total counter', lines)
+        self.assertIn('session_processing_runs_total{file_type=".fit",status="completed",cached="false"} 2', lines)
+        self.assertIn('session_processing_runs_total{file_type=".fit",status="completed",cached="true"} 1', lines)
+        self.assertIn('session_processing_runs_total{file_type=".csv",status="failed",cached="false"} 1', lines)
+        self.assertIn('session_processing_records_total{file_type=".fit"} 150', lines)
+        self.assertIn('session_processing_bytes_in_total{file_type=".fit"} 3000', lines)
+        self.assertIn('session_processing_bytes_out_total{file_type=".fit"} 0', lines)
+        # Buckets are cumulative, and a stage that didn't run isn't observed
+        self.assertIn('# TYPE session_processing_stage_seconds histogram', lines)
+        parse = 'session_processing_stage_seconds_bucket{file_type=".fit",stage="parse",le=%s}'
+        self.assertIn(parse % '"0.1"' + ' 0', lines)
+        self.assertIn(parse % '"0.25"' + ' 1', lines)
+        self.assertIn(parse % '"5"' + ' 2', lines)
+        self.assertIn(parse % '"+Inf"' + ' 2', lines)
+        self.assertIn('session_processing_stage_seconds_sum{file_type=".fit",stage="parse"} 3.2', lines)
+        self.assertIn('session_processing_stage_seconds_count{file_type=".fit",stage="parse"} 2', lines)
+        self.assertIn('session_processing_seconds_count{file_type=".fit"} 3', lines)
+        self.assertIn('session_processing_seconds_bucket{file_type=".csv",le="0.005"} 1', lines)
+        self.assertIn('session_processing_peak_rss_bytes{file_type=".fit"} 7000', lines)
+        self.assertTrue(render_metrics().endswith('\n'))
+
+    def test_label_values_are_escaped(self):
+        self.record('a"b\\c')
+        self.assertIn('session_processing_records_total{file_type="a\\"b\\\\c"} 0', render_metrics().splitlines())
+
+    def test_rolled_up_rows_keep_their_counters(self):
+        old = datetime.timedelta(days=30)
+        self.record(num_records=100, bytes_in=2000, age=old)
+        self.record(num_records=50, parse_secs=3.0, total_secs=4.0, age=old)
+        self.record('.csv', status=RunningSession.STATUS_FAILED, age=old)
+        recent = self.record(num_records=10)
+        before = render_metrics()
+
+        self.assertEqual(roll_up_metrics(timezone.now() - datetime.timedelta(days=7)), 3)
+        self.assertEqual(list(ProcessingMetrics.objects.values_list('id', flat=True)), [recent.id])
+        self.assertEqual(ProcessingMetricsTotals.objects.count(), 2)
+        self.assertEqual(render_metrics(), before)
+
+        # Later roll-ups add to the totals
+        self.record(num_records=5, age=old)
+        self.assertEqual(roll_up_metrics(timezone.now() - datetime.timedelta(days=7)), 1)
+        totals = ProcessingMetricsTotals.objects.get(file_type='.fit')
+        self.assertEqual(totals.runs, 3)
+        self.assertEqual(totals.counters['records'], 155)
+        self.assertIn('session_processing_records_total{file_type=".fit"} 165', render_metrics().splitlines())
+        self.assertEqual(roll_up_metrics(timezone.now() - datetime.timedelta(days=7)), 0)
+
+    def test_roll_up_task_keeps_the_retention_window(self):
+        self.record(age=datetime.timedelta(days=3))
+        self.record(age=datetime.timedelta(days=1))
+        with override_settings(METRICS_RETENTION_DAYS=2):
+            self.assertEqual(tasks.roll_up_processing_metrics(), 1)
+        self.assertEqual(ProcessingMetrics.objects.count(), 1)
+        self.assertEqual(ProcessingMetricsTotals.objects.get().runs, 1)
+
+
+# ==============================================================================
+# PARSER BENCHMARKS
+# ==============================================================================
+
+class BenchmarkParsersTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        rows = ''.join(f'2024-05-01T06:00:{i:02d}Z,{120 + i}\n' for i in range(30))
+        with open(os.path.join(self.directory, 'a.csv'), 'w') as f:
+            f.write('timestamp,heart_rate\n' + rows)
+        with open(os.path.join(self.directory, 'b.csv'), 'w') as f:
+            f.write('not,a\nsession\n')
+        self.baseline = os.path.join(self.directory, 'baselines', 'parsers.json')
+
+    def benchmark(self, *args):
+        stdout = io.StringIO()
+        call_command('benchmark_parsers', self.directory, '--repeat', '1', '--baseline', self.baseline, *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_saves_a_baseline_and_compares_with_it(self):
+        self.assertIn("No baseline at", self.benchmark())
+        self.assertFalse(os.path.exists(self.baseline))
+
+        self.assertIn("Baseline saved to", self.benchmark('--save-baseline'))
+        with open(self.baseline) as f:
+            baseline = json.load(f)
+        self.assertEqual(baseline['parser_version'], PARSER_VERSION)
+        self.assertEqual(list(baseline['results']), ['.csv'])
+        results = baseline['results']['.csv']
+        # The file without a timestamp column is counted but not timed
+        self.assertEqual((results['files'], results['unreadable'], results['records']), (2, 1, 30))
+        self.assertGreater(results['parse_records_per_sec'], 0)
+
+        output = self.benchmark('--tolerance', '1000')
+        self.assertIn("Compared with the baseline", output)
+        self.assertIn(".csv  parse_records_per_sec", output)
+        self.assertNotIn("REGRESSION", output)
+
+    def test_regression_beyond_the_tolerance_fails(self):
+        self.benchmark('--save-baseline')
+        with open(self.baseline) as f:
+            baseline = json.load(f)
+        baseline['results']['.csv']['parse_records_per_sec'] *= 1000
+        with open(self.baseline, 'w') as f:
+            json.dump(baseline, f)
+
+        stdout = io.StringIO()
+        with self.assertRaisesMessage(CommandError, "regressed by more than 15%: .csv parse_records_per_sec"):
+            call_command('benchmark_parsers', self.directory, '--repeat', '1', '--baseline', self.baseline, stdout=stdout)
+        self.assertIn("REGRESSION", stdout.getvalue())
+
+    def test_formats_and_limit(self):
+        output = self.benchmark('--format', '.csv', '.fit', '--limit', '1')
+        self.assertIn("Benchmarking 1 .csv file(s)", output)
+        self.assertNotIn(".fit file(s)", output)
+
+    def test_nothing_to_benchmark(self):
+        with self.assertRaisesMessage(CommandError, "--repeat must be at least 1"):
+            self.benchmark('--repeat', '0')
+        with self.assertRaisesMessage(CommandError, "No session files found"):
+            self.benchmark('--format', '.fit')
+
+
+# ==============================================================================
+# TASK QUEUES
+# ==============================================================================
+
+class TaskRoutingTests(SimpleTestCase):
+    def queue(self, name, **options):
+        return celery_app.amqp.router.route(options, name, (), {})['queue'].name
+
+    def test_tasks_are_routed_to_their_queues(self):
+        self.assertEqual({name: self.queue(name) for name in celery_app.tasks if name.startswith('volunteers.')}, {
+            'volunteers.tasks.process_session_file': 'ingest',
+            'volunteers.tasks.finalize_upload_batch': 'bulk',
+            'volunteers.tasks.rescore_sessions': 'scoring',
+            'volunteers.tasks.roll_up_processing_metrics': 'bulk',
+            'volunteers.tasks.send_registration_notification': 'email',
+            'volunteers.tasks.send_registration_confirmation': 'email',
+        })
+        # Anything unrouted goes to the default queue
+        self.assertEqual(self.queue('volunteers.tasks.unknown'), 'ingest')
+
+    def test_batch_members_go_to_the_bulk_queue(self):
+        # As queued by dispatch_upload_batch
+        signature = process_session_file.s(1).set(queue=tasks.QUEUE_BULK)
+        self.assertEqual(self.queue(signature.task, **signature.options), 'bulk')
+
+    def test_worker_without_queues_consumes_every_queue(self):
+        # A worker started without -Q consumes every declared queue
+        self.assertEqual(sorted(celery_app.amqp.queues), ['bulk', 'email', 'ingest', 'scoring'])
+        for name in celery_app.amqp.queues:
+            queue = celery_app.amqp.queues[name]
+            self.assertEqual((queue.exchange.name, queue.routing_key), (name, name))
+
+    def test_periodic_tasks_exist(self):
+        for entry in settings.CELERY_BEAT_SCHEDULE.values():
+            self.assertIn(entry['task'], celery_app.tasks)
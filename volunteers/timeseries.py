@@ -0,0 +1,652 @@
+# backend/volunteers/timeseries.py
+
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# COLUMNAR TIME-SERIES CODEC
+# ==============================================================================
+# Parsers produce one dict per sample, which repeats every key thousands of
+# times when stored as JSON. This module stores the same data column by column:
+# timestamps become microsecond offsets from the session start, integer
+# channels are delta-encoded into the smallest integer type that fits, and
+# everything is packed into a single compressed NumPy archive. The original
+# list-of-dicts shape can always be rebuilt with ColumnarSeries.to_records().
+
+TIMESTAMP_KEY = 'timestamp'
+# Per-sample anomaly flag written by every parser. Labels are kept apart from
+# the samples in SessionLabels and overlaid onto this channel when read.
+LABEL_CHANNEL = 'Anomaly'
+
+# Renderers for the timestamp strings our parsers emit. The codec picks the one
+# that reproduces the original strings exactly, so labels keyed by timestamp
+# keep matching after a round trip.
+TIMESTAMP_FORMATS = {
+    'iso': ('s', '+00:00'),        # FIT: datetime.isoformat() on whole seconds
+    'iso_us': ('us', '+00:00'),    # FIT: datetime.isoformat() with microseconds
+    'csv': ('us', '+0000'),        # CSV: strftime('%Y-%m-%dT%H:%M:%S.%f%z')
+    'zulu': ('s', 'Z'),            # TCX: 2025-01-17T22:03:54Z
+    'zulu_ms': ('ms', 'Z'),        # TCX: 2025-01-17T22:03:54.000Z
+}
+
+KIND_INT = 'int'
+KIND_FLOAT = 'float'
+KIND_JSON = 'json'
+KIND_TIMESTAMP = 'timestamp'
+
+DOWNSAMPLE_LTTB = 'lttb'
+DOWNSAMPLE_MINMAX = 'minmax'
+DOWNSAMPLE_METHODS = (DOWNSAMPLE_LTTB, DOWNSAMPLE_MINMAX)
+
+_MAX_EXACT_INT = 2 ** 53
+
+
+def render_timestamps(epoch_us, fmt):
+    """Renders an int64 array of epoch microseconds as a list of strings."""
+    unit, suffix = TIMESTAMP_FORMATS[fmt]
+    text = np.datetime_as_string(epoch_us.astype('datetime64[us]'), unit=unit)
+    return [value + suffix for value in text.tolist()]
+
+
+def parse_timestamps(values):
+    """
+    Parses timestamp strings into an int64 array of UTC epoch microseconds.
+    Returns None if any value is missing or cannot be parsed.
+    """
+    if not values or any(not isinstance(value, str) for value in values):
+        return None
+    try:
+        parsed = pd.to_datetime(pd.Series(values), utc=True, format='ISO8601')
+    except (ValueError, TypeError, OverflowError):
+        return None
+    if parsed.isna().any():
+        return None
+    return parsed.dt.as_unit('us').astype('int64').to_numpy()
+
+
+def match_timestamps(time_us, timestamp_format, values):
+    """
+    Finds the samples whose rendered timestamp string equals one of ``values``.
+    Only the matched samples are rendered, so the Python work grows with the
+    number of requested timestamps rather than with the session length.
+
+    Returns ``(samples, requests)``: matched sample positions and, for each,
+    the position in ``values`` it matched.
+    """
+    empty = np.array([], dtype=np.int64)
+    if not len(values) or time_us is None or not len(time_us):
+        return empty, empty
+    strings = pd.Series([value if isinstance(value, str) else None for value in values], dtype=object)
+    parsed = pd.to_datetime(strings, utc=True, errors='coerce', format='ISO8601')
+    ok = parsed.notna().to_numpy()
+    wanted = parsed.dt.as_unit('us').array.asi8
+
+    order = None if (np.diff(time_us) >= 0).all() else np.argsort(time_us, kind='stable')
+    ordered = time_us if order is None else time_us[order]
+    left = np.searchsorted(ordered, wanted, side='left')
+    counts = np.where(ok, np.searchsorted(ordered, wanted, side='right') - left, 0)
+    total = int(counts.sum())
+    if not total:
+        return empty, empty
+
+    # Expand every [left, right) run so repeated timestamps all match
+    requests = np.repeat(np.arange(len(values)), counts)
+    run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+    positions = np.repeat(left, counts) + (np.arange(total) - run_starts)
+    samples = positions if order is None else order[positions]
+
+    # The old endpoints compared strings, so a different spelling of the same
+    # instant must not match
+    rendered = render_timestamps(time_us[samples], timestamp_format)
+    keep = np.fromiter(
+        (text == values[i] for text, i in zip(rendered, requests.tolist())), dtype=bool, count=total
+    )
+    return samples[keep], requests[keep]
+
+
+def _detect_timestamp_format(values, epoch_us):
+    for fmt in TIMESTAMP_FORMATS:
+        if render_timestamps(epoch_us, fmt) == values:
+            return fmt
+    return None
+
+
+def _classify(values):
+    """
+    Picks the most compact lossless kind for a list of JSON scalars. Channels
+    mixing ints and floats would lose that distinction in a numeric array, so
+    they are stored verbatim as JSON instead.
+    """
+    has_int = has_float = False
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            return KIND_JSON
+        if isinstance(value, int):
+            if abs(value) >= _MAX_EXACT_INT:
+                return KIND_JSON
+            has_int = True
+        elif isinstance(value, float):
+            has_float = True
+        else:
+            return KIND_JSON
+    if has_int and has_float:
+        return KIND_JSON
+    return KIND_FLOAT if has_float else KIND_INT
+
+
+def _smallest_int_dtype(values):
+    if values.size == 0:
+        return np.int8
+    low, high = int(values.min()), int(values.max())
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+
+def unpack_flags(bitmap, count):
+    """
+    Unpacks np.packbits() bytes into ``count`` bools, padding a shorter bitmap
+    with False. np.unpackbits(count=...) leaves such padding uninitialized.
+    """
+    flags = np.unpackbits(np.frombuffer(bytes(bitmap), dtype=np.uint8))[:count].astype(bool)
+    if len(flags) < count:
+        flags = np.concatenate([flags, np.zeros(count - len(flags), dtype=bool)])
+    return flags
+
+
+def lttb_indices(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets: picks ``max_points`` sample indices that
+    keep the visual shape of y(x). The first and last samples always survive.
+    """
+    length = len(y)
+    if max_points >= length:
+        return np.arange(length)
+    if max_points < 3:
+        return np.linspace(0, length - 1, max_points).round().astype(np.int64)
+
+    # Missing values would poison the triangle areas; flatten them to the mean
+    y = np.nan_to_num(y, nan=np.nanmean(y) if np.isfinite(y).any() else 0.0)
+    edges = np.linspace(1, length - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, length - 1
+    previous = 0
+    for i in range(max_points - 2):
+        low, high = edges[i], edges[i + 1]
+        next_high = edges[i + 2] if i + 2 < len(edges) else length
+        avg_x, avg_y = x[high:next_high].mean(), y[high:next_high].mean()
+        area = np.abs(
+            (x[previous] - avg_x) * (y[low:high] - y[previous])
+            - (x[previous] - x[low:high]) * (avg_y - y[previous])
+        )
+        previous = low + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def minmax_indices(y, max_points):
+    """
+    Min/max bucketing: keeps the lowest and highest sample of each of
+    ``max_points // 2`` equal buckets, so short spikes are never dropped.
+    """
+    length = len(y)
+    if max_points >= length:
+        return np.arange(length)
+    buckets = max(max_points // 2, 1)
+    edges = np.linspace(0, length, buckets + 1).astype(np.int64)
+    low_y = np.where(np.isnan(y), np.inf, y)
+    high_y = np.where(np.isnan(y), -np.inf, y)
+    selected = []
+    for low, high in zip(edges[:-1], edges[1:]):
+        if high > low:
+            selected.append(low + int(np.argmin(low_y[low:high])))
+            selected.append(low + int(np.argmax(high_y[low:high])))
+    return np.unique(selected)
+
+
+class Column:
+    """
+    A single channel of a ColumnarSeries.
+
+    ``values`` is a NumPy array for numeric and timestamp kinds, and a plain
+    list for JSON kinds. ``valid`` marks non-null samples and ``present`` marks
+    samples whose record actually contained the key; either is None when it
+    would be all True.
+    """
+
+    def __init__(self, kind, values, valid=None, present=None):
+        self.kind = kind
+        self.values = values
+        self.valid = valid
+        self.present = present
+
+    def to_list(self, timestamp_format=None):
+        """Returns the column as JSON-ready Python values (None for nulls)."""
+        if self.kind == KIND_JSON:
+            return list(self.values)
+        if self.kind == KIND_TIMESTAMP:
+            items = render_timestamps(self.values, timestamp_format)
+        else:
+            items = self.values.tolist()
+        if self.kind == KIND_FLOAT:
+            return [None if value != value else value for value in items]
+        if self.valid is not None:
+            return [value if ok else None for value, ok in zip(items, self.valid.tolist())]
+        return items
+
+    def as_float(self):
+        """Returns numeric values as float64 with NaN for nulls."""
+        if self.kind == KIND_FLOAT:
+            return self.values
+        if self.kind == KIND_INT:
+            values = self.values.astype(np.float64)
+            if self.valid is not None:
+                values[~self.valid] = np.nan
+            return values
+        return np.array(
+            [value if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+             for value in self.values],
+            dtype=np.float64,
+        )
+
+    def take(self, index):
+        """Returns a new Column restricted to the given index array or slice."""
+        if not isinstance(self.values, list):
+            values = self.values[index]
+        elif isinstance(index, slice):
+            values = self.values[index]
+        else:
+            values = [self.values[i] for i in index]
+        valid = self.valid[index] if self.valid is not None else None
+        present = self.present[index] if self.present is not None else None
+        return Column(self.kind, values, valid, present)
+
+
+class ColumnarSeries:
+    """
+    In-memory columnar representation of a session's time-series data.
+
+    ``time_us`` holds the UTC epoch microseconds of every sample, or None if
+    the samples do not carry parseable timestamps.
+    """
+
+    def __init__(self, length, columns, time_us=None, timestamp_format=None):
+        self.length = length
+        self.columns = columns
+        self.time_us = time_us
+        self.timestamp_format = timestamp_format
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def channels(self):
+        return list(self.columns)
+
+    @property
+    def start_us(self):
+        if self.time_us is None or self.length == 0:
+            return None
+        return int(self.time_us[0])
+
+    def start_datetime(self):
+        """Returns the first sample's time as an aware UTC datetime, or None."""
+        if self.start_us is None:
+            return None
+        return pd.Timestamp(self.start_us, unit='us', tz='UTC').to_pydatetime()
+
+    def offsets_seconds(self):
+        """Returns seconds elapsed since the first sample, or None."""
+        if self.time_us is None or self.length == 0:
+            return None
+        return (self.time_us - self.time_us[0]) / 1e6
+
+    def column(self, name):
+        return self.columns.get(name)
+
+    # --------------------------------------------------------------------------
+    # Construction
+    # --------------------------------------------------------------------------
+
+    @classmethod
+    def from_records(cls, records):
+        """Builds a columnar series from a list of per-sample dicts."""
+        records = records or []
+        length = len(records)
+        names = {}
+        for record in records:
+            for key in record:
+                names.setdefault(key, None)
+
+        columns = {}
+        time_us = None
+        timestamp_format = None
+        for name in names:
+            present = np.fromiter((name in record for record in records), dtype=bool, count=length)
+            values = [record.get(name) for record in records]
+            present_mask = None if present.all() else present
+
+            if name == TIMESTAMP_KEY and present_mask is None:
+                time_us = parse_timestamps(values)
+                if time_us is not None:
+                    timestamp_format = _detect_timestamp_format(values, time_us)
+                    if timestamp_format is not None:
+                        columns[name] = Column(KIND_TIMESTAMP, time_us)
+                        continue
+
+            kind = _classify(values)
+            if kind == KIND_JSON:
+                columns[name] = Column(KIND_JSON, values, present=present_mask)
+                continue
+
+            valid = np.fromiter((value is not None for value in values), dtype=bool, count=length)
+            if kind == KIND_FLOAT:
+                array = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+                columns[name] = Column(KIND_FLOAT, array, present=present_mask)
+            else:
+                array = np.array([0 if value is None else value for value in values], dtype=np.int64)
+                columns[name] = Column(KIND_INT, array, None if valid.all() else valid, present_mask)
+
+        return cls(length, columns, time_us, timestamp_format)
+
+    def to_records(self):
+        """Rebuilds the original list-of-dicts representation."""
+        names = list(self.columns)
+        lists = [self.columns[name].to_list(self.timestamp_format) for name in names]
+        if all(self.columns[name].present is None for name in names):
+            return [dict(zip(names, row)) for row in zip(*lists)] if names else [{} for _ in range(self.length)]
+
+        presents = [
+            self.columns[name].present.tolist() if self.columns[name].present is not None else None
+            for name in names
+        ]
+        records = []
+        for i in range(self.length):
+            record = {}
+            for name, items, present in zip(names, lists, presents):
+                if present is None or present[i]:
+                    record[name] = items[i]
+            records.append(record)
+        return records
+
+    def to_arrow(self):
+        """
+        Returns the series as a pyarrow RecordBatch with a typed column per
+        channel: UTC timestamps, the smallest fitting integer type, float64, and
+        JSON text for anything else. Nulls and absent keys both become nulls.
+        """
+        # pyarrow is imported lazily: only the binary API format needs it
+        import pyarrow as pa
+
+        arrays = []
+        for column in self.columns.values():
+            missing = np.zeros(self.length, dtype=bool)
+            if column.valid is not None:
+                missing |= ~column.valid
+            if column.present is not None:
+                missing |= ~column.present
+            if column.kind == KIND_TIMESTAMP:
+                array = pa.array(column.values, type=pa.timestamp('us', tz='UTC'), mask=missing)
+            elif column.kind == KIND_INT:
+                array = pa.array(column.values.astype(_smallest_int_dtype(column.values)), mask=missing)
+            elif column.kind == KIND_FLOAT:
+                array = pa.array(column.values, mask=missing | np.isnan(column.values))
+            else:
+                text = [
+                    None if skip or value is None else json.dumps(value)
+                    for value, skip in zip(column.values, missing.tolist())
+                ]
+                array = pa.array(text, type=pa.string())
+            arrays.append(array)
+        return pa.RecordBatch.from_arrays(arrays, names=list(self.columns))
+
+    def take(self, index):
+        """Returns a new series restricted to an index array or slice."""
+        columns = {name: column.take(index) for name, column in self.columns.items()}
+        time_us = self.time_us[index] if self.time_us is not None else None
+        length = np.arange(self.length)[index].size
+        return ColumnarSeries(length, columns, time_us, self.timestamp_format)
+
+    # --------------------------------------------------------------------------
+    # Windowing
+    # --------------------------------------------------------------------------
+
+    def select(self, names):
+        """Keeps only the named channels (plus timestamps); unknown names are ignored."""
+        wanted = set(names) | {TIMESTAMP_KEY}
+        columns = {name: column for name, column in self.columns.items() if name in wanted}
+        return ColumnarSeries(self.length, columns, self.time_us, self.timestamp_format)
+
+    def between(self, start_us=None, end_us=None):
+        """
+        Keeps samples whose time lies within [start_us, end_us]. Series without
+        parseable timestamps are returned unchanged.
+        """
+        if self.time_us is None or (start_us is None and end_us is None):
+            return self
+        mask = np.ones(self.length, dtype=bool)
+        if start_us is not None:
+            mask &= self.time_us >= start_us
+        if end_us is not None:
+            mask &= self.time_us <= end_us
+        return self.take(np.flatnonzero(mask))
+
+    def downsample(self, max_points, method=DOWNSAMPLE_LTTB, channel=None):
+        """
+        Reduces the series to about ``max_points`` samples chosen on one numeric
+        channel (heart rate by default) by LTTB or min/max bucketing.
+        """
+        if max_points is None or self.length <= max_points:
+            return self
+        if channel not in self.columns or self.columns[channel].kind not in (KIND_INT, KIND_FLOAT):
+            numeric = [name for name, column in self.columns.items() if column.kind in (KIND_INT, KIND_FLOAT)]
+            channel = 'heart_rate' if 'heart_rate' in numeric else (numeric[0] if numeric else None)
+        if channel is None:
+            index = np.linspace(0, self.length - 1, max_points).round().astype(np.int64)
+            return self.take(index)
+
+        y = self.columns[channel].as_float()
+        if method == DOWNSAMPLE_MINMAX:
+            index = minmax_indices(y, max_points)
+        else:
+            x = self.offsets_seconds()
+            index = lttb_indices(x if x is not None else np.arange(self.length, dtype=np.float64), y, max_points)
+        return self.take(index)
+
+    # --------------------------------------------------------------------------
+    # Binary encoding
+    # --------------------------------------------------------------------------
+
+    def encode(self):
+        """
+        Returns ``(schema, blob)``: a JSON-serializable description of the
+        channels and the compressed ``.npz`` archive holding their values.
+        """
+        arrays = {}
+        schema = {
+            'version': 1,
+            'length': self.length,
+            'start_us': self.start_us,
+            'timestamp_format': self.timestamp_format,
+            'channels': [],
+        }
+        if self.time_us is not None and self.length:
+            offsets = self.time_us - self.time_us[0]
+            arrays['time'] = np.diff(offsets, prepend=0)
+
+        for i, (name, column) in enumerate(self.columns.items()):
+            entry = {'name': name, 'kind': column.kind}
+            prefix = f'c{i}'
+            if column.kind == KIND_INT:
+                values = column.values
+                if column.valid is not None:
+                    # Carry the last valid value through nulls so deltas stay small.
+                    values = pd.Series(np.where(column.valid, values, np.nan)).ffill().fillna(0).to_numpy(np.int64)
+                deltas = np.diff(values, prepend=0)
+                arrays[f'{prefix}_v'] = deltas.astype(_smallest_int_dtype(deltas))
+            elif column.kind == KIND_FLOAT:
+                arrays[f'{prefix}_v'] = column.values
+            elif column.kind == KIND_JSON:
+                arrays[f'{prefix}_v'] = np.frombuffer(json.dumps(column.values).encode('utf-8'), dtype=np.uint8)
+            if column.valid is not None:
+                arrays[f'{prefix}_n'] = np.packbits(column.valid)
+            if column.present is not None:
+                arrays[f'{prefix}_p'] = np.packbits(column.present)
+            schema['channels'].append(entry)
+
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return schema, buffer.getvalue()
+
+    @staticmethod
+    def decode_time(schema, blob):
+        """
+        Decodes only the sample times (UTC epoch microseconds) without
+        decompressing any channel. Returns None for series without them.
+        """
+        with np.load(io.BytesIO(bytes(blob)), allow_pickle=False) as archive:
+            if 'time' not in archive.files:
+                return None
+            return np.cumsum(archive['time'].astype(np.int64)) + schema['start_us']
+
+    @classmethod
+    def decode(cls, schema, blob, channels=None):
+        """
+        Inverse of encode(). With ``channels``, only those channels are
+        decompressed; the others are left out of the returned series.
+        """
+        length = schema['length']
+        wanted = None
+        if channels is not None:
+            wanted = {'time'} | {
+                f'c{i}_{part}'
+                for i, entry in enumerate(schema['channels']) if entry['name'] in channels
+                for part in 'vnp'
+            }
+        with np.load(io.BytesIO(bytes(blob)), allow_pickle=False) as archive:
+            arrays = {key: archive[key] for key in archive.files if wanted is None or key in wanted}
+
+        time_us = None
+        if 'time' in arrays:
+            time_us = np.cumsum(arrays['time'].astype(np.int64)) + schema['start_us']
+
+        columns = {}
+        for i, entry in enumerate(schema['channels']):
+            if channels is not None and entry['name'] not in channels:
+                continue
+            prefix = f'c{i}'
+            kind = entry['kind']
+            valid = unpack_flags(arrays[f'{prefix}_n'], length) if f'{prefix}_n' in arrays else None
+            present = unpack_flags(arrays[f'{prefix}_p'], length) if f'{prefix}_p' in arrays else None
+            if kind == KIND_TIMESTAMP:
+                values = time_us
+            elif kind == KIND_INT:
+                values = np.cumsum(arrays[f'{prefix}_v'].astype(np.int64))
+            elif kind == KIND_FLOAT:
+                values = arrays[f'{prefix}_v']
+            else:
+                values = json.loads(arrays[f'{prefix}_v'].tobytes().decode('utf-8'))
+            columns[entry['name']] = Column(kind, values, valid, present)
+
+        return cls(length, columns, time_us, schema.get('timestamp_format'))
+
+
+# ==============================================================================
+# DOWNSAMPLE PYRAMID
+# ==============================================================================
+# Fixed-width time buckets holding the min, max and mean of every numeric
+# channel. Overview charts read a small precomputed level instead of decoding
+# and scanning the full series.
+
+PYRAMID_RESOLUTIONS = (1, 5, 30, 300)
+LEVEL_STATS = ('min', 'max', 'mean')
+
+
+def build_level(series, resolution_secs):
+    """
+    Buckets a series into ``resolution_secs`` wide time buckets. Returns
+    ``(schema, blob)``, or None if the series has no parseable timestamps or
+    the level would not be meaningfully smaller than the raw samples.
+    """
+    offsets = series.offsets_seconds()
+    if offsets is None:
+        return None
+    bucket = np.floor_divide(offsets, resolution_secs).astype(np.int64)
+    order = None if (np.diff(bucket) >= 0).all() else np.argsort(bucket, kind='stable')
+    if order is not None:
+        bucket = bucket[order]
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    buckets = bucket[starts]
+    if len(buckets) * 2 > series.length:
+        return None
+    # Labels change without the samples changing, so they stay out of the pyramid
+    channels = [
+        name for name, column in series.columns.items()
+        if column.kind in (KIND_INT, KIND_FLOAT) and name != LABEL_CHANNEL
+    ]
+
+    arrays = {'bucket': buckets}
+    if channels:
+        values = np.column_stack([series.columns[name].as_float() for name in channels])
+        if order is not None:
+            values = values[order]
+        # One reduceat per statistic over all channels; fmin/fmax skip NaNs
+        finite = ~np.isnan(values)
+        counts = np.add.reduceat(finite, starts, axis=0)
+        sums = np.add.reduceat(np.where(finite, values, 0.0), starts, axis=0)
+        # One (buckets x channels) array per statistic keeps the archive small
+        arrays['min'] = np.fmin.reduceat(values, starts, axis=0)
+        arrays['max'] = np.fmax.reduceat(values, starts, axis=0)
+        arrays['mean'] = np.divide(sums, counts, out=np.full(sums.shape, np.nan), where=counts > 0)
+    schema = {
+        'version': 2,
+        'resolution_secs': resolution_secs,
+        'num_buckets': len(buckets),
+        'start_us': series.start_us,
+        'channels': channels,
+    }
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return schema, buffer.getvalue()
+
+
+def build_pyramid(series, resolutions=PYRAMID_RESOLUTIONS):
+    """Returns ``{resolution_secs: (schema, blob)}`` for every useful level."""
+    levels = {}
+    for resolution_secs in resolutions:
+        level = build_level(series, resolution_secs)
+        if level is not None:
+            levels[resolution_secs] = level
+    return levels
+
+
+def decode_level(schema, blob, fields=None):
+    """
+    Decodes a pyramid level into JSON-ready columns: bucket start offsets in
+    seconds from ``start_time`` plus min/max/mean lists per channel (None
+    where a bucket had no values).
+    """
+    with np.load(io.BytesIO(bytes(blob)), allow_pickle=False) as archive:
+        arrays = {key: archive[key] for key in archive.files}
+    channels = {}
+    for i, name in enumerate(schema['channels']):
+        if (fields and name not in fields) or name == LABEL_CHANNEL:
+            continue
+        channels[name] = {}
+        for stat in LEVEL_STATS:
+            channels[name][stat] = [None if value != value else value for value in arrays[stat][:, i].tolist()]
+    start_us = schema.get('start_us')
+    return {
+        'resolution_secs': schema['resolution_secs'],
+        'start_time': pd.Timestamp(start_us, unit='us', tz='UTC').isoformat() if start_us is not None else None,
+        'offsets': (arrays['bucket'] * schema['resolution_secs']).tolist(),
+        'channels': channels,
+    }
+
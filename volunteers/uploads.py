@@ -0,0 +1,210 @@
+# backend/volunteers/uploads.py
+
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+try:
+    from storages.backends.s3 import S3Storage
+    from storages.utils import clean_name
+except ImportError:  # Optional: only needed when media files live on S3
+    S3Storage = None
+
+# ==============================================================================
+# DIRECT UPLOADS
+# ==============================================================================
+# Session files are uploaded in parts straight to storage instead of through
+# a web worker (see SessionUploadViewSet):
+#
+#   1. POST /api/uploads/ with the file's name and size. The response lists
+#      every part with its size and the URL to PUT its bytes to.
+#   2. PUT each part, in any order and in parallel if you like.
+#   3. POST /api/uploads/<id>/complete/. The parts are assembled into the
+#      session file, and the session is created and queued for processing.
+#
+# An interrupted upload is resumed by GETting it again: parts that were
+# received are marked as such, the others get fresh URLs.
+#
+# With S3 the URLs are presigned UploadPart URLs of an S3 multipart upload
+# and the bytes never reach the API. The bucket's CORS rules must allow PUT
+# from the frontend and expose the ETag header. With any other storage
+# (FileSystemStorage in development) the URLs point back at the API, which
+# keeps each part as its own file until the upload is completed. These URLs
+# carry a signature just like presigned ones, so clients treat both the same.
+
+# S3 limits: every part but the last must be at least 5 MiB, and there can
+# be at most 10,000 of them
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+
+PART_SIGNATURE_SALT = 'volunteers.uploads.part'
+
+
+def part_size_for(file_size):
+    """The part size to upload a file of ``file_size`` bytes with."""
+    part_size = max(settings.SESSION_UPLOAD_PART_SIZE, MIN_PART_SIZE)
+    return max(part_size, -(-file_size // MAX_PARTS))
+
+
+def check_parts(upload, received):
+    """
+    Raises ValueError unless ``received`` (part number -> size) holds every
+    part of the upload at its expected size.
+    """
+    missing = [number for number, size in upload.part_sizes() if received.get(number) != size]
+    if missing:
+        shown = ', '.join(str(number) for number in missing[:20])
+        raise ValueError(f"{len(missing)} of {upload.part_count} parts are missing or incomplete: {shown}")
+
+
+def is_assembled(storage, upload):
+    """
+    Whether the upload's file is already stored in full: its parts were
+    assembled by an earlier completion that failed afterwards.
+    """
+    return storage.exists(upload.storage_name) and storage.size(upload.storage_name) == upload.file_size
+
+
+class S3MultipartUploads:
+    """Uploads through S3 multipart uploads, with presigned part URLs."""
+    direct = True
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.client = storage.bucket.meta.client
+        self.bucket_name = storage.bucket_name
+
+    def _key(self, upload):
+        return self.storage._normalize_name(clean_name(upload.storage_name))
+
+    def start(self, upload):
+        params = self.storage.get_object_parameters(upload.storage_name)
+        params.setdefault('ContentType', 'application/octet-stream')
+        response = self.client.create_multipart_upload(Bucket=self.bucket_name, Key=self._key(upload), **params)
+        upload.multipart_id = response['UploadId']
+
+    def part_url(self, upload, part_number, request):
+        return self.client.generate_presigned_url(
+            'upload_part',
+            Params={
+                'Bucket': self.bucket_name,
+                'Key': self._key(upload),
+                'UploadId': upload.multipart_id,
+                'PartNumber': part_number,
+            },
+            ExpiresIn=settings.SESSION_UPLOAD_URL_EXPIRY,
+        )
+
+    def _list_parts(self, upload):
+        paginator = self.client.get_paginator('list_parts')
+        pages = paginator.paginate(Bucket=self.bucket_name, Key=self._key(upload), UploadId=upload.multipart_id)
+        for page in pages:
+            yield from page.get('Parts', [])
+
+    def received_parts(self, upload):
+        return {part['PartNumber']: part['Size'] for part in self._list_parts(upload)}
+
+    def complete(self, upload):
+        """Assembles the parts into the stored file and returns its name."""
+        try:
+            parts = {part['PartNumber']: part for part in self._list_parts(upload)}
+        except self.client.exceptions.NoSuchUpload:
+            if is_assembled(self.storage, upload):
+                return upload.storage_name
+            raise ValueError("The upload was aborted or has expired; start a new one.")
+        check_parts(upload, {number: part['Size'] for number, part in parts.items()})
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self._key(upload),
+            UploadId=upload.multipart_id,
+            MultipartUpload={
+                'Parts': [{'PartNumber': number, 'ETag': parts[number]['ETag']} for number in range(1, upload.part_count + 1)],
+            },
+        )
+        return upload.storage_name
+
+    def abort(self, upload):
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=self._key(upload), UploadId=upload.multipart_id)
+        except self.client.exceptions.NoSuchUpload:
+            pass
+
+
+class ChunkedUploads:
+    """
+    Uploads to storages without multipart support: the parts are PUT to the
+    API and stored as separate files until the upload is completed.
+    """
+    direct = False
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def _part_dir(self, upload):
+        return f'upload_parts/{upload.id}'
+
+    def _part_name(self, upload, part_number):
+        return f'{self._part_dir(upload)}/{part_number:05d}'
+
+    def start(self, upload):
+        upload.multipart_id = None
+
+    def part_url(self, upload, part_number, request):
+        signature = signing.dumps([str(upload.id), part_number], salt=PART_SIGNATURE_SALT)
+        path = reverse('session-upload-part', args=[upload.id, part_number])
+        return request.build_absolute_uri(f'{path}?signature={signature}')
+
+    @staticmethod
+    def check_signature(upload, part_number, signature):
+        """Whether ``signature`` is a valid, unexpired one for this part's URL."""
+        try:
+            signed = signing.loads(signature, salt=PART_SIGNATURE_SALT, max_age=settings.SESSION_UPLOAD_URL_EXPIRY)
+        except signing.BadSignature:
+            return False
+        return signed == [str(upload.id), part_number]
+
+    def receive_part(self, upload, part_number, stream):
+        """Stores one part, read from ``stream``, replacing an earlier attempt."""
+        name = self._part_name(upload, part_number)
+        self.storage.delete(name)
+        self.storage.save(name, File(stream, name=name))
+
+    def received_parts(self, upload):
+        try:
+            _, names = self.storage.listdir(self._part_dir(upload))
+        except FileNotFoundError:
+            return {}
+        return {
+            int(name): self.storage.size(f'{self._part_dir(upload)}/{name}')
+            for name in names if name.isdigit()
+        }
+
+    def complete(self, upload):
+        """Assembles the parts into the stored file and returns its name."""
+        received = self.received_parts(upload)
+        if not received and is_assembled(self.storage, upload):
+            return upload.storage_name
+        check_parts(upload, received)
+        with tempfile.TemporaryFile() as assembled:
+            for number in range(1, upload.part_count + 1):
+                with self.storage.open(self._part_name(upload, number), 'rb') as part:
+                    shutil.copyfileobj(part, assembled)
+            name = self.storage.save(upload.storage_name, File(assembled, name=upload.storage_name))
+        self.abort(upload)
+        return name
+
+    def abort(self, upload):
+        for number in self.received_parts(upload):
+            self.storage.delete(self._part_name(upload, number))
+
+
+def upload_backend(storage=default_storage):
+    """The direct upload implementation for ``storage``."""
+    if S3Storage is not None and isinstance(storage, S3Storage):
+        return S3MultipartUploads(storage)
+    return ChunkedUploads(storage)
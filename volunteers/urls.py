@@ -5,7 +5,12 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     VolunteerViewSet,
     RunningSessionViewSet,
+    UploadBatchViewSet,
+    ScoringRunViewSet,
+    SessionUploadViewSet,
     EmailCheckView,
+    SessionAnalyticsView,
+    MetricsView,
     SessionLabelUpdateView
     # The incorrect import of 'update_session_anomalies' has been removed
 )
@@ -14,11 +19,20 @@ from .views import (
 router = DefaultRouter()
 router.register(r'volunteers', VolunteerViewSet, basename='volunteer')
 router.register(r'sessions', RunningSessionViewSet, basename='session')
+router.register(r'batches', UploadBatchViewSet, basename='batch')
+router.register(r'scoring-runs', ScoringRunViewSet, basename='scoring-run')
+router.register(r'uploads', SessionUploadViewSet, basename='session-upload')
 
 # The API URLs are a combination of the router's URLs and any custom paths.
 urlpatterns = [
     # Custom path for checking email
     path('check-email/', EmailCheckView.as_view(), name='check-email'),
+
+    # Cohort statistics across volunteers, devices, labels and dates
+    path('analytics/sessions/', SessionAnalyticsView.as_view(), name='session-analytics'),
+
+    # Session processing metrics for Prometheus
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     
     # This path is for updating the overall session label
     path('sessions/<int:pk>/update-label/', SessionLabelUpdateView.as_view(), name='session-update-label'),
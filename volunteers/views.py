@@ -1,18 +1,21 @@
 # backend/volunteers/views.py
 
 import io
+import logging
+import uuid
 import pandas as pd
 import numpy as np
-from django.shortcuts import render
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.shortcuts import render, get_object_or_404
+from django.http import StreamingHttpResponse
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Upper
+from django.utils import timezone
 
-from rest_framework import viewsets, permissions, status, generics
+from rest_framework import viewsets, permissions, status, generics, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -21,18 +24,39 @@ from rest_framework.authtoken.models import Token
 # --- 1. IMPORT JSONParser ---
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.filters import OrderingFilter
+from rest_framework.settings import api_settings
 
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Volunteer, RunningSession
+from .models import (
+    Volunteer, RunningSession, ScoringRun, SessionAnomalyScores, SessionTimeseriesLevel, SessionUpload, UploadBatch,
+)
 from .serializers import (
     VolunteerSerializer,
     EmailCheckSerializer,
     RunningSessionSerializer,
+    RunningSessionListSerializer,
     SessionLabelUpdateSerializer,
-    RecordLabelUpdateSerializer
+    RecordLabelUpdateSerializer,
+    TimeseriesQuerySerializer,
+    UploadBatchSerializer,
+    UploadBatchCreateSerializer,
+    ScoringRunSerializer,
+    SessionExportSerializer,
+    SessionAnalyticsSerializer,
+    SessionUploadSerializer,
 )
-from .tasks import process_session_file
-from .pagination import CustomPageNumberPagination
+from .analytics import cohort_report
+from .caching import cached_response, invalidate_sessions
+from .compression import compress_response
+from .export import EXPORT_FORMATS, iter_export
+from .tasks import process_session_file, dispatch_upload_batch, queue_registration_emails, rescore_sessions
+from .utils import compute_content_hash
+from .pagination import CustomPageNumberPagination, SessionCursorPagination
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, HasMetricsToken, render_metrics
+from .renderers import PrometheusTextRenderer, SessionArrowRenderer
+from .uploads import part_size_for, upload_backend
+
+logger = logging.getLogger(__name__)
 
 
 def backend_homepage_view(request):
@@ -62,22 +86,85 @@ class EmailCheckView(APIView):
         serializer = EmailCheckSerializer(data=request.data)
         if serializer.is_valid():
             email = serializer.validated_data['email']
-            is_taken = Volunteer.objects.filter(email__iexact=email).exists()
+            # Same as email__iexact, but written so volunteer_email_upper_idx is used
+            is_taken = Volunteer.objects.alias(email_upper=Upper('email')).filter(email_upper=Upper(Value(email))).exists()
             return Response({'is_taken': is_taken})
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class SessionAnalyticsView(APIView):
+    """
+    Cohort statistics of the filtered sessions, grouped by any of volunteer,
+    smartwatch, platform, gender, labels, source and day/week/month. Computed
+    with SQL aggregates over SessionStatistics; no series is decoded.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        options = SessionAnalyticsSerializer(data=request.query_params.dict())
+        options.is_valid(raise_exception=True)
+        group_by = options.validated_data['group_by']
+        results = cohort_report(options.filter(RunningSession.objects.all()), group_by)
+        return Response({'group_by': group_by, 'results': results})
+
+
+class MetricsView(APIView):
+    """
+    Session processing metrics in the Prometheus text format (see
+    metrics.py), for admins or a scraper sending the METRICS_TOKEN.
+    """
+    permission_classes = [permissions.IsAdminUser | HasMetricsToken]
+    renderer_classes = [PrometheusTextRenderer]
+
+    def get(self, request, *args, **kwargs):
+        return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+
 class SessionLabelUpdateView(generics.UpdateAPIView):
     queryset = RunningSession.objects.all()
     serializer_class = SessionLabelUpdateSerializer
     permission_classes = [permissions.IsAdminUser]
 
 
+def hash_uploaded_file(uploaded_file):
+    """
+    Returns ``(content_hash, file)`` for a newly uploaded session file. With
+    DEDUPLICATE_SESSION_FILES enabled, an upload whose bytes are already stored
+    reuses the existing file name instead of writing another copy.
+    """
+    if not hasattr(uploaded_file, 'chunks'):
+        # Not an upload (e.g. a plain name sent as JSON); hashed later by the task
+        return None, uploaded_file
+    content_hash = compute_content_hash(uploaded_file)
+    if settings.DEDUPLICATE_SESSION_FILES:
+        existing = (
+            RunningSession.objects.filter(content_hash=content_hash)
+            .exclude(session_file='').exclude(session_file=None)
+            .values_list('session_file', flat=True).first()
+        )
+        if existing:
+            return content_hash, existing
+    return content_hash, uploaded_file
+
+
+def delete_stored_files(names):
+    """Deletes session files saved for rows that were rolled back; failures are only logged."""
+    storage = RunningSession._meta.get_field('session_file').storage
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception as e:
+            logger.warning(f"Could not delete orphaned session file {name}: {e}")
+
+
 class RunningSessionViewSet(viewsets.ModelViewSet):
     serializer_class = RunningSessionSerializer
     permission_classes = [permissions.IsAdminUser]
     # --- 2. ADD JSONParser TO THE LIST OF PARSERS ---
     parser_classes = [MultiPartParser, FormParser, JSONParser]
+    # Session detail is also available as an Arrow IPC stream with typed
+    # columns (Accept: application/vnd.apache.arrow.stream or ?format=arrow)
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, SessionArrowRenderer]
     pagination_class = CustomPageNumberPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     ordering_fields = [
@@ -89,39 +176,174 @@ class RunningSessionViewSet(viewsets.ModelViewSet):
     ]
 
     def get_queryset(self):
-        queryset = RunningSession.objects.all().select_related('volunteer')
+        queryset = RunningSession.objects.all()
         volunteer_id = self.request.query_params.get('volunteer')
         if volunteer_id is not None:
             queryset = queryset.filter(volunteer_id=volunteer_id)
-        
+
         if self.action == 'list':
-            queryset = queryset.defer('timeseries_data')
-            
-        return queryset
+            # Summary columns and volunteer names only, as plain dicts
+            return queryset.values(
+                *RunningSessionListSerializer.MODEL_FIELDS,
+                volunteer_first_name=F('volunteer__first_name'),
+                volunteer_last_name=F('volunteer__last_name'),
+            ).order_by('-session_date', '-id')
+        # The columnar time-series lives in its own table; join it up front so
+        # serializing timeseries_data doesn't cost extra queries.
+        return queryset.select_related('volunteer', 'timeseries', 'labels')
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return RunningSessionListSerializer
+        return super().get_serializer_class()
+
+    def get_parsers(self):
+        # Without proxied uploads, file bodies are refused (415) before they are read
+        parsers = super().get_parsers()
+        if settings.PROXIED_SESSION_UPLOADS:
+            return parsers
+        return [parser for parser in parsers if not isinstance(parser, (MultiPartParser, FormParser))]
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action != 'retrieve':
+            renderers = [renderer for renderer in renderers if not isinstance(renderer, SessionArrowRenderer)]
+        return renderers
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # gzip or brotli, as the client's Accept-Encoding allows
+        response = super().finalize_response(request, response, *args, **kwargs)
+        return compress_response(request, response)
+
+    # Reads are served from the response cache; see caching.py
+    def list(self, request, *args, **kwargs):
+        build = lambda: super(RunningSessionViewSet, self).list(request, *args, **kwargs)
+        return cached_response(request, ['sessions', 'volunteers'], build)
+
+    def retrieve(self, request, *args, **kwargs):
+        build = lambda: super(RunningSessionViewSet, self).retrieve(request, *args, **kwargs)
+        return cached_response(request, [f"session:{kwargs['pk']}", 'volunteers'], build)
+
+    @property
+    def paginator(self):
+        """
+        ?pagination=cursor switches the list to keyset pagination; the next and
+        previous links carry the ?cursor= to follow.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if self.action == 'list' and ('cursor' in params or params.get('pagination') == 'cursor'):
+                self._paginator = SessionCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'retrieve':
+            # ?start=&end=&fields=&max_points= narrow the returned time-series
+            context['timeseries_query'] = TimeseriesQuerySerializer.from_request(self.request)
+            renderer = getattr(self.request, 'accepted_renderer', None)
+            context['timeseries_columnar'] = isinstance(renderer, SessionArrowRenderer)
+        return context
         
     @action(detail=True, methods=['patch'], url_path='update-anomalies')
     def update_anomalies(self, request, pk=None):
         session = self.get_object()
         updates = request.data.get('updates', [])
 
-        if not isinstance(updates, list) or not session.timeseries_data:
+        stored = getattr(session, 'timeseries', None)
+
+        if not isinstance(updates, list) or stored is None or not stored.num_records:
             return Response(
                 {"error": "Invalid data format or no timeseries data in session."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         try:
-            with transaction.atomic():
-                update_map = {item['timestamp']: item['anomaly'] for item in updates}
-                for record in session.timeseries_data:
-                    if record.get('timestamp') in update_map:
-                        record['anomaly'] = update_map[record['timestamp']]
-                session.save(update_fields=['timeseries_data'])
+            # Labels live in their own bitmap; only the matched samples change
+            update_map = {item['timestamp']: item['anomaly'] for item in updates}
+            session.label_anomalies(update_map)
             
             return Response({"status": "success", "message": f"{len(updates)} records checked."}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+    @action(detail=True, methods=['get'])
+    def overview(self, request, pk=None):
+        """
+        Serves a precomputed downsample level (min/max/mean per bucket) for
+        overview charts and sparklines. ``?resolution=`` picks a bucket width in
+        seconds; otherwise the finest level with at most ``max_points`` buckets
+        (default 500) is used. ``?fields=`` limits the channels.
+        """
+        session = get_object_or_404(RunningSession.objects.only('id'), pk=pk)
+        levels = list(
+            SessionTimeseriesLevel.objects.filter(session=session).values_list('resolution_secs', 'num_buckets')
+        )
+        if not levels:
+            return Response({"error": "No downsampled levels for this session."}, status=status.HTTP_404_NOT_FOUND)
+
+        resolution = request.query_params.get('resolution')
+        max_points = request.query_params.get('max_points', 500)
+        try:
+            if resolution is not None:
+                resolution = int(resolution)
+                if resolution not in dict(levels):
+                    raise ValueError
+            else:
+                max_points = int(max_points)
+                fitting = [secs for secs, num_buckets in levels if num_buckets <= max_points]
+                resolution = fitting[0] if fitting else levels[-1][0]
+        except ValueError:
+            return Response(
+                {"error": "Invalid resolution or max_points.", "available_resolutions": [secs for secs, _ in levels]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        level = SessionTimeseriesLevel.objects.get(session=session, resolution_secs=resolution)
+        fields = [name.strip() for name in request.query_params.get('fields', '').split(',') if name.strip()]
+        data = level.to_json(fields or None)
+        data['available_resolutions'] = [secs for secs, _ in levels]
+        return Response(data)
+
+    @action(detail=True, methods=['get'], url_path='anomaly-scores')
+    def anomaly_scores(self, request, pk=None):
+        """
+        Returns the detector's per-sample scores (aligned with timeseries_data)
+        alongside the session-level prediction.
+        """
+        session = get_object_or_404(RunningSession.objects.only('id', 'ml_prediction', 'ml_confidence'), pk=pk)
+        try:
+            scores = SessionAnomalyScores.objects.get(session=session)
+        except SessionAnomalyScores.DoesNotExist:
+            return Response({"error": "This session has not been scored."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'ml_prediction': session.ml_prediction,
+            'ml_confidence': session.ml_confidence,
+            'detector_version': scores.detector_version,
+            'summary': scores.summary,
+            'scores': np.round(scores.to_array(), 3).tolist(),
+        })
+
+    @action(detail=False, methods=['get'], url_path=r'export/(?P<file_format>csv|parquet|arrow)')
+    def export(self, request, file_format=None):
+        """
+        Streams every matching session's samples, labels and volunteer metadata
+        as one CSV, Parquet or Arrow stream file for model training.
+        """
+        options = SessionExportSerializer(data={**request.query_params.dict(), 'file_format': file_format})
+        options.is_valid(raise_exception=True)
+        sessions = options.filter(RunningSession.objects.all())
+        content_type, extension = EXPORT_FORMATS[file_format]
+        response = StreamingHttpResponse(
+            iter_export(sessions, file_format, options.validated_data.get('fields')),
+            content_type=content_type,
+        )
+        filename = f"sessions-{timezone.now():%Y%m%d-%H%M%S}.{extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     @action(detail=True, methods=['patch'], url_path='label-records', serializer_class=RecordLabelUpdateSerializer)
     def label_records(self, request, pk=None):
         session = self.get_object()
@@ -134,26 +356,207 @@ class RunningSessionViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         session_file = request.data.get('session_file')
         if session_file:
-            instance.session_file = session_file
+            instance.content_hash, instance.session_file = hash_uploaded_file(session_file)
             instance.status = RunningSession.STATUS_PROCESSING
             instance.processing_error = None
-            instance.timeseries_data = None
             instance.total_distance_km = None
             instance.total_duration_secs = None
             instance.avg_heart_rate = None
             instance.max_heart_rate = None
             instance.save()
+            instance.set_timeseries_data(None)
             process_session_file.delay(instance.id)
             serializer = self.get_serializer(instance)
             return Response(serializer.data)
         return super().update(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        session_instance = serializer.save()
+        session_file = serializer.validated_data.get('session_file')
+        if session_file:
+            content_hash, session_file = hash_uploaded_file(session_file)
+            session_instance = serializer.save(session_file=session_file, content_hash=content_hash)
+        else:
+            session_instance = serializer.save()
         if session_instance.session_file:
             process_session_file.delay(session_instance.id)
 
 
+class UploadBatchViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Uploads many session files for one volunteer in a single request and
+    reports the batch's aggregate processing progress.
+    """
+    serializer_class = UploadBatchSerializer
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser, FormParser]
+    pagination_class = CustomPageNumberPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['volunteer']
+
+    def get_queryset(self):
+        return UploadBatch.objects.annotate(
+            total=Count('sessions'),
+            processing=Count('sessions', filter=Q(sessions__status=RunningSession.STATUS_PROCESSING)),
+            completed=Count('sessions', filter=Q(sessions__status=RunningSession.STATUS_COMPLETED)),
+            failed=Count('sessions', filter=Q(sessions__status=RunningSession.STATUS_FAILED)),
+        ).order_by('-created_at')
+
+    def create(self, request, *args, **kwargs):
+        upload = UploadBatchCreateSerializer(data=request.data)
+        upload.is_valid(raise_exception=True)
+        volunteer = upload.validated_data['volunteer']
+        source_type = upload.validated_data['source_type']
+
+        # Files written to storage so far; the database can roll back, storage can't
+        saved_files = []
+        try:
+            with transaction.atomic():
+                batch = UploadBatch.objects.create(volunteer=volunteer, source_type=source_type)
+                # session_date is a placeholder until processing reads the first sample
+                uploaded_at = timezone.now()
+                sessions = []
+                for uploaded_file in upload.iter_files():
+                    content_hash, stored_file = hash_uploaded_file(uploaded_file)
+                    session = RunningSession(
+                        volunteer=volunteer,
+                        batch=batch,
+                        session_date=uploaded_at,
+                        source_type=source_type,
+                        content_hash=content_hash,
+                    )
+                    if isinstance(stored_file, str):
+                        # A deduplicated file already stored for another session
+                        session.session_file = stored_file
+                    else:
+                        session.session_file.save(stored_file.name, stored_file, save=False)
+                        saved_files.append(session.session_file.name)
+                    sessions.append(session)
+
+                if not sessions:
+                    transaction.set_rollback(True)
+                    return Response({"error": "The upload contained no supported session files."}, status=status.HTTP_400_BAD_REQUEST)
+
+                sessions = RunningSession.objects.bulk_create(sessions)
+                session_ids = [session.id for session in sessions]
+                invalidate_sessions(session_ids)
+                transaction.on_commit(lambda: dispatch_upload_batch(batch, session_ids))
+        except Exception:
+            # The sessions were rolled back, so nothing refers to their files
+            delete_stored_files(saved_files)
+            raise
+
+        serializer = self.get_serializer(self.get_queryset().get(id=batch.id))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class SessionUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Uploads a session file in parts straight to storage (see uploads.py):
+    POST its name and size, PUT every part to its URL, then POST complete/.
+    GET an upload to resume it; DELETE abandons it.
+    """
+    queryset = SessionUpload.objects.all()
+    serializer_class = SessionUploadSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['uploads'] = upload_backend()
+        return context
+
+    def perform_create(self, serializer):
+        upload_id = uuid.uuid4()
+        file_name = serializer.validated_data['file_name']
+        session_file = RunningSession._meta.get_field('session_file')
+        with transaction.atomic():
+            upload = serializer.save(
+                id=upload_id,
+                storage_name=session_file.generate_filename(None, f'{upload_id.hex}_{file_name}'),
+                part_size=part_size_for(serializer.validated_data['file_size']),
+            )
+            upload_backend().start(upload)
+            upload.save(update_fields=['multipart_id'])
+
+    def perform_destroy(self, instance):
+        if instance.status == SessionUpload.STATUS_UPLOADING:
+            upload_backend().abort(instance)
+        instance.delete()
+
+    @action(
+        detail=True, methods=['put'], url_path=r'parts/(?P<part_number>[0-9]+)',
+        permission_classes=[permissions.AllowAny], authentication_classes=[],
+    )
+    def part(self, request, pk=None, part_number=None):
+        """
+        Receives one part of an upload to a storage without multipart support.
+        The signature in the URL authorizes it, as with a presigned S3 URL.
+        """
+        upload = self.get_object()
+        uploads = upload_backend()
+        part_number = int(part_number)
+        if uploads.direct:
+            return Response({"error": "Parts of this upload go straight to storage."}, status=status.HTTP_400_BAD_REQUEST)
+        if not uploads.check_signature(upload, part_number, request.query_params.get('signature', '')):
+            return Response({"error": "Invalid or expired part URL."}, status=status.HTTP_403_FORBIDDEN)
+        if upload.status != SessionUpload.STATUS_UPLOADING:
+            return Response({"error": "The upload is already complete."}, status=status.HTTP_409_CONFLICT)
+        size = dict(upload.part_sizes()).get(part_number)
+        if size is None:
+            return Response({"error": f"The upload has {upload.part_count} parts."}, status=status.HTTP_400_BAD_REQUEST)
+        if request.META.get('CONTENT_LENGTH') != str(size):
+            return Response({"error": f"Part {part_number} must be {size} bytes."}, status=status.HTTP_400_BAD_REQUEST)
+        uploads.receive_part(upload, part_number, request.stream)
+        return Response({'part_number': part_number, 'size': size})
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """
+        Assembles the parts into the session file, creates the session and
+        queues its processing. Completing an upload twice changes nothing.
+        """
+        upload = self.get_object()
+        with transaction.atomic():
+            upload = SessionUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.status == SessionUpload.STATUS_UPLOADING:
+                try:
+                    session_file = upload_backend().complete(upload)
+                except ValueError as e:
+                    return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                session = RunningSession.objects.create(
+                    volunteer_id=upload.volunteer_id,
+                    session_date=upload.session_date,
+                    source_type=upload.source_type,
+                    session_file=session_file,
+                )
+                upload.session = session
+                upload.status = SessionUpload.STATUS_COMPLETED
+                upload.completed_at = timezone.now()
+                upload.save()
+                transaction.on_commit(lambda: process_session_file.delay(session.id))
+        return Response(self.get_serializer(upload).data)
+
+
+class ScoringRunViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Starts a rescoring of many sessions with the current anomaly detector and
+    reports its progress. POST the filters, then poll the run.
+    """
+    queryset = ScoringRun.objects.all().order_by('-created_at')
+    serializer_class = ScoringRunSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = CustomPageNumberPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['volunteer', 'status']
+
+    def perform_create(self, serializer):
+        run = serializer.save()
+        transaction.on_commit(lambda: self.start_run(run))
+
+    def start_run(self, run):
+        result = rescore_sessions.delay(run.id)
+        ScoringRun.objects.filter(id=run.id).update(task_id=result.id)
+
+
 class VolunteerViewSet(viewsets.ModelViewSet):
     queryset = Volunteer.objects.all().order_by('-registration_date')
     serializer_class = VolunteerSerializer
@@ -167,33 +570,18 @@ class VolunteerViewSet(viewsets.ModelViewSet):
             self.permission_classes = [permissions.IsAdminUser]
         return super(VolunteerViewSet, self).get_permissions()
 
+    def list(self, request, *args, **kwargs):
+        build = lambda: super(VolunteerViewSet, self).list(request, *args, **kwargs)
+        return cached_response(request, ['volunteers'], build)
+
+    def retrieve(self, request, *args, **kwargs):
+        build = lambda: super(VolunteerViewSet, self).retrieve(request, *args, **kwargs)
+        return cached_response(request, ['volunteers'], build)
+
     def perform_create(self, serializer):
         volunteer = serializer.save()
-        try:
-            admin_subject = f"New Volunteer Registration: {volunteer.first_name} {volunteer.last_name}"
-            admin_message = f"A new volunteer has registered for the Heart Rate Anomaly study.\n\nName: {volunteer.first_name} {volunteer.last_name}\nEmail: {volunteer.email}\n\nPlease log in to the admin panel to review and approve them."
-            send_mail(
-                subject=admin_subject,
-                message=admin_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[settings.ADMIN_EMAIL],
-                fail_silently=False,
-            )
-
-            volunteer_subject = "Registration Confirmation: Heart Rate Anomaly Study"
-            context = { 'first_name': volunteer.first_name, 'last_name': volunteer.last_name, 'email': volunteer.email, 'date_of_birth': volunteer.date_of_birth, 'gender': volunteer.gender, 'nationality': volunteer.nationality, 'platform': volunteer.platform, 'smartwatch': volunteer.smartwatch, 'run_frequency': volunteer.run_frequency, }
-            html_content = render_to_string('volunteers/volunteer_confirmation_email.html', context)
-            text_content = strip_tags(html_content)
-            email = EmailMultiAlternatives(
-                subject=volunteer_subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[volunteer.email]
-            )
-            email.attach_alternative(html_content, "text/html")
-            email.send()
-        except Exception as e:
-            print(f"An error occurred while sending emails: {e}")
+        # The emails are sent by the email workers (see tasks.py)
+        transaction.on_commit(lambda: queue_registration_emails(volunteer.id))
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def approve(self, request, pk=None):